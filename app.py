@@ -1,8 +1,9 @@
 #Aqui el codigo de streamlitstreamlit
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from utils import predict_diabetes, FEATURE_EXPLANATIONS
+import metrics
+from neighbors import similar_profiles
+from percentiles import risk_percentile
+from utils import configure_from_env, prewarm_model, predict_diabetes, explain_diabetes, what_if, WHAT_IF_FLAGS, FEATURE_EXPLANATIONS_EN as FEATURE_EXPLANATIONS
 
 # Configure page
 st.set_page_config(
@@ -11,6 +12,15 @@ st.set_page_config(
     layout="wide"
 )
 
+# Start loading the model in the background (only the first call per process does it)
+prewarm_model()
+# Drift monitor etc. configured in the environment (also once per process)
+configure_from_env()
+
+# Metrics (exported when DIABETES_METRICS_PORT / DIABETES_METRICS_FILE are set)
+metrics.serve_from_env()
+metrics.set_labels(app='app', lang='en')
+
 # Custom CSS for styling
 st.markdown("""
 <style>
@@ -85,8 +95,7 @@ with mcol1:
 with mcol2:
     physhlth = st.slider("Days of poor physical health (past 30 days)", 0, 30, 0)
 
-# Create feature dictionary (with engineered feature)
-health_risk_index = genhlth * bmi
+# Create feature dictionary (the engineered feature GenHlth × BMI is computed by the model schema)
 input_data = {
     'HighBP': highbp,
     'HighChol': highchol,
@@ -108,16 +117,29 @@ input_data = {
     'Age': age,
     'Education': education,
     'Income': income,
-    'Health_Risk_Index': health_risk_index
+    'BMI': bmi
 }
 
+
+def describe(value, feature):
+    """Display value of one what-if answer"""
+    if feature in WHAT_IF_FLAGS:
+        return "Yes" if value else "No"
+    return f"{value:.1f}" if feature == 'BMI' else str(value)
+
+
 # Prediction button
 predict_btn = st.button("Assess My Diabetes Risk", type="primary")
 
 # Display results
 if predict_btn:
-    with st.spinner("Analyzing your health profile..."):
+    # The whole results section is timed: scoring, contributions, what-if, percentile and neighbours
+    with metrics.RENDER_SECONDS.time(), st.spinner("Analyzing your health profile..."):
         prediction, probability = predict_diabetes(input_data)
+        contributions = explain_diabetes(input_data, top=8)
+        _, changes = what_if(input_data)
+        standing = risk_percentile(input_data, probability)
+        peers = similar_profiles(input_data)
         
         st.divider()
         st.header("Assessment Results")
@@ -139,23 +161,43 @@ if predict_btn:
             - Get annual checkups
             - Watch for risk factor changes
             """)
+
+        # Where this profile stands in the scored BRFSS population
+        if standing is not None:
+            line = f"Your estimated risk is higher than that of **{standing['overall']:.0f}%** of the BRFSS population"
+            if standing['stratum'] is not None:
+                line += f" and of **{standing['stratum']:.0f}%** of people of your age, sex and income."
+            st.markdown(line)
+        if peers is not None:
+            st.markdown(f"Among the {peers['k']} BRFSS respondents whose answers are most similar to yours, "
+                        f"**{peers['rate']:.0%}** have diabetes.")
         
-        # Show risk factors visualization
+        # Show risk factors visualization (pandas/matplotlib only imported when drawing)
+        import pandas as pd
+        import matplotlib.pyplot as plt
         st.subheader("Your Key Risk Factors")
+        st.caption("How much each answer moved the model's prediction (log-odds): red raises your risk, green lowers it.")
         fig, ax = plt.subplots(figsize=(10, 6))
         
-        # Create simplified risk factor display
-        risk_factors = {
-            'BMI': bmi,
-            'Health Risk Index': health_risk_index,
-            'High BP': "Yes" if highbp else "No",
-            'Physical Inactivity': "Yes" if not physactivity else "No",
-            'Poor Diet': "Yes" if not (fruits and veggies) else "No"
-        }
-        
-        pd.Series(risk_factors).plot(kind='barh', ax=ax, color=['#e74c3c' if x in ['Yes', True] or (isinstance(x, float) and x > 25) else '#2ecc71' for x in risk_factors.values()])
+        # Model contributions (TreeSHAP) for this profile, largest at the top
+        risk_factors = pd.Series({FEATURE_EXPLANATIONS.get(f, f): v for f, v in reversed(contributions)})
+        risk_factors.plot(kind='barh', ax=ax, color=['#e74c3c' if v > 0 else '#2ecc71' for v in risk_factors])
+        ax.axvline(0, color='#333', linewidth=0.8)
         ax.set_title("Your Personal Risk Profile")
         st.pyplot(fig)
+
+        # What-if table: every single-answer change, scored in one batch
+        st.subheader("What If...?")
+        st.caption("Estimated risk when changing a single answer, largest reduction first.")
+        st.dataframe([
+            {
+                "Change": f"{'Body Mass Index (BMI)' if row['feature'] == 'BMI' else FEATURE_EXPLANATIONS.get(row['feature'], row['feature'])}: "
+                          f"{describe(row['from'], row['feature'])} → {describe(row['to'], row['feature'])}",
+                "Risk": f"{row['proba'] * 100:.1f}%",
+                "Difference": f"{row['delta'] * 100:+.1f} pp",
+            }
+            for row in changes[:8]
+        ], hide_index=True, use_container_width=True)
         
         # Disclaimer
         st.info("""
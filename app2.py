@@ -1,11 +1,85 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from utils import predict_diabetes, FEATURE_EXPLANATIONS_ES, FEATURE_EXPLANATIONS_EN, TEXTS
+import metrics
+from neighbors import similar_profiles
+from percentiles import risk_percentile
+from utils import (configure_from_env, prewarm_model, predict_diabetes, explain_diabetes, what_if, WHAT_IF_FLAGS,
+                   FEATURE_EXPLANATIONS_ES, FEATURE_EXPLANATIONS_EN, TEXTS)
 
 # Pagina
 st.set_page_config(page_title="Diabetes Risk Predictor", page_icon="🩺", layout="wide")
 
+# --- ESTILOS PERSONALIZADOS ---
+CSS = """
+<style>
+body {
+    background-color: #121212;
+    color: #e0e0e0;
+}
+
+.big-font { font-size:20px !important; }
+.result-box {
+    border-radius:10px;
+    padding:20px;
+    margin-top:20px;
+    border:1px solid #333;
+    background-color:#1e1e1e;
+}
+.positive { color: #e74c3c; font-weight:bold; }
+.negative { color: #2ecc71; font-weight:bold; }
+</style>
+"""
+
+
+# --- RECURSOS EN CACHÉ (una vez por proceso / por idioma) ---
+@st.cache_resource(show_spinner=False)
+def warm_model():
+    """Start loading the model in the background, once per server process"""
+    return prewarm_model()
+
+
+@st.cache_resource(show_spinner=False)
+def localized(lang):
+    """Texts, feature questions and widget labels for one language.
+
+    Shared by every session without copying (cache_data would unpickle a
+    copy on each rerun): read-only."""
+    es = lang == 'es'
+    features = FEATURE_EXPLANATIONS_ES if es else FEATURE_EXPLANATIONS_EN
+    return {
+        'texts': TEXTS[lang],
+        'features': features,
+        'yes_no': {0: "No", 1: "Sí" if es else "Yes"},
+        'age': {x: f"{x*5}-{x*5+4} {'años' if es else 'years'}" for x in range(1, 14)},
+        'education': dict(enumerate(
+            ["Inicial", "Primaria", "Secundaria Incompleta", "Secundaria Completa", "Técnico", "Universitario"] if es
+            else ["Elementary", "Middle School", "Some High School", "High School Grad", "Technical", "College"], 1)),
+        'income': {x: (f"S/. {x*500} - S/. {(x+1)*500}" if es else f"${x*500} - ${(x+1)*500}") if x < 8
+                   else ("> S/. 4000" if es else "> $4000") for x in range(1, 9)},
+        'sex': {0: "Femenino", 1: "Masculino"} if es else {0: "Female", 1: "Male"},
+        'spinner': "Analizando tu perfil de salud..." if es else "Analyzing your health profile...",
+    }
+
+
+# Factores con mayor contribución y escenarios "qué pasaría si" que se muestran
+TOP_FACTORS = 6
+WHAT_IF_ROWS = 8
+
+
+def change_label(row, loc):
+    """'Question: old → new' for one what-if row"""
+    if row['feature'] in WHAT_IF_FLAGS:
+        old, new = loc['yes_no'][int(row['from'])], loc['yes_no'][int(row['to'])]
+    elif row['feature'] == 'BMI':
+        old, new = f"{row['from']:.1f}", f"{row['to']:.1f}"
+    else:
+        old, new = row['from'], row['to']
+    label = loc['texts']['bmi'] if row['feature'] == 'BMI' else loc['features'].get(row['feature'], row['feature'])
+    return f"{label}: {old} → {new}"
+
+
+warm_model()
+configure_from_env()
+
 # --- CONFIGURACIÓN DE IDIOMA ---
 if 'lang' not in st.session_state:
     st.session_state.lang = 'es'
@@ -13,10 +87,9 @@ if 'lang' not in st.session_state:
 # Botones de idioma en la esquina superior derecha
 col1, col2 = st.columns([0.9, 0.1])
 with col2:
-    # Usamos st.empty() para evitar que los botones se dupliquen en el cambio de idioma
     en_btn = st.button("🇺🇸 EN", key="en_btn")
     es_btn = st.button("🇪🇸 ES", key="es_btn")
-    
+
     if en_btn:
         st.session_state.lang = 'en'
         st.rerun()
@@ -26,92 +99,76 @@ with col2:
 
 # Seleccionar textos según idioma
 lang = st.session_state.lang
-texts = TEXTS[lang]
-features = FEATURE_EXPLANATIONS_ES if lang == 'es' else FEATURE_EXPLANATIONS_EN
+loc = localized(lang)
+texts = loc['texts']
+features = loc['features']
 
+# --- MÉTRICAS ---
+metrics.serve_from_env()
+metrics.set_labels(app='app2', lang=lang)
 
-# --- ESTILOS PERSONALIZADOS ---
-st.markdown("""
-<style>
-body {
-    background-color: #121212;
-    color: #e0e0e0;
-}
-
-.big-font { font-size:20px !important; }
-.result-box {
-    border-radius:10px;
-    padding:20px;
-    margin-top:20px;
-    border:1px solid #333;
-    background-color:#1e1e1e;
-}
-.positive { color: #e74c3c; font-weight:bold; }
-.negative { color: #2ecc71; font-weight:bold; }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(CSS, unsafe_allow_html=True)
 
 # --- TITULO E INTRODUCCION ---
 st.title(texts['title'])
 st.markdown(texts['subtitle'])
 
 # --- PERFIL DEL USUARIO ---
-st.header(texts['health_profile'])
-col1, col2, col3 = st.columns(3)
+# Dentro de un formulario: cambiar un widget no vuelve a ejecutar el script,
+# solo el botón de evaluar envía todos los valores de una vez.
+with st.form("health_profile"):
+    st.header(texts['health_profile'])
+    col1, col2, col3 = st.columns(3)
+    yes_no = loc['yes_no'].get
 
-with col1:
-    st.subheader(texts['vital_signs'])
-    highbp = st.radio(features['HighBP'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="highbp")
-    highchol = st.radio(features['HighChol'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="highchol")
-    bmi = st.slider(texts['bmi'], 15.0, 45.0, 25.0, 0.1)
-    genhlth = st.selectbox(texts['gen_health'], [1,2,3,4,5])
+    with col1:
+        st.subheader(texts['vital_signs'])
+        highbp = st.radio(features['HighBP'], [0, 1], format_func=yes_no, key="highbp")
+        highchol = st.radio(features['HighChol'], [0, 1], format_func=yes_no, key="highchol")
+        bmi = st.slider(texts['bmi'], 15.0, 45.0, 25.0, 0.1, key="bmi")
+        genhlth = st.selectbox(texts['gen_health'], [1,2,3,4,5], key="genhlth")
 
-with col2:
-    st.subheader(texts['lifestyle'])
-    smoker = st.radio(features['Smoker'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="smoker")
-    physactivity = st.radio(features['PhysActivity'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="physactivity")
-    fruits = st.radio(features['Fruits'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="fruits")
-    veggies = st.radio(features['Veggies'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="veggies")
-    alcohol = st.radio(features['HvyAlcoholConsump'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="alcohol")
-
-with col3:
-    st.subheader(texts['medical_history'])
-    stroke = st.radio(features['Stroke'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="stroke")
-    heartdisease = st.radio(features['HeartDiseaseorAttack'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="heartdisease")
-    diffwalk = st.radio(features['DiffWalk'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="diffwalk")
-    cholcheck = st.radio(features['CholCheck'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="cholcheck")
-    nodoc = st.radio(features['NoDocbcCost'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí" if lang == 'es' else "Yes", key="nodoc")
-
-# --- INFORMACIÓN DEMOGRÁFICA ---
-st.subheader(texts['demographic'])
-dcol1, dcol2, dcol3, dcol4 = st.columns(4)
-
-with dcol1:
-    age = st.selectbox(texts['age'], list(range(1,14)), format_func=lambda x: f"{x*5}-{x*5+4} {'años' if lang == 'es' else 'years'}")
-with dcol2:
-    education = st.selectbox(texts['education'], [1,2,3,4,5,6], format_func=lambda x: 
-        ["Inicial", "Primaria", "Secundaria Incompleta", "Secundaria Completa", "Técnico", "Universitario"][x-1] if lang == 'es'
-        else ["Elementary", "Middle School", "Some High School", "High School Grad", "Technical", "College"][x-1])
-with dcol3:
-    income = st.selectbox(texts['income'], [1,2,3,4,5,6,7,8], format_func=lambda x: 
-        f"S/. {x*500} - S/. {(x+1)*500}" if x<8 else "> S/. 4000" if lang == 'es'
-        else f"${x*500} - ${(x+1)*500}" if x<8 else "> $4000")
-with dcol4:
-    sex = st.radio(texts['gender'], [0, 1], format_func=lambda x: 
-        "Femenino" if x == 0 else "Masculino" if lang == 'es' 
-        else "Female" if x == 0 else "Male", key="sex")
-
-# --- ESTADO DE SALUD RECIENTE ---
-st.subheader(texts['recent_health'])
-mcol1, mcol2 = st.columns(2)
-with mcol1:
-    menthlth = st.slider(texts['mental_health'], 0, 30, 0)
-with mcol2:
-    physhlth = st.slider(texts['physical_health'], 0, 30, 0)
-
-# --- CALCULO DEL ÍNDICE DE RIESGO ---
-health_risk_index = genhlth
+    with col2:
+        st.subheader(texts['lifestyle'])
+        smoker = st.radio(features['Smoker'], [0, 1], format_func=yes_no, key="smoker")
+        physactivity = st.radio(features['PhysActivity'], [0, 1], format_func=yes_no, key="physactivity")
+        fruits = st.radio(features['Fruits'], [0, 1], format_func=yes_no, key="fruits")
+        veggies = st.radio(features['Veggies'], [0, 1], format_func=yes_no, key="veggies")
+        alcohol = st.radio(features['HvyAlcoholConsump'], [0, 1], format_func=yes_no, key="alcohol")
+
+    with col3:
+        st.subheader(texts['medical_history'])
+        stroke = st.radio(features['Stroke'], [0, 1], format_func=yes_no, key="stroke")
+        heartdisease = st.radio(features['HeartDiseaseorAttack'], [0, 1], format_func=yes_no, key="heartdisease")
+        diffwalk = st.radio(features['DiffWalk'], [0, 1], format_func=yes_no, key="diffwalk")
+        cholcheck = st.radio(features['CholCheck'], [0, 1], format_func=yes_no, key="cholcheck")
+        nodoc = st.radio(features['NoDocbcCost'], [0, 1], format_func=yes_no, key="nodoc")
+
+    # --- INFORMACIÓN DEMOGRÁFICA ---
+    st.subheader(texts['demographic'])
+    dcol1, dcol2, dcol3, dcol4 = st.columns(4)
+
+    with dcol1:
+        age = st.selectbox(texts['age'], list(range(1,14)), format_func=loc['age'].get, key="age")
+    with dcol2:
+        education = st.selectbox(texts['education'], [1,2,3,4,5,6], format_func=loc['education'].get, key="education")
+    with dcol3:
+        income = st.selectbox(texts['income'], [1,2,3,4,5,6,7,8], format_func=loc['income'].get, key="income")
+    with dcol4:
+        sex = st.radio(texts['gender'], [0, 1], format_func=loc['sex'].get, key="sex")
+
+    # --- ESTADO DE SALUD RECIENTE ---
+    st.subheader(texts['recent_health'])
+    mcol1, mcol2 = st.columns(2)
+    with mcol1:
+        menthlth = st.slider(texts['mental_health'], 0, 30, 0, key="menthlth")
+    with mcol2:
+        physhlth = st.slider(texts['physical_health'], 0, 30, 0, key="physhlth")
+
+    # --- BOTÓN DE PREDICCIÓN ---
+    submitted = st.form_submit_button(texts['predict_button'], type="primary")
 
+# --- DATOS DE ENTRADA DEL MODELO ---
 input_data = {
     'HighBP': highbp,
     'HighChol': highchol,
@@ -133,14 +190,26 @@ input_data = {
     'Age': age,
     'Education': education,
     'Income': income,
-    'Índice_de_Salud_General': health_risk_index
+    'BMI': bmi  # Índice_de_Salud_General (GenHlth × BMI) lo calcula el esquema del modelo
 }
 
-# --- BOTÓN DE PREDICCIÓN ---
-if st.button(texts['predict_button'], type="primary"):
-    with st.spinner("Analizando tu perfil de salud..." if lang == 'es' else "Analyzing your health profile..."):
+if submitted:
+    with st.spinner(loc['spinner']):
         pred, prob = predict_diabetes(input_data)
-        prob_percent = prob * 100
+        contributions = explain_diabetes(input_data, top=TOP_FACTORS)
+        _, changes = what_if(input_data)
+        standing = risk_percentile(input_data, prob)
+        peers = similar_profiles(input_data)
+    # El resultado se guarda en la sesión para que no se pierda en la siguiente interacción
+    st.session_state.result = {'pred': int(pred), 'prob': float(prob), 'contributions': contributions,
+                               'what_if': changes[:WHAT_IF_ROWS], 'standing': standing, 'peers': peers}
+
+
+def show_results():
+    """Result and risk-factor section, drawn from the result stored in the session"""
+    result = st.session_state.get('result')
+    if result is not None:
+        prob_percent = result['prob'] * 100
 
         # Determinando categoria segun los rangos
         if prob_percent <= 30:
@@ -151,66 +220,62 @@ if st.button(texts['predict_button'], type="primary"):
             message = texts['prediabetes']
             color_style = "warning"
             recommendations = texts['prediabetes_rec']
-        else: 
+        else:
             message = texts['diabetes']
             color_style = "error"
             recommendations = texts['diabetes_rec']
 
-    st.divider()
-    st.header(texts['results_title'])
+        with metrics.RENDER_SECONDS.time():
+            st.divider()
+            st.header(texts['results_title'])
 
-    if color_style == "success":
-        st.success(message)
-    elif color_style == "warning":
-        st.warning(message)
-    else:
-        st.error(message)
-    
-    st.markdown(recommendations)
-
-# --- VISUALIZACIÓN DE FACTORES CLAVE ---
-st.subheader(texts['risk_factors'])
-
-# Create a DataFrame for the risk factors
-risk_data = {
-    'Factor': [
-        texts['gen_health'].split('(')[0].strip(), 
-        features['HighBP'], 
-        features['HighChol'],
-        features['PhysActivity'],
-        f"{features['Fruits']} & {features['Veggies']}"
-    ],
-    'Valor': [
-        genhlth,
-        1 if highbp else 0,
-        1 if highchol else 0,
-        1 if not physactivity else 0,
-        1 if not (fruits and veggies) else 0
-    ],
-    'Tipo': ['Numérico' if lang == 'es' else 'Numerical', 
-             'Categórico' if lang == 'es' else 'Categorical', 
-             'Categórico' if lang == 'es' else 'Categorical', 
-             'Categórico' if lang == 'es' else 'Categorical', 
-             'Categórico' if lang == 'es' else 'Categorical']
-}
+            if color_style == "success":
+                st.success(message)
+            elif color_style == "warning":
+                st.warning(message)
+            else:
+                st.error(message)
+
+            st.markdown(recommendations)
+
+            # Posición en la población (índice de percentiles precalculado)
+            standing = result['standing']
+            if standing is not None:
+                line = texts['percentile'].format(**standing)
+                if standing['stratum'] is not None:
+                    line += texts['percentile_stratum'].format(**standing)
+                st.markdown(line)
+            if result['peers'] is not None:
+                st.markdown(texts['neighbors'].format(**result['peers']))
+
+            # --- VISUALIZACIÓN DE FACTORES CLAVE ---
+            # Contribuciones del modelo (TreeSHAP) para este perfil, de mayor a menor peso
+            st.subheader(texts['risk_factors'])
+            st.caption(texts['contributions_help'])
+            for feature, value in result['contributions']:
+                status = texts['raises_risk'] if value > 0 else texts['lowers_risk']
+                color = "#e74c3c" if value > 0 else "#2ecc71"
+                st.markdown(f"<span style='color:{color}; font-weight:bold'>{features.get(feature, feature)}: "
+                            f"{status} ({value:+.2f})</span>", unsafe_allow_html=True)
+
+            # --- ¿QUÉ PASARÍA SI...? (todos los cambios evaluados en un solo lote) ---
+            st.subheader(texts['what_if'])
+            st.caption(texts['what_if_help'])
+            st.dataframe([
+                {
+                    texts['what_if_change']: change_label(row, loc),
+                    texts['what_if_risk']: f"{row['proba'] * 100:.1f}%",
+                    texts['what_if_delta']: f"{row['delta'] * 100:+.1f} pp",
+                }
+                for row in result['what_if']
+            ], hide_index=True, use_container_width=True)
 
-risk_df = pd.DataFrame(risk_data)
 
-# Show categorical factors separately
-st.subheader(texts['categorical_risk'])
-categorical_df = risk_df[risk_df['Tipo'] == ('Categórico' if lang == 'es' else 'Categorical')]
-if not categorical_df.empty:
-    for _, row in categorical_df.iterrows():
-        status = "⚠️ ALTO RIESGO" if lang == 'es' and row['Valor'] == 1 else "✅ BAJO RIESGO" if lang == 'es' and row['Valor'] == 0 else "⚠️ HIGH RISK" if row['Valor'] == 1 else "✅ LOW RISK"
-        color = "#e74c3c" if row['Valor'] == 1 else "#2ecc71"
-        st.markdown(f"<span style='color:{color}; font-weight:bold'>{row['Factor']}: {status}</span>", 
-                    unsafe_allow_html=True)
-else:
-    st.info("No se identificaron factores categóricos de riesgo" if lang == 'es' else "No categorical risk factors identified")
+show_results()
 
 # Disclaimer
 st.info(texts['disclaimer'])
 
 # --- SIDEBAR ---
 st.sidebar.header(texts['sidebar_title'])
-st.sidebar.markdown(texts['sidebar_content'])
\ No newline at end of file
+st.sidebar.markdown(texts['sidebar_content'])
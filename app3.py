@@ -1,14 +1,20 @@
 # streamlit_app.py
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from utils import predict_diabetes, FEATURE_EXPLANATIONS
+import metrics
+from neighbors import similar_profiles
+from percentiles import risk_percentile
+from utils import (configure_from_env, prewarm_model, predict_diabetes, explain_diabetes, what_if, WHAT_IF_FLAGS,
+                   FEATURE_EXPLANATIONS_ES as FEATURE_EXPLANATIONS)
 
 # --- CONFIGURACION DE PAGINA ---
 st.set_page_config(page_title="Diabetes Risk Predictor", page_icon="🩺", layout="wide")
 
+# --- MÉTRICAS ---
+metrics.serve_from_env()
+metrics.set_labels(app='app3', lang='es')
+
 # --- ESTILOS PERSONALIZADOS ---
-st.markdown("""
+CSS = """
 <style>
 body {
     background-color: #121212;
@@ -26,7 +32,70 @@ body {
 .positive { color: #e74c3c; font-weight:bold; }
 .negative { color: #2ecc71; font-weight:bold; }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Factores con mayor contribución y escenarios "qué pasaría si" que se muestran
+TOP_FACTORS = 6
+WHAT_IF_ROWS = 8
+
+# Categorías de resultado: (mensaje, estilo, recomendaciones)
+RESULTS = {
+    'no_diabetes': ("## ✅ No tiene diabetes", "success", """
+**Consejos:**
+- Mantén tus hábitos saludables
+- Realiza chequeos cada 5 años
+"""),
+    'prediabetes': ("## ⚠️ Tiene prediabetes", "warning", """
+**Recomendaciones:**
+- Consulte a un médico para confirmar
+- Monitoree sus niveles de glucosa
+- Ajuste dieta y ejercicio
+"""),
+    'diabetes': ("## 🚨 Tiene diabetes", "error", """
+**Acciones urgentes:**
+- Consulte a un médico inmediatamente
+- Controle su dieta y medicación
+- Realice exámenes de glucosa
+"""),
+}
+
+
+# --- RECURSOS EN CACHÉ (una vez por proceso) ---
+@st.cache_resource(show_spinner=False)
+def warm_model():
+    """Start loading the model in the background, once per server process"""
+    return prewarm_model()
+
+
+@st.cache_resource(show_spinner=False)
+def widget_labels():
+    """Option labels for the selectboxes and radios, shared without copying: read-only"""
+    return {
+        'yes_no': {0: "No", 1: "Sí"},
+        'age': {x: f"{x*5}-{x*5+4} años" for x in range(1, 14)},
+        'education': dict(enumerate(["Inicial", "Primaria", "Secundaria Incompleta", "Secundaria Completa", "Técnico", "Universitario"], 1)),
+        'income': {x: f"S/. {x*500} - S/. {(x+1)*500}" if x < 8 else "> S/. 4000" for x in range(1, 9)},
+        'sex': {0: "Femenino", 1: "Masculino"},
+    }
+
+
+def change_label(row):
+    """'Pregunta: antes → después' for one what-if row"""
+    if row['feature'] in WHAT_IF_FLAGS:
+        old, new = labels['yes_no'][int(row['from'])], labels['yes_no'][int(row['to'])]
+    elif row['feature'] == 'BMI':
+        old, new = f"{row['from']:.1f}", f"{row['to']:.1f}"
+    else:
+        old, new = row['from'], row['to']
+    label = "Índice de Masa Corporal (BMI)" if row['feature'] == 'BMI' else FEATURE_EXPLANATIONS.get(row['feature'], row['feature'])
+    return f"{label}: {old} → {new}"
+
+
+warm_model()
+configure_from_env()
+labels = widget_labels()
+
+st.markdown(CSS, unsafe_allow_html=True)
 
 # --- TITULO E INTRODUCCION ---
 st.title("🩺 Diabetes Risk Assessment Tool")
@@ -35,56 +104,61 @@ Esta herramienta predice el **riesgo de diabetes** basado en tus indicadores de
 """)
 
 # --- PERFIL DEL USUARIO ---
-st.header("Perfil de Salud del Usuario")
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.subheader("Signos Vitales")
-    highbp = st.radio(FEATURE_EXPLANATIONS['HighBP'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="highbp")
-    highchol = st.radio(FEATURE_EXPLANATIONS['HighChol'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="highchol")
-    bmi = st.slider("Índice de Masa Corporal (BMI)", 15.0, 45.0, 25.0, 0.1)
-    genhlth = st.selectbox("Salud General (1=Excelente, 5=Deficiente)", [1,2,3,4,5])
-
-with col2:
-    st.subheader("Estilo de Vida")
-    smoker = st.radio(FEATURE_EXPLANATIONS['Smoker'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="smoker")
-    physactivity = st.radio(FEATURE_EXPLANATIONS['PhysActivity'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="physactivity")
-    fruits = st.radio(FEATURE_EXPLANATIONS['Fruits'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="fruits")
-    veggies = st.radio(FEATURE_EXPLANATIONS['Veggies'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="veggies")
-    alcohol = st.radio(FEATURE_EXPLANATIONS['HvyAlcoholConsump'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="alcohol")
-
-with col3:
-    st.subheader("Historial Médico")
-    stroke = st.radio(FEATURE_EXPLANATIONS['Stroke'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="stroke")
-    heartdisease = st.radio(FEATURE_EXPLANATIONS['HeartDiseaseorAttack'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="heartdisease")
-    diffwalk = st.radio(FEATURE_EXPLANATIONS['DiffWalk'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="diffwalk")
-    cholcheck = st.radio(FEATURE_EXPLANATIONS['CholCheck'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="cholcheck")
-    nodoc = st.radio(FEATURE_EXPLANATIONS['NoDocbcCost'], [0, 1], format_func=lambda x: "No" if x == 0 else "Sí", key="nodoc")
-
-# --- INFORMACIÓN DEMOGRÁFICA ---
-st.subheader("Información Demográfica")
-dcol1, dcol2, dcol3, dcol4 = st.columns(4)
-
-with dcol1:
-    age = st.selectbox("Rango de Edad", list(range(1,14)), format_func=lambda x: f"{x*5}-{x*5+4} años")
-with dcol2:
-    education = st.selectbox("Nivel Educativo", [1,2,3,4,5,6], format_func=lambda x: ["Inicial", "Primaria", "Secundaria Incompleta", "Secundaria Completa", "Técnico", "Universitario"][x-1])
-with dcol3:
-    income = st.selectbox("Rango de Ingreso", [1,2,3,4,5,6,7,8], format_func=lambda x: f"S/. {x*500} - S/. {(x+1)*500}" if x<8 else "> S/. 4000")
-with dcol4:
-    sex = st.radio("Sexo", [0, 1], format_func=lambda x: "Femenino" if x == 0 else "Masculino", key="sex")
-
-# --- ESTADO DE SALUD RECIENTE ---
-st.subheader("Estado de Salud Reciente")
-mcol1, mcol2 = st.columns(2)
-with mcol1:
-    menthlth = st.slider("Días de mala salud mental (últimos 30 días)", 0, 30, 0)
-with mcol2:
-    physhlth = st.slider("Días de mala salud física (últimos 30 días)", 0, 30, 0)
-
-# --- CALCULO DEL ÍNDICE DE RIESGO ---
-health_risk_index = genhlth
+# Dentro de un formulario: cambiar un widget no vuelve a ejecutar el script,
+# solo el botón de evaluar envía todos los valores de una vez.
+with st.form("health_profile"):
+    st.header("Perfil de Salud del Usuario")
+    col1, col2, col3 = st.columns(3)
+    yes_no = labels['yes_no'].get
+
+    with col1:
+        st.subheader("Signos Vitales")
+        highbp = st.radio(FEATURE_EXPLANATIONS['HighBP'], [0, 1], format_func=yes_no, key="highbp")
+        highchol = st.radio(FEATURE_EXPLANATIONS['HighChol'], [0, 1], format_func=yes_no, key="highchol")
+        bmi = st.slider("Índice de Masa Corporal (BMI)", 15.0, 45.0, 25.0, 0.1, key="bmi")
+        genhlth = st.selectbox("Salud General (1=Excelente, 5=Deficiente)", [1,2,3,4,5], key="genhlth")
 
+    with col2:
+        st.subheader("Estilo de Vida")
+        smoker = st.radio(FEATURE_EXPLANATIONS['Smoker'], [0, 1], format_func=yes_no, key="smoker")
+        physactivity = st.radio(FEATURE_EXPLANATIONS['PhysActivity'], [0, 1], format_func=yes_no, key="physactivity")
+        fruits = st.radio(FEATURE_EXPLANATIONS['Fruits'], [0, 1], format_func=yes_no, key="fruits")
+        veggies = st.radio(FEATURE_EXPLANATIONS['Veggies'], [0, 1], format_func=yes_no, key="veggies")
+        alcohol = st.radio(FEATURE_EXPLANATIONS['HvyAlcoholConsump'], [0, 1], format_func=yes_no, key="alcohol")
+
+    with col3:
+        st.subheader("Historial Médico")
+        stroke = st.radio(FEATURE_EXPLANATIONS['Stroke'], [0, 1], format_func=yes_no, key="stroke")
+        heartdisease = st.radio(FEATURE_EXPLANATIONS['HeartDiseaseorAttack'], [0, 1], format_func=yes_no, key="heartdisease")
+        diffwalk = st.radio(FEATURE_EXPLANATIONS['DiffWalk'], [0, 1], format_func=yes_no, key="diffwalk")
+        cholcheck = st.radio(FEATURE_EXPLANATIONS['CholCheck'], [0, 1], format_func=yes_no, key="cholcheck")
+        nodoc = st.radio(FEATURE_EXPLANATIONS['NoDocbcCost'], [0, 1], format_func=yes_no, key="nodoc")
+
+    # --- INFORMACIÓN DEMOGRÁFICA ---
+    st.subheader("Información Demográfica")
+    dcol1, dcol2, dcol3, dcol4 = st.columns(4)
+
+    with dcol1:
+        age = st.selectbox("Rango de Edad", list(range(1,14)), format_func=labels['age'].get, key="age")
+    with dcol2:
+        education = st.selectbox("Nivel Educativo", [1,2,3,4,5,6], format_func=labels['education'].get, key="education")
+    with dcol3:
+        income = st.selectbox("Rango de Ingreso", [1,2,3,4,5,6,7,8], format_func=labels['income'].get, key="income")
+    with dcol4:
+        sex = st.radio("Sexo", [0, 1], format_func=labels['sex'].get, key="sex")
+
+    # --- ESTADO DE SALUD RECIENTE ---
+    st.subheader("Estado de Salud Reciente")
+    mcol1, mcol2 = st.columns(2)
+    with mcol1:
+        menthlth = st.slider("Días de mala salud mental (últimos 30 días)", 0, 30, 0, key="menthlth")
+    with mcol2:
+        physhlth = st.slider("Días de mala salud física (últimos 30 días)", 0, 30, 0, key="physhlth")
+
+    # --- BOTÓN DE PREDICCIÓN ---
+    submitted = st.form_submit_button("🔍 Evaluar Riesgo de Diabetes", type="primary")
+
+# --- DATOS DE ENTRADA DEL MODELO ---
 input_data = {
     'HighBP': highbp,
     'HighChol': highchol,
@@ -106,94 +180,84 @@ input_data = {
     'Age': age,
     'Education': education,
     'Income': income,
-    'Índice_de_Salud_General': health_risk_index
+    'BMI': bmi  # Índice_de_Salud_General (GenHlth × BMI) lo calcula el esquema del modelo
 }
 
-# --- BOTÓN DE PREDICCIÓN ---
-if st.button("🔍 Evaluar Riesgo de Diabetes", type="primary"):
+if submitted:
     with st.spinner("Analizando tu perfil de salud..."):
         pred, prob = predict_diabetes(input_data)
-        prob_percent = prob * 100
+        contributions = explain_diabetes(input_data, top=TOP_FACTORS)
+        _, changes = what_if(input_data)
+        standing = risk_percentile(input_data, prob)
+        peers = similar_profiles(input_data)
+    # El resultado se guarda en la sesión para que no se pierda en la siguiente interacción
+    st.session_state.result = {'pred': int(pred), 'prob': float(prob), 'contributions': contributions,
+                               'what_if': changes[:WHAT_IF_ROWS], 'standing': standing, 'peers': peers}
+
+
+def show_results():
+    """Result and risk-factor section, drawn from the result stored in the session"""
+    result = st.session_state.get('result')
+    if result is not None:
+        prob_percent = result['prob'] * 100
 
         # Determinando categoria segun los rangos correspondientes
         if prob_percent <= 55:
             category = "no_diabetes"
-            message = "## ✅ No tiene diabetes"
-            color_style = "success"
-            recommendations = """
-            **Consejos:**
-            - Mantén tus hábitos saludables
-            - Realiza chequeos cada 5 años
-            """
         elif 55 < prob_percent < 85:
             category = "prediabetes"
-            message = "## ⚠️ Tiene prediabetes"
-            color_style = "warning"
-            recommendations = """
-            **Recomendaciones:**
-            - Consulte a un médico para confirmar
-            - Monitoree sus niveles de glucosa
-            - Ajuste dieta y ejercicio
-            """
-        else: 
+        else:
             category = "diabetes"
-            message = "## 🚨 Tiene diabetes"
-            color_style = "error"
-            recommendations = """
-            **Acciones urgentes:**
-            - Consulte a un médico inmediatamente
-            - Controle su dieta y medicación
-            - Realice exámenes de glucosa
-            """
-
-    st.divider()
-    st.header("🧾 Resultados del Análisis")
-
-    if color_style == "success":
-        st.success(f"{message}")
-    elif color_style == "warning":
-        st.warning(f"{message}")
-    else:
-        st.error(f"{message}")
-    
-    st.markdown(recommendations)
-
-# --- VISUALIZACIÓN DE FACTORES CLAVE ---
-st.subheader("📊 Factores de Riesgo Clave")
-
-# Create a DataFrame for the risk factors
-risk_data = {
-    'Factor': [
-        'Salud General', 
-        'Presión', 
-        'Colesterol',
-        'Actividad Física',
-        'Dieta'
-    ],
-    'Valor': [
-        genhlth,
-        1 if highbp else 0,
-        1 if highchol else 0,
-        1 if not physactivity else 0,
-        1 if not (fruits and veggies) else 0
-    ],
-    'Tipo': ['Numérico', 'Categórico', 'Categórico', 'Categórico', 'Categórico']
-}
+        message, color_style, recommendations = RESULTS[category]
+
+        with metrics.RENDER_SECONDS.time():
+            st.divider()
+            st.header("🧾 Resultados del Análisis")
+
+            if color_style == "success":
+                st.success(f"{message}")
+            elif color_style == "warning":
+                st.warning(f"{message}")
+            else:
+                st.error(f"{message}")
 
-risk_df = pd.DataFrame(risk_data)
+            st.markdown(recommendations)
 
+            # Posición en la población (índice de percentiles precalculado)
+            standing = result['standing']
+            if standing is not None:
+                line = f"Tu riesgo estimado es mayor que el de **{standing['overall']:.0f}%** de la población del BRFSS"
+                if standing['stratum'] is not None:
+                    line += f" y que el de **{standing['stratum']:.0f}%** de las personas de tu edad, sexo e ingresos."
+                st.markdown(line)
+            if result['peers'] is not None:
+                st.markdown(f"Entre las {result['peers']['k']} personas del BRFSS con respuestas más parecidas "
+                            f"a las tuyas, **{result['peers']['rate']:.0%}** tiene diabetes.")
 
-# Show categorical factors separately
-st.subheader("Factores Categóricos de Riesgo")
-categorical_df = risk_df[risk_df['Tipo'] == 'Categórico']
-if not categorical_df.empty:
-    for _, row in categorical_df.iterrows():
-        status = "⚠️ ALTO RIESGO" if row['Valor'] == 1 else "✅ BAJO RIESGO"
-        color = "#e74c3c" if row['Valor'] == 1 else "#2ecc71"
-        st.markdown(f"<span style='color:{color}; font-weight:bold'>{row['Factor']}: {status}</span>", 
-                    unsafe_allow_html=True)
-else:
-    st.info("No se identificaron factores categóricos de riesgo")
+            # --- VISUALIZACIÓN DE FACTORES CLAVE ---
+            # Contribuciones del modelo (TreeSHAP) para este perfil, de mayor a menor peso
+            st.subheader("📊 Factores de Riesgo Clave")
+            st.caption("Positivo: sube tu riesgo estimado. Negativo: lo baja (contribución en log-odds).")
+            for feature, value in result['contributions']:
+                status = "⚠️ SUBE EL RIESGO" if value > 0 else "✅ BAJA EL RIESGO"
+                color = "#e74c3c" if value > 0 else "#2ecc71"
+                st.markdown(f"<span style='color:{color}; font-weight:bold'>{FEATURE_EXPLANATIONS.get(feature, feature)}: "
+                            f"{status} ({value:+.2f})</span>", unsafe_allow_html=True)
+
+            # --- ¿QUÉ PASARÍA SI...? (todos los cambios evaluados en un solo lote) ---
+            st.subheader("🔄 ¿Qué pasaría si...?")
+            st.caption("Riesgo estimado al cambiar una sola respuesta, de mayor a menor reducción.")
+            st.dataframe([
+                {
+                    "Cambio": change_label(row),
+                    "Riesgo": f"{row['proba'] * 100:.1f}%",
+                    "Diferencia": f"{row['delta'] * 100:+.1f} pp",
+                }
+                for row in result['what_if']
+            ], hide_index=True, use_container_width=True)
+
+
+show_results()
 
 # Move the disclaimer outside the if-else blocks
 st.info("""
@@ -211,4 +275,4 @@ st.sidebar.markdown("""
 - Actividad Física
 - Hipertensión
 - Dieta y colesterol
-""")
\ No newline at end of file
+""")
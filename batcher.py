@@ -0,0 +1,215 @@
+"""Micro-batching of concurrent single-row predictions.
+
+Streamlit runs every session in its own thread, so under load many
+predict_diabetes calls arrive at the same time. MicroBatcher queues them,
+waits at most `max_wait` seconds after the first request (or until
+`max_batch` requests are queued), scores them with one batched call and
+resolves each caller's future.
+
+utils.predict_diabetes goes through a shared batcher when it is enabled
+with utils.enable_batching() or DIABETES_BATCH_WINDOW_MS (read by
+utils.configure_from_env()).
+
+The batcher thread never dies on an error: requests cancelled by their
+caller are skipped, and an unexpected exception while scoring a group is
+set on that group's futures. predict() waits at most PREDICT_TIMEOUT seconds.
+
+Metric labels (app/lang) live in each caller's context, but the rows are
+scored on the batcher thread: every request carries its caller's labels, and
+each batch is scored in one call per label set, inside a context with those
+labels, so per-app and per-language metrics stay correct.
+
+Uso:
+    python batcher.py --threads 1,8,32 --seconds 5     # p50/p99 with and without batching
+"""
+import argparse
+import contextvars
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+import metrics
+
+# Espera máxima de predict() por defecto, en segundos
+PREDICT_TIMEOUT = 30.0
+
+
+class MicroBatcher:
+    """Collects rows from many threads and scores them together on one thread"""
+
+    def __init__(self, score, max_batch=64, max_wait=0.002):
+        self.score = score
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one input dict; the future resolves to (label, probability)"""
+        future = Future()
+        labels = metrics.get_labels()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("El batcher está cerrado")
+            self._queue.append((row, future, time.perf_counter(), labels))
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def predict(self, row, timeout=PREDICT_TIMEOUT):
+        future = self.submit(row)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            # Si todavía está en la cola ya no se puntúa
+            future.cancel()
+            raise
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _take(self):
+        """Wait for the next batch: up to max_batch rows, at most max_wait after the first.
+
+        Returns (batch, queue depth), or (None, 0) once closed and drained.
+        """
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None, 0
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            depth = len(self._queue)
+            n = min(depth, self.max_batch)
+            return [self._queue.popleft() for _ in range(n)], depth
+
+    def _run(self):
+        while True:
+            batch, depth = self._take()
+            if batch is None:
+                return
+            # Las peticiones canceladas no se puntúan; las demás ya no se pueden cancelar
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            try:
+                self._score_batch(batch, depth)
+            except BaseException as e:
+                # Nada debe detener este hilo: quien espera recibe el error
+                _fail([future for _, future, _, _ in batch], e)
+
+    def _score_batch(self, batch, depth):
+        metrics.BATCH_QUEUE_DEPTH.observe(depth)
+        now = time.perf_counter()
+        for _, _, queued_at, _ in batch:
+            metrics.BATCH_WAIT_SECONDS.observe(now - queued_at)
+        metrics.BATCH_SIZE.observe(len(batch))
+        # Una llamada por juego de etiquetas, con las etiquetas de quienes pidieron
+        groups = {}
+        for row, future, _, labels in batch:
+            groups.setdefault(tuple(sorted(labels.items())), []).append((row, future))
+        for labels, requests in groups.items():
+            try:
+                contextvars.Context().run(self._score_group, dict(labels), requests)
+            except BaseException as e:
+                _fail([future for _, future in requests], e)
+
+    def _score_group(self, labels, requests):
+        metrics.set_labels(**labels)
+        try:
+            preds, probas = self.score([row for row, _ in requests])
+        except Exception:
+            # Una fila inválida no debe hacer fallar a las demás: se puntúan por separado
+            for row, future in requests:
+                self._resolve_one(row, future)
+            return
+        for (_, future), pred, proba in zip(requests, preds, probas):
+            future.set_result((pred, proba))
+
+    def _resolve_one(self, row, future):
+        try:
+            preds, probas = self.score([row])
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result((preds[0], probas[0]))
+
+
+def _fail(futures, error):
+    """Set `error` on the futures that are still unresolved"""
+    for future in futures:
+        if not future.done():
+            future.set_exception(error)
+
+
+def load_test(threads, seconds, batched, max_batch=64, max_wait=0.002):
+    """Latency of predict_diabetes with `threads` concurrent callers"""
+    import utils
+    from bench import sample_profiles
+
+    if batched:
+        utils.enable_batching(max_batch, max_wait)
+    else:
+        utils.disable_batching()
+    # Sin caché, para medir el modelo y no los aciertos de la caché
+    cache = utils._cache
+    utils._cache = None
+    profiles = sample_profiles(5000)
+    latencies = [[] for _ in range(threads)]
+    stop = time.perf_counter() + seconds
+
+    def caller(i):
+        j = i
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            utils.predict_diabetes(profiles[j % len(profiles)])
+            latencies[i].append(time.perf_counter() - start)
+            j += threads
+
+    utils.load_model()
+    workers = [threading.Thread(target=caller, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    utils._cache = cache
+    utils.disable_batching()
+
+    all_latencies = np.concatenate([np.asarray(l) for l in latencies])
+    p50, p99 = np.percentile(all_latencies, [50, 99]) * 1000
+    return {'threads': threads, 'batched': batched, 'requests': len(all_latencies),
+            'p50_ms': p50, 'p99_ms': p99, 'throughput_per_s': len(all_latencies) / seconds}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent predict_diabetes latency with and without micro-batching")
+    parser.add_argument('--threads', type=lambda s: tuple(int(x) for x in s.split(',')), default=(1, 8, 32))
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    args = parser.parse_args(argv)
+
+    print(f"{'hilos':>5s} {'batching':>8s} {'peticiones':>10s} {'p50 ms':>8s} {'p99 ms':>8s} {'pet/s':>10s}")
+    for threads in args.threads:
+        for batched in (False, True):
+            r = load_test(threads, args.seconds, batched, args.max_batch, args.window_ms / 1000)
+            print(f"{r['threads']:5d} {'sí' if batched else 'no':>8s} {r['requests']:10d} "
+                  f"{r['p50_ms']:8.3f} {r['p99_ms']:8.3f} {r['throughput_per_s']:10,.0f}")
+    sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
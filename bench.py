@@ -0,0 +1,219 @@
+"""Benchmarks for the prediction and UI hot paths.
+
+Uso:
+    python bench.py                                   # run and print
+    python bench.py -o bench_results.json             # also write JSON
+    python bench.py --save-baseline benchmarks/baseline.json
+    python bench.py --baseline benchmarks/baseline.json --threshold 0.15
+
+Each scenario reports p50/p95/p99 latency, throughput and peak traced
+memory. With --baseline, the run fails (exit code 1) when a scenario's p50 or
+p95 is slower than the baseline by more than --threshold.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import utils
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+SAMPLE_PROFILE = {
+    'HighBP': 1, 'HighChol': 0, 'CholCheck': 1, 'Smoker': 0, 'Stroke': 0,
+    'HeartDiseaseorAttack': 0, 'PhysActivity': 1, 'Fruits': 1, 'Veggies': 1,
+    'HvyAlcoholConsump': 0, 'AnyHealthcare': 1, 'NoDocbcCost': 0, 'GenHlth': 3,
+    'MentHlth': 2, 'PhysHlth': 0, 'DiffWalk': 0, 'Sex': 1, 'Age': 9,
+    'Education': 5, 'Income': 6, 'BMI': 27.5,
+}
+
+
+def sample_profiles(n, seed=42):
+    """Random valid input dicts (same keys as the apps send)"""
+    rng = np.random.default_rng(seed)
+    binaries = ['HighBP', 'HighChol', 'CholCheck', 'Smoker', 'Stroke', 'HeartDiseaseorAttack',
+                'PhysActivity', 'Fruits', 'Veggies', 'HvyAlcoholConsump', 'AnyHealthcare',
+                'NoDocbcCost', 'DiffWalk', 'Sex']
+    columns = {name: rng.integers(0, 2, n) for name in binaries}
+    columns.update(
+        GenHlth=rng.integers(1, 6, n),
+        MentHlth=rng.integers(0, 31, n),
+        PhysHlth=rng.integers(0, 31, n),
+        Age=rng.integers(1, 14, n),
+        Education=rng.integers(1, 7, n),
+        Income=rng.integers(1, 9, n),
+        BMI=np.round(rng.uniform(15, 45, n), 1),
+    )
+    names = list(columns)
+    return [{name: columns[name][i].item() for name in names} for i in range(n)]
+
+
+def measure(fn, repeats, warmup=3, items=1):
+    """Run fn repeatedly and summarize latency, throughput and peak memory"""
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    tracemalloc.start()
+    latencies = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies[i] = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'repeats': repeats,
+        'items_per_call': items,
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'mean_ms': latencies.mean() * 1000,
+        'throughput_per_s': items * repeats / latencies.sum(),
+        'peak_traced_mb': peak / 2 ** 20,
+    }
+
+
+def bench_model(repeats, batch_sizes):
+    results = {}
+    # Carga en frío: deserializar el artefacto sin pasar por el registro
+    results['load_model_cold'] = measure(lambda: utils._read_model(utils.model_path()),
+                                         max(repeats // 50, 5), warmup=1)
+    results['load_model_warm'] = measure(utils.load_model, repeats)
+
+    # Sin caché de predicciones, para medir el modelo y no los aciertos de la caché
+    cache = utils._cache
+    utils._cache = None
+    try:
+        results['predict_diabetes'] = measure(lambda: utils.predict_diabetes(SAMPLE_PROFILE), repeats)
+        profiles = sample_profiles(max(batch_sizes))
+        for size in batch_sizes:
+            batch = profiles[:size]
+            n = max(min(repeats, 20000 // size), 5)
+            results[f'predict_batch_{size}'] = measure(lambda: utils.predict_diabetes_batch(batch), n, items=size)
+    finally:
+        utils._cache = cache
+    # Perfil repetido con la caché activa (si está configurada)
+    if cache is not None:
+        results['predict_diabetes_cached'] = measure(lambda: utils.predict_diabetes(SAMPLE_PROFILE), repeats)
+
+    # Contribuciones: perfil repetido (caché) y lote de 100 perfiles sin caché
+    results['explain_diabetes'] = measure(lambda: utils.explain_diabetes(SAMPLE_PROFILE), repeats)
+    batch = profiles[:100]
+    results['explain_batch_100_uncached'] = measure(
+        lambda: (utils._explain_cache.clear(), utils.explain_diabetes_batch(batch)), max(repeats // 10, 5), items=100)
+
+    # Percentil en la población (solo si se construyó el índice para este modelo)
+    import percentiles
+    if percentiles.get_index() is not None:
+        results['risk_percentile'] = measure(lambda: percentiles.risk_percentile(SAMPLE_PROFILE, 0.42), repeats)
+
+    # Vecinos más parecidos (solo si se construyó el índice)
+    import neighbors
+    if neighbors.get_index() is not None:
+        results['similar_profiles'] = measure(lambda: neighbors.similar_profiles(SAMPLE_PROFILE), repeats)
+    return results
+
+
+def bench_app(script, repeats):
+    """Full script reruns of a Streamlit app through AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(HERE, script), default_timeout=60)
+    at.run()
+    return measure(at.run, repeats, warmup=2)
+
+
+def compare(results, baseline, threshold):
+    """Scenarios whose p50 or p95 regressed by more than `threshold`"""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if base[metric] > 0 and current[metric] > base[metric] * (1 + threshold):
+                regressions.append({
+                    'scenario': name,
+                    'metric': metric,
+                    'baseline': base[metric],
+                    'current': current[metric],
+                    'change': current[metric] / base[metric] - 1,
+                })
+    return regressions
+
+
+def run(repeats=500, batch_sizes=DEFAULT_BATCH_SIZES, app_repeats=20, apps=('app2.py',)):
+    scenarios = bench_model(repeats, batch_sizes)
+    for script in apps:
+        scenarios[f'rerun_{os.path.splitext(script)[0]}'] = bench_app(script, app_repeats)
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'engine': utils.get_engine(),
+        'model_version': utils.model_stats()['version'],
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'scenarios': scenarios,
+    }
+
+
+def print_table(results, file=sys.stdout):
+    print(f"{'escenario':28s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'items/s':>12s} {'pico MB':>8s}", file=file)
+    for name, r in results['scenarios'].items():
+        print(f"{name:28s} {r['p50_ms']:9.3f} {r['p95_ms']:9.3f} {r['p99_ms']:9.3f} "
+              f"{r['throughput_per_s']:12,.0f} {r['peak_traced_mb']:8.2f}", file=file)
+    print(f"RSS máximo del proceso: {results['max_rss_mb']:.1f} MB", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the diabetes model and Streamlit hot paths")
+    parser.add_argument('-o', '--output', help="write results as JSON")
+    parser.add_argument('--repeats', type=int, default=500)
+    parser.add_argument('--batch-sizes', type=lambda s: tuple(int(x) for x in s.split(',')),
+                        default=DEFAULT_BATCH_SIZES, help="comma-separated, e.g. 1,100,10000")
+    parser.add_argument('--app-repeats', type=int, default=20)
+    parser.add_argument('--apps', default='app2.py', help="comma-separated scripts to rerun ('' to skip)")
+    parser.add_argument('--engine', choices=utils.ENGINES, default=None)
+    parser.add_argument('--baseline', help="JSON from a previous run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    parser.add_argument('--save-baseline', help="write these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    if args.engine:
+        utils.set_engine(args.engine)
+    apps = tuple(a for a in args.apps.split(',') if a)
+    results = run(args.repeats, args.batch_sizes, args.app_repeats, apps)
+    print_table(results)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESIÓN {r['scenario']} {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ms "
+                  f"({r['change']:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
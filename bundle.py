@@ -0,0 +1,193 @@
+"""Versioned native model bundle.
+
+A bundle is a directory with:
+    model.ubj       booster in XGBoost's native UBJSON format
+    manifest.json   ordered features, feature engineering, metrics, params
+                    and the SHA-256 of model.ubj
+
+Loading reads the booster directly with xgboost.Booster, without pickle or
+the sklearn wrapper, so it does not depend on the exact sklearn version and
+is safe to load from untrusted storage.
+
+Uso:
+    python bundle.py export models/modelo_optimo_1.0_9_100_7_0.01_0.7_42.sav models/bundle_1.0
+    python bundle.py benchmark models/modelo_optimo_1.0_9_100_7_0.01_0.7_42.sav models/bundle_1.0
+"""
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+BUNDLE_FORMAT = 1
+MANIFEST_NAME = 'manifest.json'
+BOOSTER_NAME = 'model.ubj'
+
+# Ingeniería de características usada en el entrenamiento (celda 15 del notebook)
+FEATURE_ENGINEERING = {
+    'derived': {
+        'Índice_de_Salud_General': {'op': 'multiply', 'inputs': ['GenHlth', 'BMI']},
+    },
+    'dropped': ['BMI'],
+}
+
+
+def is_bundle(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_NAME))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def export_bundle(model, out_dir, metrics=None, params=None, name=None, lineage=None):
+    """Write `model` (XGBClassifier or Booster) as a bundle in out_dir.
+
+    `lineage` records where the model came from (e.g. the parent version and
+    the data of an incremental update, see incremental.py).
+
+    The manifest is written last and atomically, so a reader never sees a
+    manifest that points to a half-written booster.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    if params is None and hasattr(model, 'get_xgb_params'):
+        params = {k: v for k, v in model.get_xgb_params().items() if v is not None}
+
+    os.makedirs(out_dir, exist_ok=True)
+    booster_path = os.path.join(out_dir, BOOSTER_NAME)
+    tmp_path = booster_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(booster.save_raw(raw_format='ubj'))
+    os.replace(tmp_path, booster_path)
+
+    import xgboost
+    checksum = _sha256(booster_path)
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'name': name or os.path.basename(os.path.normpath(out_dir)),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'xgboost_version': xgboost.__version__,
+        'booster': BOOSTER_NAME,
+        'checksum': checksum,
+        'features': list(booster.feature_names or []),
+        'feature_engineering': FEATURE_ENGINEERING,
+        'num_trees': booster.num_boosted_rounds(),
+        'metrics': metrics or {},
+        'params': params or {},
+        'lineage': lineage or {},
+    }
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return manifest
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_bundle(path, verify=True):
+    """Return (xgboost.Booster, manifest) for the bundle in `path`"""
+    import xgboost
+
+    manifest = read_manifest(path)
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Formato de bundle no soportado: {manifest.get('format')}")
+    booster_path = os.path.join(path, manifest['booster'])
+    with open(booster_path, 'rb') as f:
+        raw = f.read()
+    if verify and hashlib.sha256(raw).hexdigest() != manifest['checksum']:
+        raise ValueError(f"Checksum inválido para {booster_path}")
+
+    booster = xgboost.Booster()
+    booster.load_model(bytearray(raw))
+    if manifest['features']:
+        booster.feature_names = manifest['features']
+    return booster, manifest
+
+
+def export_from_pickle(sav_path, out_dir, metrics=None):
+    """Convert an existing .sav (pickled XGBClassifier) into a bundle"""
+    import pickle
+
+    with open(sav_path, 'rb') as f:
+        model = pickle.load(f)
+    return export_bundle(model, out_dir, metrics=metrics)
+
+
+_PROBE = r"""
+import json, resource, sys, time
+start = time.perf_counter()
+kind, path = sys.argv[1], sys.argv[2]
+if kind == 'pickle':
+    import pickle
+    with open(path, 'rb') as f:
+        model = pickle.load(f)
+else:
+    sys.path.insert(0, sys.argv[3])
+    from bundle import load_bundle
+    model, _ = load_bundle(path)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def benchmark(sav_path, bundle_path, repeats=5):
+    """Cold-start load time and peak RSS of the .sav vs the bundle, each
+    measured in a fresh interpreter."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for kind, path in (('pickle', sav_path), ('bundle', bundle_path)):
+        runs = []
+        for _ in range(repeats):
+            out = subprocess.run([sys.executable, '-c', _PROBE, kind, path, here],
+                                 check=True, capture_output=True, text=True)
+            runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        seconds = sorted(r['seconds'] for r in runs)
+        results[kind] = {
+            'median_seconds': seconds[len(seconds) // 2],
+            'min_seconds': seconds[0],
+            'max_rss_mb': max(r['max_rss_mb'] for r in runs),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and benchmark native model bundles")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    exp = sub.add_parser('export', help="convert a pickled model (.sav) into a bundle")
+    exp.add_argument('sav')
+    exp.add_argument('out_dir')
+    exp.add_argument('--metrics', help="JSON file with evaluation metrics to store in the manifest")
+
+    bench = sub.add_parser('benchmark', help="compare cold-start load time and memory")
+    bench.add_argument('sav')
+    bench.add_argument('bundle')
+    bench.add_argument('--repeats', type=int, default=5)
+
+    args = parser.parse_args(argv)
+    if args.command == 'export':
+        metrics = None
+        if args.metrics:
+            with open(args.metrics, encoding='utf-8') as f:
+                metrics = json.load(f)
+        manifest = export_from_pickle(args.sav, args.out_dir, metrics)
+        print(json.dumps({k: manifest[k] for k in ('name', 'checksum', 'num_trees')}, indent=2))
+    else:
+        results = benchmark(args.sav, args.bundle, args.repeats)
+        for kind, r in results.items():
+            print(f"{kind:7s} carga {r['median_seconds'] * 1000:8.1f} ms (mediana), "
+                  f"RSS máx {r['max_rss_mb']:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""Smaller and faster variants of the served model, with a recall guard.
+
+Variants:
+    truncate:N    the first N boosting rounds
+    prune:F       keep the fraction F of trees with the highest total gain
+                  (in their original order)
+    distill:DxN   a new depth-D, N-tree ensemble trained on the current
+                  model's probabilities (soft labels) over the training split
+
+Each variant is evaluated against the current model on the notebook's
+stratified test split (recall, accuracy, agreement with the current model,
+single-row latency, batch throughput and size). --export writes the chosen
+variant as a bundle only if its recall is within --tolerance of the current
+model's.
+
+Uso:
+    python compaction.py --truncate 25,50,75 --prune 0.5 --distill 3x100,4x60
+    python compaction.py --truncate 50 --export truncate:50 --out models/bundle_truncate_50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from tree_engine import TreeEnsemble
+from utils import get_booster, load_model, model_path as served_model_path
+
+
+def truncate(booster, rounds):
+    """First `rounds` boosting rounds of the booster"""
+    return booster[:rounds]
+
+
+def tree_gains(booster):
+    """Total split gain (sum of loss_change) of each tree"""
+    model = json.loads(bytes(booster.save_raw(raw_format='json')))
+    trees = model['learner']['gradient_booster']['model']['trees']
+    return np.array([
+        sum(gain for gain, left in zip(t['loss_changes'], t['left_children']) if left != -1)
+        for t in trees
+    ])
+
+
+def prune(booster, keep):
+    """Booster with only the `keep` fraction of trees with the highest gain"""
+    import xgboost
+
+    model = json.loads(bytes(booster.save_raw(raw_format='json')))
+    gbm = model['learner']['gradient_booster']['model']
+    gains = tree_gains(booster)
+    n_keep = max(1, int(round(len(gains) * keep)))
+    kept = np.sort(np.argsort(-gains, kind='stable')[:n_keep])
+
+    trees = [gbm['trees'][i] for i in kept]
+    for new_id, tree in enumerate(trees):
+        tree['id'] = new_id
+    gbm['trees'] = trees
+    gbm['tree_info'] = [0] * len(trees)
+    gbm['gbtree_model_param']['num_trees'] = str(len(trees))
+    if 'iteration_indptr' in gbm:
+        gbm['iteration_indptr'] = list(range(len(trees) + 1))
+
+    pruned = xgboost.Booster()
+    pruned.load_model(bytearray(json.dumps(model).encode('utf-8')))
+    pruned.feature_names = booster.feature_names
+    return pruned
+
+
+def distill(booster, X_train, depth, rounds, learning_rate=0.1, nthread=None):
+    """Shallower ensemble trained on the booster's probabilities"""
+    import xgboost
+
+    soft_labels = booster.inplace_predict(np.ascontiguousarray(X_train, dtype=np.float32))
+    params = {
+        'objective': 'binary:logistic',
+        'max_depth': depth,
+        'learning_rate': learning_rate,
+        'tree_method': 'hist',
+        'seed': 42,
+    }
+    if nthread:
+        params['nthread'] = nthread
+    dtrain = xgboost.DMatrix(X_train, label=soft_labels)
+    return xgboost.train(params, dtrain, num_boost_round=rounds)
+
+
+def build_variant(spec, booster, X_train):
+    """Variant from a spec such as 'truncate:50', 'prune:0.5' or 'distill:3x100'"""
+    kind, _, arg = spec.partition(':')
+    if kind == 'truncate':
+        return truncate(booster, int(arg))
+    if kind == 'prune':
+        return prune(booster, float(arg))
+    if kind == 'distill':
+        depth, rounds = (int(x) for x in arg.split('x'))
+        return distill(booster, X_train, depth, rounds)
+    raise ValueError(f"Variante desconocida: {spec}")
+
+
+def _latency(booster, X, repeats=300):
+    """Median single-row latency (µs) and batch throughput (rows/s)"""
+    row = np.ascontiguousarray(X[:1])
+    for _ in range(10):
+        booster.inplace_predict(row)
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        booster.inplace_predict(row)
+        times[i] = time.perf_counter() - start
+    batch = []
+    for _ in range(3):
+        start = time.perf_counter()
+        booster.inplace_predict(X)
+        batch.append(time.perf_counter() - start)
+    return float(np.median(times) * 1e6), len(X) / min(batch)
+
+
+def evaluate(booster, X_test, y_test, reference=None):
+    """Recall, accuracy, agreement with `reference` labels, latency and size"""
+    from sklearn.metrics import accuracy_score, recall_score
+
+    proba = booster.inplace_predict(X_test)
+    pred = (proba > 0.5).astype(int)
+    single_us, rows_per_s = _latency(booster, X_test)
+    ensemble = TreeEnsemble.from_booster(booster)
+    return {
+        'trees': booster.num_boosted_rounds(),
+        'max_depth': ensemble.max_depth,
+        'recall': float(recall_score(y_test, pred)),
+        'accuracy': float(accuracy_score(y_test, pred)),
+        'agreement': float(np.mean(pred == reference)) if reference is not None else 1.0,
+        'single_row_us': single_us,
+        'batch_rows_per_s': rows_per_s,
+        'model_kb': len(booster.save_raw(raw_format='ubj')) / 1024,
+        'nodes': len(ensemble.value),
+    }, pred
+
+
+def compare(specs, model_path=None, data_path=None):
+    """Evaluate the current model and each variant; returns (report, variants)"""
+    from data import DATA_PATH, add_health_index, load_brfss, split_brfss
+
+    booster = get_booster(load_model(model_path or served_model_path()))
+    X_train, X_test, y_train, y_test = split_brfss(add_health_index(load_brfss(data_path or DATA_PATH)))
+    features = list(booster.feature_names)
+    X_train = np.ascontiguousarray(X_train[features], dtype=np.float32)
+    X_test = np.ascontiguousarray(X_test[features], dtype=np.float32)
+    y_test = np.asarray(y_test)
+
+    base, reference = evaluate(booster, X_test, y_test)
+    report = {'current': base}
+    variants = {}
+    for spec in specs:
+        variant = build_variant(spec, booster, X_train)
+        variant.feature_names = features
+        variants[spec] = variant
+        report[spec], _ = evaluate(variant, X_test, y_test, reference)
+    return report, variants
+
+
+def print_report(report, file=sys.stdout):
+    base = report['current']
+    print(f"{'variante':16s} {'árboles':>7s} {'prof':>4s} {'recall':>7s} {'Δrecall':>8s} {'accuracy':>8s} "
+          f"{'acuerdo':>7s} {'1 fila µs':>9s} {'filas/s':>11s} {'KB':>7s}", file=file)
+    for name, r in report.items():
+        print(f"{name:16s} {r['trees']:7d} {r['max_depth']:4d} {r['recall']:7.4f} "
+              f"{r['recall'] - base['recall']:+8.4f} {r['accuracy']:8.4f} {r['agreement']:7.2%} "
+              f"{r['single_row_us']:9.1f} {r['batch_rows_per_s']:11,.0f} {r['model_kb']:7.1f}", file=file)
+
+
+def main(argv=None):
+    from bundle import export_bundle
+
+    split = lambda s: [x for x in s.split(',') if x]
+    parser = argparse.ArgumentParser(description="Build and evaluate compacted variants of the served model")
+    parser.add_argument('--model', help="model to compact (default: the one served by utils)")
+    parser.add_argument('--data', help="BRFSS CSV (default: data.DATA_PATH)")
+    parser.add_argument('--truncate', type=split, default=[], help="rounds to keep, e.g. 25,50,75")
+    parser.add_argument('--prune', type=split, default=[], help="fractions of trees to keep, e.g. 0.5,0.75")
+    parser.add_argument('--distill', type=split, default=[], help="depth x trees, e.g. 3x100,4x60")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="max recall drop allowed for --export")
+    parser.add_argument('--export', help="variant to export, e.g. truncate:50")
+    parser.add_argument('--out', help="bundle directory for --export")
+    parser.add_argument('-o', '--output', help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    specs = ([f'truncate:{n}' for n in args.truncate] + [f'prune:{f}' for f in args.prune]
+             + [f'distill:{d}' for d in args.distill])
+    if args.export and args.export not in specs:
+        specs.append(args.export)
+    if args.export and not args.out:
+        parser.error("--export requires --out")
+
+    report, variants = compare(specs, args.model, args.data)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.export:
+        drop = report['current']['recall'] - report[args.export]['recall']
+        if drop > args.tolerance:
+            print(f"No se exporta {args.export}: el recall baja {drop:.4f} (tolerancia {args.tolerance})",
+                  file=sys.stderr)
+            sys.exit(1)
+        export_bundle(variants[args.export], args.out,
+                      metrics=dict(report[args.export]),
+                      lineage={'parent': os.path.basename(os.path.realpath(args.model or served_model_path())),
+                               'compaction': args.export, 'recall_drop': drop})
+        print(f"Variante {args.export} exportada en {args.out}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
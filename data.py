@@ -0,0 +1,164 @@
+"""BRFSS 2015 diabetes dataset with compact dtypes and a columnar cache.
+
+The CSV stores every column as float64 text, but almost all of them are 0/1
+flags or small ordinals. load_brfss() parses the file once, keeps uint8
+columns and a float32 BMI, and saves one .npy file per column next to the CSV.
+Later loads read that cache directly (it is rebuilt if the CSV changes).
+
+Uso:
+    from data import load_brfss, add_health_index, split_brfss
+    df = add_health_index(load_brfss())
+    X_train, X_test, y_train, y_test = split_brfss(df)
+
+    python data.py              # build the cache and print memory/time
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(HERE, 'diabetes_binary_health_indicators_BRFSS2015.csv')
+CACHE_DIR = os.path.join(HERE, '.brfss_cache')
+CACHE_FORMAT = 1
+
+TARGET = 'Diabetes_binary'
+HEALTH_INDEX = 'Índice_de_Salud_General'
+
+# Tipos compactos: todo cabe en uint8 salvo BMI
+DTYPES = {
+    'Diabetes_binary': np.uint8,
+    'HighBP': np.uint8,
+    'HighChol': np.uint8,
+    'CholCheck': np.uint8,
+    'BMI': np.float32,
+    'Smoker': np.uint8,
+    'Stroke': np.uint8,
+    'HeartDiseaseorAttack': np.uint8,
+    'PhysActivity': np.uint8,
+    'Fruits': np.uint8,
+    'Veggies': np.uint8,
+    'HvyAlcoholConsump': np.uint8,
+    'AnyHealthcare': np.uint8,
+    'NoDocbcCost': np.uint8,
+    'GenHlth': np.uint8,
+    'MentHlth': np.uint8,
+    'PhysHlth': np.uint8,
+    'DiffWalk': np.uint8,
+    'Sex': np.uint8,
+    'Age': np.uint8,
+    'Education': np.uint8,
+    'Income': np.uint8,
+}
+
+
+def _cache_dir(path):
+    return os.path.join(CACHE_DIR, os.path.splitext(os.path.basename(path))[0])
+
+
+def _source_signature(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def parse_csv(path=DATA_PATH):
+    """Parse the CSV with compact dtypes (no cache)"""
+    # Los valores vienen como "1.0": se leen en float32 y luego se reducen
+    df = pd.read_csv(path, dtype=np.float32)
+    for column, dtype in DTYPES.items():
+        if column in df.columns and dtype != np.float32:
+            values = df[column].to_numpy()
+            if not np.array_equal(values, np.round(values)) or values.min() < 0 or values.max() > 255:
+                raise ValueError(f"La columna {column} no cabe en {np.dtype(dtype).name}")
+            df[column] = values.astype(dtype)
+    return df
+
+
+def _write_cache(df, path):
+    directory = _cache_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    for i, column in enumerate(df.columns):
+        np.save(os.path.join(directory, f'{i:02d}.npy'), df[column].to_numpy())
+    meta = {'format': CACHE_FORMAT, 'columns': list(df.columns), 'source': _source_signature(path)}
+    # El meta se escribe al final: un caché a medio escribir no es válido
+    tmp = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(directory, 'meta.json'))
+
+
+def _read_cache(path):
+    directory = _cache_dir(path)
+    try:
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != CACHE_FORMAT or meta.get('source') != _source_signature(path):
+        return None
+    columns = {c: np.load(os.path.join(directory, f'{i:02d}.npy')) for i, c in enumerate(meta['columns'])}
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_brfss(path=DATA_PATH, cache=True):
+    """BRFSS dataset as a compact DataFrame (uint8 columns, float32 BMI)"""
+    if cache:
+        df = _read_cache(path)
+        if df is not None:
+            return df
+    df = parse_csv(path)
+    if cache:
+        _write_cache(df, path)
+    return df
+
+
+def add_health_index(df, drop_bmi=True):
+    """Engineered feature from notebook cell 15: GenHlth * BMI (float32)"""
+    df = df.copy(deep=False)
+    df[HEALTH_INDEX] = df['GenHlth'].to_numpy(np.float32) * df['BMI'].to_numpy(np.float32)
+    if drop_bmi:
+        df = df.drop(columns=['BMI'])
+    return df
+
+
+def split_brfss(df, test_size=0.2, random_state=42):
+    """Stratified split with the notebook's parameters (cell 17)"""
+    from sklearn.model_selection import train_test_split
+
+    X = df.drop(TARGET, axis=1)
+    y = df[TARGET]
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the BRFSS columnar cache and report memory and load time")
+    parser.add_argument('path', nargs='?', default=DATA_PATH)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    baseline = pd.read_csv(args.path)
+    csv_seconds = time.perf_counter() - start
+    baseline_mb = baseline.memory_usage(deep=True).sum() / 2 ** 20
+    del baseline
+
+    start = time.perf_counter()
+    df = load_brfss(args.path, cache=False)
+    parse_seconds = time.perf_counter() - start
+    _write_cache(df, args.path)
+
+    start = time.perf_counter()
+    df = load_brfss(args.path)
+    cached_seconds = time.perf_counter() - start
+    compact_mb = df.memory_usage(deep=True).sum() / 2 ** 20
+
+    print(f"Filas: {len(df):,}, columnas: {df.shape[1]}")
+    print(f"pd.read_csv (float64):  {csv_seconds:6.2f} s  {baseline_mb:7.1f} MB")
+    print(f"parse compacto:         {parse_seconds:6.2f} s  {compact_mb:7.1f} MB")
+    print(f"desde caché:            {cached_seconds:6.3f} s")
+
+
+if __name__ == '__main__':
+    main()
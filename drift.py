@@ -0,0 +1,257 @@
+"""Input drift monitor: live feature histograms against the BRFSS 2015 reference.
+
+The reference profile gives each model feature a fixed set of bins: one bin
+per value for flags and small ordinals, and reference deciles for continuous
+features. It also stores the share of the BRFSS rows in each bin. The
+monitor adds every scored batch to a (features x MAX_BINS) count matrix, so
+memory is constant however many rows it sees. A background thread takes a
+snapshot every `interval` seconds: PSI and KL divergence per feature for the
+last window and since start. It appends the snapshot as one JSON line, so the
+request path only pays for one np.bincount.
+
+utils.predict_diabetes_batch feeds the monitor when it is enabled with
+utils.enable_drift_monitor() or DIABETES_DRIFT_LOG, which the apps, server.py
+and score_csv.py read through utils.configure_from_env(). Each process keeps
+its own counts: with server.py --workers N every worker appends its own
+snapshots, told apart by the `pid` field.
+
+Uso:
+    python drift.py reference                                # models/drift/reference.json
+    python drift.py replay scores.csv --window 50000         # score_csv.py --keep-columns output
+    DIABETES_DRIFT_LOG=models/drift/snapshots.jsonl streamlit run app2.py
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+DRIFT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'drift')
+REFERENCE_PATH = os.environ.get('DIABETES_DRIFT_REFERENCE', os.path.join(DRIFT_DIR, 'reference.json'))
+REFERENCE_FORMAT = 1
+
+MAX_BINS = 32
+QUANTILE_BINS = 10
+EPSILON = 1e-4
+
+# PSI >= 0.1: cambio moderado; >= 0.25: cambio importante
+PSI_WARN = 0.1
+PSI_ALERT = 0.25
+
+
+def _edges(values):
+    """Bin edges: one bin per value if there are few, reference deciles otherwise"""
+    unique = np.unique(values)
+    if len(unique) <= MAX_BINS:
+        return (unique[:-1] + unique[1:]) / 2
+    return np.unique(np.quantile(values, np.linspace(0, 1, QUANTILE_BINS + 1)[1:-1]))
+
+
+def _padded(edges):
+    """(features, MAX_BINS - 1) edge matrix; unused edges are +inf"""
+    out = np.full((len(edges), MAX_BINS - 1), np.inf, dtype=np.float32)
+    for f, e in enumerate(edges):
+        out[f, :len(e)] = e
+    return out
+
+
+def bin_counts(X, edges):
+    """(features, MAX_BINS) histogram of the rows of X with the padded edges"""
+    n_features = edges.shape[0]
+    bins = np.empty(X.shape, dtype=np.int64)
+    for f in range(n_features):
+        bins[:, f] = np.searchsorted(edges[f], X[:, f], side='right') + f * MAX_BINS
+    return np.bincount(bins.ravel(), minlength=n_features * MAX_BINS).reshape(n_features, MAX_BINS)
+
+
+def psi(actual, expected):
+    """Population stability index of each row of two histograms (counts or shares)"""
+    p = np.clip(actual / np.maximum(actual.sum(axis=-1, keepdims=True), 1), EPSILON, None)
+    q = np.clip(expected / np.maximum(expected.sum(axis=-1, keepdims=True), 1e-12), EPSILON, None)
+    return ((p - q) * np.log(p / q)).sum(axis=-1)
+
+
+def kl(actual, expected):
+    """KL divergence KL(actual || expected) of each row of two histograms"""
+    p = np.clip(actual / np.maximum(actual.sum(axis=-1, keepdims=True), 1), EPSILON, None)
+    q = np.clip(expected / np.maximum(expected.sum(axis=-1, keepdims=True), 1e-12), EPSILON, None)
+    return (p * np.log(p / q)).sum(axis=-1)
+
+
+def build_reference(data_path=None, path=REFERENCE_PATH, model_path=None):
+    """Bins and bin shares of the BRFSS dataset for the model's features"""
+    import utils
+    from data import DATA_PATH, _source_signature, add_health_index, load_brfss
+
+    data_path = data_path or DATA_PATH
+    features = list(utils.get_schema(utils.load_model(model_path)).features)
+    df = add_health_index(load_brfss(data_path), drop_bmi=False)
+    X = np.ascontiguousarray(df[features], dtype=np.float32)
+    edges = [_edges(X[:, f]) for f in range(len(features))]
+    counts = bin_counts(X, _padded(edges))
+    reference = {
+        'format': REFERENCE_FORMAT,
+        'features': features,
+        'edges': [e.tolist() for e in edges],
+        'shares': [(c[:len(e) + 1] / len(X)).tolist() for c, e in zip(counts, edges)],
+        'rows': len(X),
+        'source': _source_signature(data_path),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(reference, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    return reference
+
+
+def load_reference(path=REFERENCE_PATH):
+    with open(path, encoding='utf-8') as f:
+        reference = json.load(f)
+    if reference.get('format') != REFERENCE_FORMAT:
+        raise ValueError(f"Perfil de referencia incompatible en {path}: vuelva a construirlo")
+    return reference
+
+
+class DriftMonitor:
+    """Constant-memory feature histograms with periodic PSI/KL snapshots"""
+
+    def __init__(self, reference, log_path=None, interval=60.0, min_rows=50):
+        self.features = tuple(reference['features'])
+        self.edges = _padded([np.asarray(e) for e in reference['edges']])
+        self.expected = np.zeros((len(self.features), MAX_BINS))
+        for f, shares in enumerate(reference['shares']):
+            self.expected[f, :len(shares)] = shares
+        self.log_path = log_path
+        self.min_rows = min_rows
+        self.skipped = 0
+        self._window = np.zeros((len(self.features), MAX_BINS), dtype=np.int64)
+        self._total = np.zeros_like(self._window)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if interval:
+            self._thread = threading.Thread(target=self._run, args=(interval,), name='drift-monitor', daemon=True)
+            self._thread.start()
+
+    def observe(self, X, features=None):
+        """Add the rows of a model feature matrix (ignored if its features differ)"""
+        if features is not None and tuple(features) != self.features:
+            self.skipped += len(X)
+            return
+        counts = bin_counts(X, self.edges)
+        with self._lock:
+            self._window += counts
+            self._total += counts
+
+    def snapshot(self, reset=False):
+        """PSI/KL per feature since start and for the current window"""
+        with self._lock:
+            window = self._window.copy()
+            total = self._total.copy()
+            if reset:
+                self._window[:] = 0
+        total_rows = int(total[0].sum())
+        window_rows = int(window[0].sum())
+        total_psi = psi(total, self.expected)
+        snapshot = {
+            'time': time.time(),
+            'pid': os.getpid(),
+            'rows': total_rows,
+            'window_rows': window_rows,
+            'psi': dict(zip(self.features, np.round(total_psi, 5).tolist())),
+            'kl': dict(zip(self.features, np.round(kl(total, self.expected), 5).tolist())),
+            'window_psi': None,
+            'drifted': [f for f, v in zip(self.features, total_psi) if v >= PSI_ALERT] if total_rows >= self.min_rows else [],
+        }
+        if window_rows >= self.min_rows:
+            snapshot['window_psi'] = dict(zip(self.features, np.round(psi(window, self.expected), 5).tolist()))
+        return snapshot
+
+    def flush(self):
+        """Take a snapshot, start a new window and append it to the log"""
+        snapshot = self.snapshot(reset=True)
+        if self.log_path and snapshot['window_rows']:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(snapshot, ensure_ascii=False) + '\n')
+        return snapshot
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Monitor de deriva: no se pudo guardar la instantánea: {e}", file=sys.stderr)
+
+    def close(self):
+        """Stop the flush thread and write the last window"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+
+def replay(path, reference_path=REFERENCE_PATH, chunksize=20000, window=50000, log_path=None, file=sys.stdout):
+    """Feed a CSV with the model inputs through the monitor as fast as possible"""
+    import pandas as pd
+    from schema import FeatureSchema
+
+    monitor = DriftMonitor(load_reference(reference_path), log_path, interval=0)
+    schema = FeatureSchema(monitor.features)
+    buffer = np.empty((chunksize, schema.n_features), dtype=np.float32)
+    print(f"{'filas':>10s} {'PSI máx ventana':>16s} {'característica':>26s} {'derivadas (total)'}", file=file)
+    start = time.perf_counter()
+    pending = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        monitor.observe(schema.transform(chunk, buffer[:len(chunk)]))
+        pending += len(chunk)
+        if pending >= window:
+            _print_window(monitor.flush(), file)
+            pending = 0
+    elapsed = time.perf_counter() - start
+    last = monitor.flush()
+    if last['window_rows']:
+        _print_window(last, file)
+    print(f"Total: {last['rows']:,} filas en {elapsed:.2f} s ({last['rows'] / elapsed:,.0f} filas/s)", file=file)
+    for feature, value in sorted(last['psi'].items(), key=lambda kv: -kv[1]):
+        level = 'ALERTA' if value >= PSI_ALERT else 'aviso' if value >= PSI_WARN else ''
+        print(f"  {feature:26s} PSI {value:7.4f}  KL {last['kl'][feature]:7.4f}  {level}", file=file)
+    return last
+
+
+def _print_window(snapshot, file):
+    window_psi = snapshot['window_psi'] or {}
+    feature, value = max(window_psi.items(), key=lambda kv: kv[1], default=('-', 0.0))
+    print(f"{snapshot['rows']:10,d} {value:16.4f} {feature:>26s} {', '.join(snapshot['drifted'])}", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Input drift against the BRFSS 2015 reference profile")
+    sub = parser.add_subparsers(dest='command', required=True)
+    r = sub.add_parser('reference', help="build the reference profile from the BRFSS CSV")
+    r.add_argument('--data', help="BRFSS CSV (default: data.DATA_PATH)")
+    r.add_argument('--model', help="model whose features are monitored (default: the one served by utils)")
+    p = sub.add_parser('replay', help="replay a CSV with the model inputs through the monitor")
+    p.add_argument('input', help="CSV with the BRFSS columns, e.g. score_csv.py --keep-columns output")
+    p.add_argument('--chunksize', type=int, default=20000)
+    p.add_argument('--window', type=int, default=50000, help="rows per snapshot")
+    p.add_argument('--log', help="also append the snapshots to this JSONL file")
+    for sp in (r, p):
+        sp.add_argument('--reference', default=REFERENCE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'reference':
+        reference = build_reference(args.data, args.reference, args.model)
+        print(f"Referencia de {reference['rows']:,} filas en {args.reference}", file=sys.stderr)
+    else:
+        replay(args.input, args.reference, args.chunksize, args.window, args.log)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Incremental model updates from a new BRFSS-style batch.
+
+Two modes, both starting from the model that is being served:
+    continue  add `--rounds` new trees fitted on the new batch only
+    refresh   keep the tree structure and recompute the leaf values on the
+              new batch (process_type=update, updater=refresh)
+
+Cost depends on the size of the new batch, not on the full history. The
+candidate and the current model are compared on a holdout (a CSV, or 20% of
+the new batch); if the candidate's recall doesn't drop more than
+--max-recall-drop it is written as a new bundle and models/current is
+repointed to it. utils.load_model() notices the change on its next check.
+
+Uso:
+    python incremental.py nuevo_lote.csv --mode continue --rounds 20
+    python incremental.py nuevo_lote.csv --mode refresh --holdout holdout.csv
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from bundle import export_bundle, is_bundle, read_manifest
+from utils import CURRENT_MODEL_LINK, EXPECTED_FEATURES, get_booster, load_model, model_path as served_model_path
+
+MODES = ('continue', 'refresh')
+
+# Parámetros del booster que se conservan del modelo original
+TRAIN_PARAMS = ('objective', 'eval_metric', 'max_depth', 'learning_rate', 'subsample',
+                'colsample_bytree', 'scale_pos_weight', 'tree_method', 'seed', 'random_state')
+
+
+def base_params(model, path):
+    """Training parameters of the served model (bundle manifest or XGBClassifier)"""
+    if is_bundle(path):
+        params = read_manifest(path).get('params', {})
+    elif hasattr(model, 'get_xgb_params'):
+        params = model.get_xgb_params()
+    else:
+        params = {}
+    params = {k: v for k, v in params.items() if k in TRAIN_PARAMS and v is not None}
+    if 'random_state' in params:
+        params['seed'] = params.pop('random_state')  # nombre de sklearn -> nombre del booster
+    params.setdefault('objective', 'binary:logistic')
+    return params
+
+
+def load_batch(path):
+    """Features (EXPECTED_FEATURES order) and labels of a BRFSS-format CSV"""
+    from data import TARGET, add_health_index, load_brfss
+
+    df = add_health_index(load_brfss(path, cache=False))
+    return df[EXPECTED_FEATURES], df[TARGET].to_numpy()
+
+
+def update_booster(booster, X, y, mode='continue', rounds=20, params=None, nthread=None):
+    """New booster trained from `booster` on (X, y); `booster` is not modified"""
+    import xgboost
+
+    if mode not in MODES:
+        raise ValueError(f"Modo desconocido: {mode}. Opciones: {MODES}")
+    params = dict(params or {})
+    if nthread:
+        params['nthread'] = nthread
+    dtrain = xgboost.DMatrix(X, label=y)
+    base = booster.copy()
+    if mode == 'continue':
+        return xgboost.train(params, dtrain, num_boost_round=rounds, xgb_model=base)
+    # Refresh: mismos árboles, hojas recalculadas con los datos nuevos
+    params.update(process_type='update', updater='refresh', refresh_leaf=True)
+    return xgboost.train(params, dtrain, num_boost_round=base.num_boosted_rounds(), xgb_model=base)
+
+
+def evaluate(booster, X, y):
+    """Holdout metrics at the 0.5 threshold"""
+    from sklearn.metrics import accuracy_score, f1_score, log_loss, precision_score, recall_score
+
+    proba = booster.inplace_predict(np.ascontiguousarray(X, dtype=np.float32))
+    pred = (proba > 0.5).astype(int)
+    return {
+        'accuracy': float(accuracy_score(y, pred)),
+        'recall': float(recall_score(y, pred)),
+        'precision': float(precision_score(y, pred, zero_division=0)),
+        'f1': float(f1_score(y, pred)),
+        'logloss': float(log_loss(y, proba, labels=[0, 1])),
+    }
+
+
+def promote(bundle_dir, link=CURRENT_MODEL_LINK):
+    """Point `link` at bundle_dir atomically (new symlink + rename)"""
+    target = os.path.relpath(os.path.abspath(bundle_dir), os.path.dirname(os.path.abspath(link)))
+    tmp = f'{link}.{os.getpid()}.tmp'
+    os.symlink(target, tmp)
+    os.replace(tmp, link)
+
+
+def run_update(batch_path, mode='continue', rounds=20, holdout_path=None, model_path=None,
+               out_dir=None, max_recall_drop=0.005, force=False, nthread=None, log=sys.stderr):
+    """Update the served model with one batch; returns a report dict"""
+    from sklearn.model_selection import train_test_split
+
+    model_path = model_path or served_model_path()
+    model = load_model(model_path)
+    booster = get_booster(model)
+    version = os.path.basename(os.path.realpath(model_path))
+
+    start = time.perf_counter()
+    X, y = load_batch(batch_path)
+    if holdout_path:
+        X_hold, y_hold = load_batch(holdout_path)
+    else:
+        X, X_hold, y, y_hold = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+
+    candidate = update_booster(booster, X, y, mode, rounds, base_params(model, model_path), nthread)
+    train_seconds = time.perf_counter() - start
+    before = evaluate(booster, X_hold, y_hold)
+    after = evaluate(candidate, X_hold, y_hold)
+    accepted = force or after['recall'] >= before['recall'] - max_recall_drop
+
+    report = {
+        'mode': mode,
+        'parent': version,
+        'rows': len(X),
+        'holdout_rows': len(X_hold),
+        'seconds': round(train_seconds, 2),
+        'holdout_before': before,
+        'holdout_after': after,
+        'accepted': accepted,
+        'bundle': None,
+    }
+    print(f"recall holdout: {before['recall']:.4f} -> {after['recall']:.4f} "
+          f"({len(X)} filas nuevas, {train_seconds:.1f} s)", file=log)
+    if not accepted:
+        print(f"Candidato rechazado: el recall baja más de {max_recall_drop}", file=log)
+        return report
+
+    out_dir = out_dir or os.path.join(os.path.dirname(os.path.realpath(model_path)),
+                                      f"bundle_{time.strftime('%Y%m%d-%H%M%S')}_{mode}")
+    export_bundle(
+        candidate, out_dir,
+        metrics={f'holdout_{k}': v for k, v in after.items()},
+        params=base_params(model, model_path),
+        lineage={'parent': version, 'mode': mode, 'rounds': rounds if mode == 'continue' else 0,
+                 'batch': os.path.abspath(batch_path), 'rows': len(X)},
+    )
+    promote(out_dir)
+    report['bundle'] = out_dir
+    print(f"Nuevo modelo en {out_dir}, {CURRENT_MODEL_LINK} actualizado", file=log)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the served model with a new survey batch")
+    parser.add_argument('batch', help="CSV with the BRFSS columns, including Diabetes_binary")
+    parser.add_argument('--mode', choices=MODES, default='continue')
+    parser.add_argument('--rounds', type=int, default=20, help="new trees in continue mode")
+    parser.add_argument('--holdout', help="holdout CSV (default: 20%% of the batch)")
+    parser.add_argument('--model', help="base model (default: the one served by utils)")
+    parser.add_argument('-o', '--out', help="bundle directory for the new version")
+    parser.add_argument('--max-recall-drop', type=float, default=0.005)
+    parser.add_argument('--force', action='store_true', help="promote even if the holdout recall drops")
+    parser.add_argument('--nthread', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    report = run_update(args.batch, args.mode, args.rounds, args.holdout, args.model, args.out,
+                        args.max_recall_drop, args.force, args.nthread)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['accepted'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,304 @@
+"""Capacity test for the Streamlit apps: N concurrent headless sessions.
+
+Every session is an AppTest running the real script in its own Python
+process. AppTest installs process-wide Streamlit runtime and config state on
+each run, so sessions sharing one interpreter would race on that state. Each
+process loads the model and the page, waits until all sessions are ready,
+then performs `--steps` random actions from a seeded generator:
+
+    change    set 1-3 radios/selectboxes/sliders (app.py reruns on each change;
+              in app2/app3 the widgets are in a form, so they are only sent on submit)
+    predict   press the predict button
+    language  press EN/ES (app2 only; the app calls st.rerun)
+
+For each app and number of sessions the report gives rerun latency
+percentiles, reruns per second, CPU cores used and CPU per rerun (summed over
+the session processes), and the mean CPU time and RSS of one session process.
+Those two are process totals: they include the interpreter, Streamlit and
+the model, so they are not the marginal cost of one more session in a single
+`streamlit run` server. The report also gives the saturation point:
+the first level where adding sessions raises throughput by less than
+--saturation (10% by default). The JSON report uses bench.py's 'scenarios'
+layout, so it can be compared against a saved baseline.
+
+Uso:
+    python loadtest.py --apps app2.py --sessions 1,2,4,8,16 --steps 20
+    python loadtest.py --save-baseline benchmarks/capacity.json
+    python loadtest.py --baseline benchmarks/capacity.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Cómo se usa cada app: si los controles están en un formulario y si tiene botones de idioma
+APPS = {
+    'app.py': {'form': False, 'language': False},
+    'app2.py': {'form': True, 'language': True},
+    'app3.py': {'form': True, 'language': False},
+}
+LANGUAGE_BUTTONS = ('en_btn', 'es_btn')
+DEFAULT_SESSIONS = (1, 2, 4, 8, 16)
+
+# Líneas con las que un proceso de sesión avisa al padre (su stdout puede tener otras)
+READY = '@@loadtest-ready'
+RESULT = '@@loadtest-result '
+
+
+def current_rss_mb():
+    """Resident memory of this process (max RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _change_widgets(at, rng):
+    """Set 1-3 random widgets to random valid values"""
+    widgets = ([('radio', w) for w in at.radio] + [('selectbox', w) for w in at.selectbox]
+               + [('slider', w) for w in at.slider])
+    for i in rng.choice(len(widgets), size=rng.integers(1, 4), replace=False):
+        kind, widget = widgets[i]
+        if kind == 'selectbox':
+            widget.select_index(int(rng.integers(len(widget.options))))
+        elif kind == 'slider':
+            if isinstance(widget.min, int):
+                widget.set_value(int(rng.integers(widget.min, widget.max + 1)))
+            else:
+                widget.set_value(round(float(rng.uniform(widget.min, widget.max)), 1))
+        else:
+            # Todas las opciones de radio de las apps son 0/1
+            widget.set_value(int(rng.integers(2)))
+
+
+def _predict_button(at):
+    return [b for b in at.button if b.key not in LANGUAGE_BUTTONS][-1]
+
+
+class Session:
+    """One simulated user: an AppTest plus a seeded action generator"""
+
+    def __init__(self, script, seed, think=0.0):
+        from streamlit.testing.v1 import AppTest
+
+        self.config = APPS.get(os.path.basename(script), {'form': False, 'language': False})
+        self.at = AppTest.from_file(os.path.join(HERE, script), default_timeout=60)
+        self.rng = np.random.default_rng(seed)
+        self.think = think
+        self.latencies = []
+        self.errors = 0
+
+    def _run(self, at):
+        start = time.perf_counter()
+        at.run()
+        self.latencies.append(time.perf_counter() - start)
+        if self.at.exception:
+            self.errors += 1
+
+    def load(self):
+        self._run(self.at)
+
+    def step(self):
+        actions = ['change', 'predict'] + (['language'] if self.config['language'] else [])
+        weights = [0.5, 0.35, 0.15] if self.config['language'] else [0.6, 0.4]
+        action = self.rng.choice(actions, p=weights)
+        if action == 'change':
+            _change_widgets(self.at, self.rng)
+            if not self.config['form']:
+                self._run(self.at)
+        elif action == 'predict':
+            self._run(_predict_button(self.at).click())
+        else:
+            key = LANGUAGE_BUTTONS[int(self.rng.integers(2))]
+            self._run(self.at.button(key=key).click())
+        if self.think:
+            time.sleep(self.think)
+
+
+def _session_process(script, seed, steps, think):
+    """Body of one session process: load, report ready, wait for the start line, run the steps"""
+    import utils
+
+    utils.load_model()
+    session = Session(script, seed, think)
+    session.load()
+    print(READY, flush=True)
+    sys.stdin.readline()
+    cpu_start = time.process_time()
+    for _ in range(steps):
+        session.step()
+    result = {
+        # Sin la carga inicial de la página
+        'latencies': session.latencies[1:],
+        'errors': session.errors,
+        'cpu_s': time.process_time() - cpu_start,
+        'rss_mb': current_rss_mb(),
+    }
+    print(RESULT + json.dumps(result), flush=True)
+
+
+def _read_marker(process, prefix):
+    """Rest of the first stdout line of `process` starting with `prefix`"""
+    for line in process.stdout:
+        if line.startswith(prefix):
+            return line[len(prefix):].strip()
+    process.wait()
+    raise RuntimeError(f"El proceso de sesión terminó con código {process.returncode} sin responder")
+
+
+def run_level(script, sessions, steps, seed=42, think=0.0):
+    """Run `sessions` concurrent sessions of `steps` actions each, one process per session"""
+    command = [sys.executable, os.path.abspath(__file__), '--session', script,
+               '--steps', str(steps), '--think', str(think)]
+    processes = [
+        subprocess.Popen(command + ['--seed', str(seed + i)], cwd=HERE, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        for i in range(sessions)
+    ]
+    try:
+        # Se mide desde que todas las sesiones cargaron el modelo y la página
+        for p in processes:
+            _read_marker(p, READY)
+        start = time.perf_counter()
+        for p in processes:
+            p.stdin.write('\n')
+            p.stdin.flush()
+        results = [json.loads(_read_marker(p, RESULT)) for p in processes]
+        wall = time.perf_counter() - start
+        for p in processes:
+            p.stdin.close()
+            p.wait(60)
+    finally:
+        for p in processes:
+            if p.poll() is None:
+                p.kill()
+            p.wait()
+
+    latencies = np.concatenate([np.asarray(r['latencies'], dtype=float) for r in results])
+    reruns = len(latencies)
+    cpu = sum(r['cpu_s'] for r in results)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if reruns else (0.0, 0.0, 0.0)
+    return {
+        'sessions': sessions,
+        'reruns': reruns,
+        'errors': sum(r['errors'] for r in results),
+        'p50_ms': p50 * 1000,
+        'p95_ms': p95 * 1000,
+        'p99_ms': p99 * 1000,
+        'throughput_per_s': reruns / wall if wall > 0 else 0.0,
+        'cpu_cores_used': cpu / wall if wall > 0 else 0.0,
+        'cpu_ms_per_rerun': cpu / reruns * 1000 if reruns else 0.0,
+        # Totales de un proceso de sesión (intérprete, Streamlit y modelo incluidos)
+        'process_cpu_s_mean': cpu / sessions,
+        'process_rss_mb_mean': sum(r['rss_mb'] for r in results) / sessions,
+    }
+
+
+def saturation_point(levels, gain=0.10):
+    """First number of sessions whose throughput is less than `gain` above the previous level"""
+    for previous, current in zip(levels, levels[1:]):
+        if current['throughput_per_s'] < previous['throughput_per_s'] * (1 + gain):
+            return current['sessions']
+    return None
+
+
+def run(apps=('app2.py',), sessions=DEFAULT_SESSIONS, steps=20, seed=42, think=0.0, gain=0.10):
+    import streamlit
+    import utils
+
+    utils.load_model()
+
+    scenarios = {}
+    saturation = {}
+    for script in apps:
+        name = os.path.splitext(script)[0]
+        levels = []
+        for n in sessions:
+            level = run_level(script, n, steps, seed, think)
+            levels.append(level)
+            scenarios[f'{name}_{n}_sessions'] = level
+            print(f"{script:8s} {n:4d} sesiones: p50 {level['p50_ms']:8.1f} ms  p99 {level['p99_ms']:8.1f} ms  "
+                  f"{level['throughput_per_s']:7.1f} reruns/s", file=sys.stderr)
+        saturation[name] = saturation_point(levels, gain)
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'streamlit': streamlit.__version__,
+        'model_version': utils.model_stats()['version'],
+        'config': {'steps': steps, 'seed': seed, 'think_s': think, 'saturation_gain': gain},
+        'saturation_sessions': saturation,
+        'scenarios': scenarios,
+    }
+
+
+def print_report(report, file=sys.stdout):
+    print(f"{'escenario':22s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'reruns/s':>9s} "
+          f"{'núcleos':>7s} {'CPU ms/rerun':>12s} {'MB/proceso':>10s} {'errores':>7s}", file=file)
+    for name, r in report['scenarios'].items():
+        print(f"{name:22s} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {r['throughput_per_s']:9.1f} "
+              f"{r['cpu_cores_used']:7.2f} {r['cpu_ms_per_rerun']:12.1f} {r['process_rss_mb_mean']:10.1f} "
+              f"{r['errors']:7d}", file=file)
+    for app, sessions in report['saturation_sessions'].items():
+        point = f"{sessions} sesiones" if sessions else "no se alcanzó en los niveles probados"
+        print(f"Saturación de {app}: {point}", file=file)
+
+
+def main(argv=None):
+    from bench import compare
+
+    split = lambda s: tuple(x for x in s.split(',') if x)
+    parser = argparse.ArgumentParser(description="Concurrent-session capacity test for the Streamlit apps")
+    parser.add_argument('--apps', type=split, default=('app2.py',), help="comma-separated scripts")
+    parser.add_argument('--sessions', type=lambda s: tuple(int(x) for x in split(s)), default=DEFAULT_SESSIONS,
+                        help="concurrency levels, e.g. 1,2,4,8,16")
+    parser.add_argument('--steps', type=int, default=20, help="actions per session")
+    parser.add_argument('--think', type=float, default=0.0, help="seconds between actions of a session")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--saturation', type=float, default=0.10,
+                        help="minimum throughput gain per level before calling it saturated")
+    parser.add_argument('-o', '--output', help="write the report as JSON")
+    parser.add_argument('--baseline', help="report from a previous release to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed slowdown (0.10 = 10%%)")
+    parser.add_argument('--save-baseline', help="write this report as the new baseline")
+    # Uso interno: cuerpo de un proceso de sesión lanzado por run_level
+    parser.add_argument('--session', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.session:
+        _session_process(args.session, args.seed, args.steps, args.think)
+        return 0
+
+    report = run(args.apps, args.sessions, args.steps, args.seed, args.think, args.saturation)
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for r in regressions:
+            print(f"REGRESIÓN {r['scenario']} {r['metric']}: {r['baseline']:.1f} -> {r['current']:.1f} ms "
+                  f"({r['change']:+.0%})", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
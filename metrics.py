@@ -0,0 +1,273 @@
+"""Counters and latency histograms with Prometheus text export (stdlib only).
+
+Every metric carries the labels app, lang and model_version (plus any extra
+label passed to inc/observe, e.g. reason). app/lang come
+from set_labels() (per thread/context, so each Streamlit session run sets its
+own), falling back to set_default_labels() (whole process, e.g. the HTTP
+server), and model_version from set_model_version(), which utils calls on load.
+
+Export:
+    DIABETES_METRICS_PORT=9100  -> http://127.0.0.1:9100/metrics
+    DIABETES_METRICS_FILE=/var/lib/node_exporter/diabetes.prom  (rewritten every 15 s)
+"""
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LABEL_NAMES = ('app', 'lang', 'model_version')
+
+# Buckets en segundos, desde 0.1 ms hasta 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_labels = contextvars.ContextVar('metrics_labels', default={})
+_default_labels = {}
+_model_version = ''
+
+
+def set_labels(**labels):
+    """Set app/lang labels for the current thread or context"""
+    _labels.set({**_labels.get(), **labels})
+
+
+def set_default_labels(**labels):
+    """Set app/lang labels for every thread that didn't call set_labels()"""
+    _default_labels.update(labels)
+
+
+def get_labels():
+    """app/lang labels in effect in the current thread or context"""
+    return {**_default_labels, **_labels.get()}
+
+
+def set_model_version(version):
+    global _model_version
+    _model_version = version or ''
+
+
+def _label_values(extra):
+    """Label pairs: app, lang, model_version, then any extra labels sorted by name"""
+    current = get_labels()
+    pairs = (
+        ('app', str(extra.get('app', current.get('app', '')))),
+        ('lang', str(extra.get('lang', current.get('lang', '')))),
+        ('model_version', str(extra.get('model_version', _model_version))),
+    )
+    others = tuple(sorted((k, str(v)) for k, v in extra.items() if k not in LABEL_NAMES))
+    return pairs + others
+
+
+def _format_labels(pairs, extra=()):
+    pairs = list(pairs) + list(extra)
+    body = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return '{' + body + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_values(labels), 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_values(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(_label_values(labels))
+        return state[2] if state else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, c in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += c
+                    lines.append(f'{self.name}_bucket{_format_labels(key, [("le", _format_value(bound))])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {n}')
+        return lines
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name, documentation):
+    """Get or create a counter"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, documentation)
+        return _registry[name]
+
+
+def histogram(name, documentation, buckets=DEFAULT_BUCKETS):
+    """Get or create a histogram"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, documentation, buckets)
+        return _registry[name]
+
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path):
+    """Write render() to path atomically (node_exporter textfile collector)"""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+# Métricas del modelo y de la interfaz
+MODEL_LOADS = counter('diabetes_model_loads_total', 'Model artifact loads and reloads')
+MODEL_LOAD_SECONDS = histogram('diabetes_model_load_seconds', 'Time to read the model artifact')
+FEATURE_BUILD_SECONDS = histogram('diabetes_feature_build_seconds', 'Time to build the feature matrix')
+INFERENCE_SECONDS = histogram('diabetes_inference_seconds', 'Time spent in the model call')
+PREDICTIONS = counter('diabetes_predictions_total', 'Rows scored')
+INPUT_ERRORS = counter('diabetes_input_errors_total', 'Inputs rejected by the feature schema')
+RENDER_SECONDS = histogram('diabetes_render_seconds', 'Time to render the whole result section')
+EXPLAIN_SECONDS = histogram('diabetes_explain_seconds', 'Time to compute feature contributions')
+
+# Micro-batching de predicciones (batcher.py)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+BATCH_SIZE = histogram('diabetes_batch_size', 'Rows per batched model call', BATCH_BUCKETS)
+BATCH_QUEUE_DEPTH = histogram('diabetes_batch_queue_depth', 'Queued requests when a batch is taken', BATCH_BUCKETS)
+BATCH_WAIT_SECONDS = histogram('diabetes_batch_wait_seconds', 'Time a request waits in the batching queue')
+
+# Modelo challenger en sombra (shadow.py)
+SHADOW_ROWS = counter('diabetes_shadow_rows_total', 'Rows scored by the challenger model')
+SHADOW_DISAGREEMENTS = counter('diabetes_shadow_disagreements_total', 'Rows where the challenger label differs')
+SHADOW_SHED = counter('diabetes_shadow_shed_total', 'Batches dropped because the shadow pool was full')
+SHADOW_SECONDS = histogram('diabetes_shadow_seconds', 'Time spent in the challenger model call')
+
+# Servicio HTTP (server.py)
+SERVER_ERRORS = counter('diabetes_server_errors_total', 'Requests answered with 500, by exception type')
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_started = {}
+_started_lock = threading.Lock()
+
+
+def start_http_server(port, host='127.0.0.1'):
+    """Serve /metrics on a daemon thread (once per process and port)"""
+    with _started_lock:
+        if ('http', port) not in _started:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+            _started[('http', port)] = server
+        return _started[('http', port)]
+
+
+def start_textfile_writer(path, interval=15.0):
+    """Rewrite the textfile every `interval` seconds on a daemon thread"""
+    with _started_lock:
+        if ('file', path) in _started:
+            return
+
+        def loop():
+            while True:
+                try:
+                    write_textfile(path)
+                except OSError:
+                    pass
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name='metrics-textfile', daemon=True)
+        thread.start()
+        _started[('file', path)] = thread
+
+
+def serve_from_env():
+    """Start the exporters configured with DIABETES_METRICS_PORT / DIABETES_METRICS_FILE"""
+    port = os.environ.get('DIABETES_METRICS_PORT')
+    if port:
+        try:
+            start_http_server(int(port))
+        except OSError:
+            # Otro proceso ya usa el puerto (p. ej. varios workers): no es fatal
+            with _started_lock:
+                _started.setdefault(('http', int(port)), None)
+    path = os.environ.get('DIABETES_METRICS_FILE')
+    if path:
+        start_textfile_writer(path)
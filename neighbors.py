@@ -0,0 +1,218 @@
+"""'People like you': nearest BRFSS respondents by Hamming distance.
+
+Every survey row is packed into one 64-bit code. Flags take one bit and
+ordinals use thermometer codes (bit j is set when value >= threshold j), so
+the Hamming distance between two codes is the number of flags that differ
+plus how many steps apart each ordinal is. MentHlth, PhysHlth and BMI are
+bucketed first. The 57 bits are packed with np.packbits.
+
+A query XORs the profile's code with all 253,680 codes, counts bits
+(popcount) and takes the k nearest from a histogram of distances: the
+diabetes rate among them is exact, with ties at the last distance
+averaged. The index is built offline and memory-mapped when served; like
+data.py's column cache, it is rebuilt when the BRFSS CSV it was built from
+changes.
+
+Uso:
+    python neighbors.py build                   # models/neighbors/{codes,labels}.npy
+    python neighbors.py bench --k 100           # latencia de una consulta
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+NEIGHBORS_DIR = os.environ.get(
+    'DIABETES_NEIGHBORS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'neighbors'),
+)
+INDEX_FORMAT = 1
+DEFAULT_K = 100
+
+# Cada cuántos segundos se compara el índice cargado con el CSV
+SOURCE_RECHECK_INTERVAL = 30.0
+
+_FLAGS = ['HighBP', 'HighChol', 'CholCheck', 'Smoker', 'Stroke', 'HeartDiseaseorAttack',
+          'PhysActivity', 'Fruits', 'Veggies', 'HvyAlcoholConsump', 'AnyHealthcare',
+          'NoDocbcCost', 'DiffWalk', 'Sex']
+
+# Código termómetro de cada columna: un bit por umbral (value >= umbral)
+CODES = [(flag, (1,)) for flag in _FLAGS] + [
+    ('GenHlth', (2, 3, 4, 5)),
+    ('Age', tuple(range(2, 14))),
+    ('Education', tuple(range(2, 7))),
+    ('Income', tuple(range(2, 9))),
+    ('MentHlth', (1, 3, 6, 14, 30)),
+    ('PhysHlth', (1, 3, 6, 14, 30)),
+    ('BMI', (18.5, 25, 30, 35, 40)),
+]
+N_BITS = sum(len(thresholds) for _, thresholds in CODES)
+assert N_BITS <= 64
+
+# Bits activos de cada byte, para NumPy sin np.bitwise_count (< 2.0)
+_POPCOUNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def encode(columns):
+    """uint64 code of each row; `columns` maps the CODES columns to arrays or scalars"""
+    n = len(np.atleast_1d(columns[CODES[0][0]]))
+    bits = np.zeros((n, 64), dtype=bool)
+    j = 0
+    for column, thresholds in CODES:
+        values = np.atleast_1d(np.asarray(columns[column], dtype=np.float32))
+        for threshold in thresholds:
+            bits[:, j] = values >= threshold
+            j += 1
+    return np.packbits(bits, axis=1).view(np.uint64).ravel()
+
+
+def popcount(x):
+    """Number of set bits of each uint64"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(x)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(len(x), 8).sum(axis=1, dtype=np.uint8)
+
+
+def build(data_path=None, directory=NEIGHBORS_DIR):
+    """Encode the BRFSS dataset and write the index; returns the directory"""
+    from data import DATA_PATH, TARGET, _source_signature, load_brfss
+
+    data_path = data_path or DATA_PATH
+    df = load_brfss(data_path)
+    os.makedirs(directory, exist_ok=True)
+    # Archivos nuevos en vez de sobrescribir: otro proceso puede tener mapeados los anteriores
+    for name, values in (('codes', encode(df)), ('labels', df[TARGET].to_numpy(np.uint8))):
+        tmp = os.path.join(directory, f'{name}.tmp.npy')
+        np.save(tmp, values)
+        os.replace(tmp, os.path.join(directory, f'{name}.npy'))
+    meta = {'format': INDEX_FORMAT, 'rows': len(df), 'bits': N_BITS,
+            'codes': [[c, list(t)] for c, t in CODES], 'source': _source_signature(data_path)}
+    # El meta se escribe al final: un índice a medio escribir no es válido
+    tmp = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, 'meta.json'))
+    return directory
+
+
+class NeighborIndex:
+    """Packed codes and diabetes labels of the BRFSS respondents"""
+
+    def __init__(self, codes, labels, source=None):
+        self.codes = codes
+        self.labels = labels
+        # Firma (tamaño, mtime) del CSV con el que se construyó
+        self.source = source
+
+    @classmethod
+    def load(cls, directory=NEIGHBORS_DIR, mmap=True):
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('format') != INDEX_FORMAT or meta.get('codes') != [[c, list(t)] for c, t in CODES]:
+            raise ValueError(f"Índice de vecinos incompatible en {directory}: vuelva a construirlo")
+        mode = 'r' if mmap else None
+        return cls(np.load(os.path.join(directory, 'codes.npy'), mmap_mode=mode),
+                   np.load(os.path.join(directory, 'labels.npy'), mmap_mode=mode),
+                   meta.get('source'))
+
+    def is_stale(self, data_path=None):
+        """True if the CSV exists and is not the one the index was built from"""
+        from data import DATA_PATH, _source_signature
+
+        try:
+            return _source_signature(data_path or DATA_PATH) != self.source
+        except FileNotFoundError:
+            # Sin el CSV (p. ej. solo se despliega el índice) se usa el índice tal cual
+            return False
+
+    def distances(self, profile):
+        return popcount(self.codes ^ encode(profile)[0])
+
+    def query(self, profile, k=DEFAULT_K):
+        """{'k', 'rate', 'radius', 'exact_matches'} for the k respondents nearest to `profile`"""
+        k = min(k, len(self.codes))
+        distances = self.distances(profile)
+        counts = np.bincount(distances, minlength=N_BITS + 1)
+        positives = np.bincount(distances, weights=self.labels, minlength=N_BITS + 1)
+        cumulative = np.cumsum(counts)
+        radius = int(np.searchsorted(cumulative, k))
+        inside = int(cumulative[radius - 1]) if radius else 0
+        # Empates en el último radio: se toma su tasa media
+        cases = positives[:radius].sum() + (k - inside) * positives[radius] / counts[radius]
+        return {'k': k, 'rate': float(cases / k), 'radius': radius, 'exact_matches': int(counts[0])}
+
+
+_index = None
+_checked = -SOURCE_RECHECK_INTERVAL
+_lock = threading.Lock()
+
+
+def get_index(data_path=None):
+    """Memory-mapped index, loaded on first use; None if it wasn't built.
+
+    Every SOURCE_RECHECK_INTERVAL seconds the index is compared with the CSV
+    and rebuilt if the CSV changed.
+    """
+    global _index, _checked
+    if _index is not None and time.monotonic() - _checked < SOURCE_RECHECK_INTERVAL:
+        return _index
+    with _lock:
+        if _index is None or time.monotonic() - _checked >= SOURCE_RECHECK_INTERVAL:
+            _checked = time.monotonic()
+            if _index is None:
+                if not os.path.exists(os.path.join(NEIGHBORS_DIR, 'meta.json')):
+                    return None
+                _index = NeighborIndex.load(NEIGHBORS_DIR)
+            if _index.is_stale(data_path):
+                try:
+                    build(data_path, NEIGHBORS_DIR)
+                    _index = NeighborIndex.load(NEIGHBORS_DIR)
+                except Exception as e:
+                    print(f"No se pudo reconstruir el índice de vecinos, se usa el anterior: {e}", file=sys.stderr)
+        return _index
+
+
+def similar_profiles(profile, k=DEFAULT_K):
+    """Diabetes rate among the k BRFSS respondents most similar to `profile`, or None"""
+    index = get_index()
+    if index is None:
+        return None
+    return index.query(profile, k)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the BRFSS nearest-neighbour index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('build', help="encode the BRFSS dataset and write the index")
+    b.add_argument('--data', help="BRFSS CSV (default: data.DATA_PATH)")
+    q = sub.add_parser('bench', help="query latency over sample profiles")
+    q.add_argument('--k', type=int, default=DEFAULT_K)
+    q.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        print(build(args.data), file=sys.stderr)
+        return
+
+    from bench import sample_profiles
+
+    index = get_index()
+    if index is None:
+        sys.exit("No hay índice de vecinos: ejecute 'python neighbors.py build'")
+    profiles = sample_profiles(args.repeats)
+    index.query(profiles[0], args.k)
+    times = np.empty(len(profiles))
+    for i, profile in enumerate(profiles):
+        start = time.perf_counter()
+        index.query(profile, args.k)
+        times[i] = time.perf_counter() - start
+    p50, p99 = np.percentile(times, [50, 99]) * 1000
+    print(f"{len(index.codes):,} filas, k={args.k}: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
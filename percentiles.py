@@ -0,0 +1,173 @@
+"""Population percentile of a predicted risk, overall and per Age/Sex/Income.
+
+A build step scores the whole BRFSS dataset once with the current model and
+saves the sorted probabilities: one array for everyone and one contiguous,
+sorted slice per stratum (Age x Sex x Income, 208 strata) with their
+offsets. The artifact is named after the model version, so a new model
+never uses another model's distribution. At request time a percentile is one
+np.searchsorted on an in-memory array.
+
+Uso:
+    python percentiles.py build                  # models/percentiles/percentiles_<versión>.npz
+    python percentiles.py lookup 0.42 --age 9 --sex 1 --income 6
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import utils
+
+PERCENTILES_DIR = os.environ.get(
+    'DIABETES_PERCENTILES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'percentiles'),
+)
+
+# Estratos: Age 1-13, Sex 0-1, Income 1-8
+N_AGE, N_SEX, N_INCOME = 13, 2, 8
+N_STRATA = N_AGE * N_SEX * N_INCOME
+
+# Cada cuántos segundos se vuelve a buscar un índice que no existía
+MISSING_RECHECK_INTERVAL = 30.0
+
+
+def stratum_of(age, sex, income):
+    """Stratum index (0..207) of scalars or arrays of Age, Sex and Income.
+
+    Raises ValueError for values outside the BRFSS codes.
+    """
+    age = np.asarray(age, dtype=np.int64)
+    sex = np.asarray(sex, dtype=np.int64)
+    income = np.asarray(income, dtype=np.int64)
+    for name, values, low, high in (('Age', age, 1, N_AGE), ('Sex', sex, 0, N_SEX - 1),
+                                    ('Income', income, 1, N_INCOME)):
+        if values.size and (values.min() < low or values.max() > high):
+            raise ValueError(f"{name} fuera de rango [{low}, {high}]")
+    return ((age - 1) * N_SEX + sex) * N_INCOME + (income - 1)
+
+
+def index_path(version, directory=PERCENTILES_DIR):
+    return os.path.join(directory, f"percentiles_{version.replace('@', '_')}.npz")
+
+
+def build(data_path=None, model_path=None, directory=PERCENTILES_DIR):
+    """Score the BRFSS population with the model and write the index; returns its path"""
+    from data import DATA_PATH, add_health_index, load_brfss
+
+    utils.load_model(model_path)
+    model, version = utils._registry['current']
+    df = add_health_index(load_brfss(data_path or DATA_PATH))
+    features = list(utils.get_schema(model).features)
+    X = np.ascontiguousarray(df[features], dtype=np.float32)
+    proba = utils.get_booster(model).inplace_predict(X).astype(np.float32)
+
+    strata = stratum_of(df['Age'].to_numpy(), df['Sex'].to_numpy(), df['Income'].to_numpy())
+    order = np.lexsort((proba, strata))
+    counts = np.bincount(strata, minlength=N_STRATA)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    os.makedirs(directory, exist_ok=True)
+    path = index_path(version, directory)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, version=np.array(version), overall=np.sort(proba), by_stratum=proba[order], offsets=offsets)
+    os.replace(tmp, path)
+    return path
+
+
+class PercentileIndex:
+    """Sorted population probabilities, overall and per stratum"""
+
+    def __init__(self, version, overall, by_stratum, offsets):
+        self.version = version
+        self.overall = overall
+        self.by_stratum = by_stratum
+        self.offsets = offsets
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            return cls(str(f['version']), f['overall'], f['by_stratum'], f['offsets'])
+
+    def lookup(self, proba, age, sex, income):
+        """{'overall', 'stratum', 'stratum_size'}: % of people with a lower predicted risk"""
+        proba = np.float32(proba)
+        overall = np.searchsorted(self.overall, proba, side='left') / len(self.overall) * 100
+        s = int(stratum_of(age, sex, income))
+        start, stop = self.offsets[s], self.offsets[s + 1]
+        size = int(stop - start)
+        stratum = None
+        if size:
+            below = np.searchsorted(self.by_stratum[start:stop], proba, side='left')
+            stratum = float(below / size * 100)
+        return {'overall': float(overall), 'stratum': stratum, 'stratum_size': size}
+
+
+# Índice cargado por versión del modelo, y cuándo se buscó por última vez uno que faltaba
+_loaded = {}
+_missing = {}
+_lock = threading.Lock()
+
+
+def get_index(version=None):
+    """PercentileIndex for the model version being served, or None if it wasn't built.
+
+    A missing index is looked for again every MISSING_RECHECK_INTERVAL seconds,
+    so one built while the app or server is running is picked up.
+    """
+    if version is None:
+        utils.load_model()
+        version = utils._registry['current'][1]
+    index = _loaded.get(version)
+    if index is not None:
+        return index
+    if time.monotonic() - _missing.get(version, -MISSING_RECHECK_INTERVAL) < MISSING_RECHECK_INTERVAL:
+        return None
+    with _lock:
+        if version not in _loaded:
+            path = index_path(version)
+            if os.path.exists(path):
+                _loaded[version] = PercentileIndex.load(path)
+                _missing.pop(version, None)
+            else:
+                _missing[version] = time.monotonic()
+        return _loaded.get(version)
+
+
+def risk_percentile(profile, proba):
+    """Percentile of `proba` in the population and in the profile's Age/Sex/Income stratum.
+
+    Returns None when there is no index for the current model version.
+    """
+    index = get_index()
+    if index is None:
+        return None
+    return index.lookup(proba, profile['Age'], profile['Sex'], profile['Income'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the population percentile index")
+    sub = parser.add_subparsers(dest='command', required=True)
+    b = sub.add_parser('build', help="score the BRFSS dataset and write the index")
+    b.add_argument('--data', help="BRFSS CSV (default: data.DATA_PATH)")
+    b.add_argument('--model', help="model path (default: the one served by utils)")
+    q = sub.add_parser('lookup', help="percentile of one probability")
+    q.add_argument('proba', type=float)
+    q.add_argument('--age', type=int, required=True)
+    q.add_argument('--sex', type=int, required=True)
+    q.add_argument('--income', type=int, required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        print(build(args.data, args.model), file=sys.stderr)
+    else:
+        index = get_index()
+        if index is None:
+            sys.exit("No hay índice de percentiles para este modelo: ejecute 'python percentiles.py build'")
+        print(index.lookup(args.proba, args.age, args.sex, args.income))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+"""Two-tier prediction cache in front of the model.
+
+Tier 1 is an in-process LRU bounded by size and TTL. Tier 2 is an optional
+SQLite file that several Streamlit worker processes can share. Keys are a
+hash of the ordered float32 feature vector, so the same profile hits the
+cache whatever the input format was. Both tiers prefix the key with the model
+version (the artifact checksum), so a prediction made with one model is never
+served for another, even if a thread still scoring with the old model stores
+it after a reload. Rows of other versions are never deleted explicitly: during
+a hot reload requests on the old and the new version alternate, and processes
+on different versions may share the SQLite file. Old entries leave the LRU by
+eviction and the SQLite file through the TTL and max_entries cleanup.
+
+Only the probability is stored; the label comes from it (> 0.5).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def feature_keys(X):
+    """Canonical key of each row of a float32 feature matrix"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return [hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest() for row in X]
+
+
+class LRUCache:
+    """Thread-safe LRU with a maximum size and a time-to-live per entry"""
+
+    def __init__(self, maxsize=4096, ttl=3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or (self.ttl and now - entry[1] > self.ttl):
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Prediction store shared between processes through one SQLite file"""
+
+    def __init__(self, path, ttl=24 * 3600.0, max_entries=1_000_000, cleanup_every=1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cleanup_every = cleanup_every
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " key TEXT PRIMARY KEY, version TEXT NOT NULL, proba REAL NOT NULL, created REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)")
+        conn.commit()
+
+    def _conn(self):
+        # Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys, version):
+        """{key: proba} for the keys stored for this version and not expired"""
+        if not keys:
+            return {}
+        oldest = time.time() - self.ttl if self.ttl else 0.0
+        found = {}
+        conn = self._conn()
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, proba FROM predictions WHERE version = ? AND created >= ? AND key IN ({marks})",
+                [version, oldest, *chunk],
+            ).fetchall()
+            found.update(rows)
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items, version):
+        """Store (key, proba) pairs for this version"""
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO predictions (key, version, proba, created) VALUES (?, ?, ?, ?)",
+                [(k, version, float(p), now) for k, p in items],
+            )
+            conn.commit()
+        except sqlite3.OperationalError:
+            # Base ocupada por otro proceso: la caché es opcional, no se bloquea la predicción
+            conn.rollback()
+            return
+        self._puts += len(items)
+        if self._puts >= self.cleanup_every:
+            self._puts = 0
+            self.cleanup()
+
+    def cleanup(self):
+        """Drop expired rows and the oldest ones beyond max_entries"""
+        conn = self._conn()
+        try:
+            if self.ttl:
+                conn.execute("DELETE FROM predictions WHERE created < ?", (time.time() - self.ttl,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM predictions WHERE key IN "
+                    "(SELECT key FROM predictions ORDER BY created LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+        except sqlite3.OperationalError:
+            conn.rollback()
+
+
+class PredictionCache:
+    """LRU in front of an optional SQLite layer, scoped to a model version"""
+
+    def __init__(self, maxsize=4096, ttl=3600.0, sqlite_path=None, sqlite_ttl=24 * 3600.0,
+                 sqlite_max_entries=1_000_000):
+        self.memory = LRUCache(maxsize, ttl)
+        self.disk = SQLiteCache(sqlite_path, sqlite_ttl, sqlite_max_entries) if sqlite_path else None
+        # Última versión consultada (solo para stats)
+        self._version = None
+
+    def lookup(self, X, version):
+        """Return (keys, proba, found): proba is filled where found is True"""
+        self._version = version
+        keys = [f'{version}:{key}' for key in feature_keys(X)]
+        proba = np.empty(len(keys), dtype=np.float32)
+        found = np.zeros(len(keys), dtype=bool)
+        pending = []
+        for i, key in enumerate(keys):
+            value = self.memory.get(key)
+            if value is None:
+                pending.append(i)
+            else:
+                proba[i] = value
+                found[i] = True
+        if pending and self.disk is not None:
+            stored = self.disk.get_many([keys[i] for i in pending], version)
+            for i in pending:
+                value = stored.get(keys[i])
+                if value is not None:
+                    proba[i] = value
+                    found[i] = True
+                    self.memory.put(keys[i], value)
+        return keys, proba, found
+
+    def store(self, keys, proba, version):
+        """Store probabilities under keys returned by lookup() for the same version"""
+        items = [(k, float(p)) for k, p in zip(keys, proba)]
+        for key, value in items:
+            self.memory.put(key, value)
+        if self.disk is not None and items:
+            self.disk.put_many(items, version)
+
+    def clear(self):
+        self.memory.clear()
+        self._version = None
+
+    def stats(self):
+        """Hit/miss counts and hit rate per tier"""
+        result = {'version': self._version}
+        tiers = [('memory', self.memory)] + ([('disk', self.disk)] if self.disk is not None else [])
+        for name, tier in tiers:
+            total = tier.hits + tier.misses
+            result[name] = {
+                'hits': tier.hits,
+                'misses': tier.misses,
+                'hit_rate': tier.hits / total if total else 0.0,
+            }
+        requests = self.memory.hits + self.memory.misses
+        hits = self.memory.hits + (self.disk.hits if self.disk is not None else 0)
+        result['hit_rate'] = hits / requests if requests else 0.0
+        result['memory']['size'] = len(self.memory)
+        result['memory']['evictions'] = self.memory.evictions
+        return result
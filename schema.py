@@ -0,0 +1,172 @@
+"""Compiled feature schema for the diabetes model.
+
+The schema is built once from the booster's feature names and turns a dict,
+a list of dicts, a DataFrame or a 2-D array into a float32 matrix with the
+model's column order. The engineered feature is computed as in training
+(notebook cell 15: Índice_de_Salud_General = GenHlth * BMI) and every value
+is checked against the BRFSS 2015 ranges.
+"""
+from operator import itemgetter
+
+import numpy as np
+
+HEALTH_INDEX = 'Índice_de_Salud_General'
+
+# Rangos válidos según el codebook de BRFSS 2015 (ambos extremos incluidos)
+FEATURE_RANGES = {
+    'HighBP': (0, 1),
+    'HighChol': (0, 1),
+    'CholCheck': (0, 1),
+    'Smoker': (0, 1),
+    'Stroke': (0, 1),
+    'HeartDiseaseorAttack': (0, 1),
+    'PhysActivity': (0, 1),
+    'Fruits': (0, 1),
+    'Veggies': (0, 1),
+    'HvyAlcoholConsump': (0, 1),
+    'AnyHealthcare': (0, 1),
+    'NoDocbcCost': (0, 1),
+    'GenHlth': (1, 5),
+    'MentHlth': (0, 30),
+    'PhysHlth': (0, 30),
+    'DiffWalk': (0, 1),
+    'Sex': (0, 1),
+    'Age': (1, 13),
+    'Education': (1, 6),
+    'Income': (1, 8),
+    'BMI': (12, 98),
+    HEALTH_INDEX: (12, 5 * 98),
+}
+
+
+class FeatureSchema:
+    """Fixed column order, dtype and ranges for the model input"""
+
+    __slots__ = ('features', 'base_features', 'low', 'high', 'dtype', '_base_cols',
+                 '_index_col', '_genhlth_base', '_get_base', '_get_with_bmi', '_get_with_index')
+
+    def __init__(self, features, dtype=np.float32):
+        self.features = tuple(features)
+        self.dtype = dtype
+        self.low = np.array([FEATURE_RANGES.get(f, (-np.inf, np.inf))[0] for f in self.features], dtype=dtype)
+        self.high = np.array([FEATURE_RANGES.get(f, (-np.inf, np.inf))[1] for f in self.features], dtype=dtype)
+
+        # Columnas que llegan tal cual; la del índice se calcula a partir de BMI
+        self._index_col = self.features.index(HEALTH_INDEX) if HEALTH_INDEX in self.features else None
+        self.base_features = tuple(f for f in self.features if f != HEALTH_INDEX)
+        self._base_cols = np.array([i for i, f in enumerate(self.features) if f != HEALTH_INDEX])
+        self._genhlth_base = self.base_features.index('GenHlth') if self._index_col is not None else None
+        self._get_base = itemgetter(*self.base_features)
+        self._get_with_bmi = itemgetter(*self.base_features, 'BMI')
+        self._get_with_index = itemgetter(*self.base_features, HEALTH_INDEX)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Schema with the feature order stored in the trained booster"""
+        if hasattr(booster, 'get_booster'):
+            booster = booster.get_booster()
+        return cls(booster.feature_names)
+
+    @property
+    def n_features(self):
+        return len(self.features)
+
+    def transform(self, data, out=None):
+        """Fill a (n, n_features) float32 buffer from a dict, a list of dicts,
+        a DataFrame or a 2-D array already in model order.
+
+        Raises ValueError when features are missing or out of range.
+        """
+        if isinstance(data, dict):
+            data = [data]
+
+        if isinstance(data, np.ndarray):
+            if data.ndim != 2 or data.shape[1] != self.n_features:
+                raise ValueError(
+                    f"Se esperaba un arreglo de forma (n, {self.n_features}), se recibió {data.shape}"
+                )
+            out = self._buffer(len(data), out)
+            out[:] = data
+        elif hasattr(data, 'columns'):
+            out = self._fill_columns(data, out)
+        else:
+            out = self._fill_rows(list(data), out)
+
+        self.validate(out)
+        return out
+
+    def _buffer(self, n, out):
+        if out is None:
+            return np.empty((n, self.n_features), dtype=self.dtype)
+        if out.shape != (n, self.n_features) or out.dtype != self.dtype:
+            raise ValueError(f"El buffer debe tener forma {(n, self.n_features)} y tipo {np.dtype(self.dtype)}")
+        return out
+
+    def _source_of_index(self, keys):
+        """'BMI' if the index must be computed, HEALTH_INDEX if it was given"""
+        if self._index_col is None:
+            return None
+        if 'BMI' in keys:
+            return 'BMI'
+        if HEALTH_INDEX in keys:
+            return HEALTH_INDEX
+        return 'BMI'
+
+    def _check_missing(self, keys, source):
+        missing = [f for f in self.base_features if f not in keys]
+        if source is not None and source not in keys:
+            missing.append(source)
+        if missing:
+            raise ValueError(f"Faltan características: {missing}")
+
+    def _fill_columns(self, df, out):
+        columns = set(df.columns)
+        source = self._source_of_index(columns)
+        self._check_missing(columns, source)
+        out = self._buffer(len(df), out)
+        base = df[list(self.base_features)].to_numpy(dtype=np.float64)
+        out[:, self._base_cols] = base
+        if source is not None:
+            self._fill_index(out, base[:, self._genhlth_base], df[source].to_numpy(dtype=np.float64), source)
+        return out
+
+    def _fill_rows(self, rows, out):
+        out = self._buffer(len(rows), out)
+        if not rows:
+            return out
+        source = self._source_of_index(rows[0].keys())
+        getter = {None: self._get_base, 'BMI': self._get_with_bmi, HEALTH_INDEX: self._get_with_index}[source]
+        try:
+            values = np.array([getter(r) for r in rows], dtype=np.float64)
+        except KeyError:
+            for r in rows:
+                self._check_missing(r.keys(), source)
+            raise
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Valores no numéricos en la entrada: {e}") from None
+        values = values.reshape(len(rows), -1)
+
+        n_base = len(self.base_features)
+        out[:, self._base_cols] = values[:, :n_base]
+        if source is not None:
+            self._fill_index(out, values[:, self._genhlth_base], values[:, -1], source)
+        return out
+
+    def _fill_index(self, out, genhlth, values, source):
+        if source == 'BMI':
+            low, high = FEATURE_RANGES['BMI']
+            bad = ~((values >= low) & (values <= high))
+            if bad.any():
+                raise ValueError(f"Valores fuera de rango: {{'BMI': {values[bad][:5].tolist()}}}")
+            # Igual que en el entrenamiento: GenHlth * BMI en float64, luego float32
+            out[:, self._index_col] = genhlth * values
+        else:
+            out[:, self._index_col] = values
+
+    def validate(self, X):
+        """Raise ValueError if any value is NaN or outside its range"""
+        bad = ~((X >= self.low) & (X <= self.high))
+        if bad.any():
+            cols = np.flatnonzero(bad.any(axis=0))
+            detail = {self.features[j]: X[bad[:, j], j][:5].tolist() for j in cols}
+            raise ValueError(f"Valores fuera de rango: {detail}")
@@ -0,0 +1,182 @@
+"""Score a BRFSS-shaped CSV (diabetes_binary_health_indicators_BRFSS2015.csv)
+in fixed-size chunks, each one sharded across a fork-after-load worker pool
+(worker_pool.py).
+
+Uso:
+    python score_csv.py diabetes_binary_health_indicators_BRFSS2015.csv -o scores.csv
+    python score_csv.py datos.csv --chunksize 50000 --workers 4 --keep-columns
+
+CSV parsing (read-ahead thread), scoring (this thread, on the pool) and
+formatting/writing (write-behind thread) overlap, so the workers don't sit
+idle while the parent parses or writes. The output keeps the input order.
+At most 2 x workers chunks wait on each side, so memory does not grow with
+the size of the file.
+"""
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from utils import configure_from_env, load_model, predict_diabetes_batch
+from worker_pool import WorkerPool
+
+
+def score_chunk(chunk):
+    """Return (labels, probabilities) for one chunk.
+
+    The model schema builds Índice_de_Salud_General from GenHlth x BMI, the
+    same way notebook cell 15 does.
+    """
+    return predict_diabetes_batch(chunk)
+
+
+_DONE = object()
+
+
+def _put(q, item, stop):
+    """Blocking put that gives up once `stop` is set"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def pipeline(chunks, score, write, depth):
+    """Read chunks ahead and write results behind while this thread scores.
+
+    `score(chunk)` returns (labels, probabilities) and `write(chunk, labels,
+    probabilities)` is called in input order. At most `depth` chunks wait to be
+    scored and `depth` results wait to be written. The first error in any of
+    the three stages stops the others and is raised here.
+    """
+    stop = threading.Event()
+    errors = []
+    inbox, outbox = queue.Queue(depth), queue.Queue(depth)
+
+    def read():
+        try:
+            for chunk in chunks:
+                if not _put(inbox, chunk, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(inbox, _DONE, stop)
+
+    def drain():
+        while True:
+            item = outbox.get()
+            if item is _DONE:
+                return
+            if stop.is_set():
+                continue  # tras un error se vacía la cola sin escribir
+            try:
+                write(*item)
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+    threads = [threading.Thread(target=read, name='csv-reader', daemon=True),
+               threading.Thread(target=drain, name='csv-writer', daemon=True)]
+    for t in threads:
+        t.start()
+    try:
+        while True:
+            try:
+                chunk = inbox.get(timeout=0.1)
+            except queue.Empty:
+                if stop.is_set():
+                    break
+                continue
+            if chunk is _DONE:
+                break
+            if not _put(outbox, (chunk, *score(chunk)), stop):
+                break
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        # El escritor vacía la cola siempre, así que este put no se queda bloqueado
+        outbox.put(_DONE)
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+
+
+def _format_chunk(chunk, pred, proba, keep_columns, first_row):
+    if keep_columns:
+        out = chunk.copy()
+    else:
+        out = pd.DataFrame({'row': range(first_row, first_row + len(chunk))})
+    out['prediction'] = pred
+    out['probability'] = proba
+    return out
+
+
+def score_file(input_path, output, chunksize=20000, workers=None, keep_columns=False,
+               report_every=10, log=sys.stderr):
+    """Stream-score input_path into the open text file `output`.
+
+    Returns the number of rows scored.
+    """
+    workers = workers or os.cpu_count() or 1
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+    start = time.perf_counter()
+    rows = 0
+    chunks = 0
+
+    def write(chunk, pred, proba):
+        nonlocal rows, chunks
+        out = _format_chunk(chunk, pred, proba, keep_columns, rows)
+        out.to_csv(output, header=(chunks == 0), index=False)
+        rows += len(chunk)
+        chunks += 1
+        if report_every and chunks % report_every == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{rows} filas, {rows / elapsed:,.0f} filas/s", file=log)
+
+    if workers == 1:
+        # Solo aquí: el pool puntúa con el booster, sin monitor, y se crea con fork
+        configure_from_env()
+        load_model()
+        pipeline(reader, score_chunk, write, depth=2)
+    else:
+        # El modelo se carga una vez y los workers se crean con fork (antes de crear
+        # los hilos del pipeline); cada chunk se reparte entre ellos por memoria compartida
+        with WorkerPool(workers=workers, max_rows=chunksize) as pool:
+            pipeline(reader, pool.predict_batch, write, depth=workers * 2)
+
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"Total: {rows} filas en {elapsed:.2f} s ({rate:,.0f} filas/s)", file=log)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a BRFSS-shaped CSV file with the diabetes model")
+    parser.add_argument('input', help="CSV file with the BRFSS columns (GenHlth and BMI are required)")
+    parser.add_argument('-o', '--output', default='-', help="output CSV (default: stdout)")
+    parser.add_argument('--chunksize', type=int, default=20000, help="rows per chunk")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--keep-columns', action='store_true', help="copy the input columns to the output")
+    parser.add_argument('--report-every', type=int, default=10, help="print throughput every N chunks (0 = only at the end)")
+    args = parser.parse_args(argv)
+
+    if args.output == '-':
+        score_file(args.input, sys.stdout, args.chunksize, args.workers, args.keep_columns, args.report_every)
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            score_file(args.input, f, args.chunksize, args.workers, args.keep_columns, args.report_every)
+
+
+if __name__ == '__main__':
+    main()
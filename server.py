@@ -0,0 +1,241 @@
+"""Headless HTTP inference service for the diabetes model (stdlib only).
+
+Uso:
+    python server.py --port 8000 --workers 4
+
+Endpoints:
+    GET  /health   -> {"status": "ok", "model_version": ..., "load_count": ...}
+    GET  /metrics  -> Prometheus text format (per worker process)
+    POST /predict  -> single row: {"HighBP": 1, ..., "Income": 5, "BMI": 25.0}
+                      batch: [{...}, {...}] or {"instances": [{...}, {...}]}
+
+Rows use the same feature contract as utils.predict_diabetes. Connections are
+kept alive (HTTP/1.1) and `--workers` processes share the listening socket,
+each one with the model loaded once. With `--pool-workers N` (single process
+only) batches of POOL_MIN_ROWS rows or more are sharded across a
+fork-after-load scoring pool (worker_pool.py). With `--challenger PATH` a
+second model scores the same rows in the background (shadow.py).
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from utils import (cache_stats, configure_from_env, disable_drift_monitor, disable_shadow, enable_shadow,
+                   load_model, model_stats, predict_diabetes_batch)
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Lotes desde este tamaño van al pool de workers (si hay); los pequeños usan la caché
+POOL_MIN_ROWS = 4096
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'DiabetesModel/1.0'
+    access_log = False
+    pool = None
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _reject(self, status, message):
+        """Error reply sent before the body was read: the connection is closed,
+        otherwise the unread body would be parsed as the next request"""
+        self.close_connection = True
+        self._send_json(status, {'error': message})
+
+    def _internal_error(self, error):
+        """500 reply for a failure of the service itself (model, pool), logged and counted"""
+        metrics.SERVER_ERRORS.inc(error=type(error).__name__)
+        print(f"Error interno en {self.command} {self.path}:\n{traceback.format_exc()}", file=sys.stderr)
+        self._send_json(500, {'error': f"Error interno: {type(error).__name__}: {error}"})
+
+    def do_GET(self):
+        if self.path == '/health':
+            try:
+                load_model()
+            except Exception as e:
+                self._internal_error(e)
+                return
+            stats = model_stats()
+            self._send_json(200, {
+                'status': 'ok',
+                'model_version': stats['version'],
+                'load_count': stats['load_count'],
+                'loaded_at': stats['loaded_at'],
+                'cache': cache_stats(),
+            })
+        elif self.path == '/metrics':
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': f"Ruta no encontrada: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._reject(404, f"Ruta no encontrada: {self.path}")
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            self._reject(400, "Content-Length inválido")
+            return
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self._reject(400, "Cuerpo vacío o demasiado grande")
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': f"JSON inválido: {e}"})
+            return
+
+        single = isinstance(payload, dict) and 'instances' not in payload
+        if single:
+            rows = [payload]
+        elif isinstance(payload, dict):
+            rows = payload['instances']
+        else:
+            rows = payload
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            self._send_json(400, {'error': "Se esperaba un objeto o una lista de objetos"})
+            return
+
+        try:
+            # La versión es la del modelo que puntuó las filas, aunque se recargue después
+            if self.pool is not None and len(rows) >= POOL_MIN_ROWS:
+                preds, probas, version = self.pool.predict_batch(rows, with_version=True)
+            else:
+                preds, probas, version = predict_diabetes_batch(rows, with_version=True)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            # Carga del modelo, bundle corrupto, worker del pool caído...
+            self._internal_error(e)
+            return
+
+        if single:
+            self._send_json(200, {
+                'prediction': int(preds[0]),
+                'probability': float(probas[0]),
+                'model_version': version,
+            })
+        else:
+            self._send_json(200, {
+                'predictions': [int(p) for p in preds],
+                'probabilities': [float(p) for p in probas],
+                'model_version': version,
+            })
+
+
+class PredictionServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def _terminate(signum, frame):
+    # Salir por una excepción para que se ejecuten los bloques finally
+    raise SystemExit(0)
+
+
+def _start_services(challenger, shadow_log):
+    """Background services of one server process (drift monitor, shadow model),
+    started after fork so that every process has its own threads and log handles"""
+    configure_from_env()
+    if challenger:
+        enable_shadow(challenger, shadow_log)
+
+
+def _stop_services():
+    disable_shadow()
+    disable_drift_monitor()
+
+
+def serve(host='127.0.0.1', port=8000, workers=1, access_log=False, pool_workers=0,
+          challenger=None, shadow_log=None):
+    """Bind once, load the model, then fork `workers - 1` extra processes
+    that accept on the same socket."""
+    if pool_workers and workers > 1:
+        raise ValueError("--pool-workers solo se puede usar con --workers 1")
+    PredictionHandler.access_log = access_log
+    # Cada conexión se atiende en un hilo nuevo: las etiquetas valen para todo el proceso
+    metrics.set_default_labels(app='server')
+    server = PredictionServer((host, port), PredictionHandler)
+    # Cargar antes de hacer fork para compartir la memoria del modelo
+    load_model()
+    if pool_workers:
+        from worker_pool import WorkerPool
+        PredictionHandler.pool = WorkerPool(workers=pool_workers)
+
+    children = []
+    for _ in range(max(workers, 1) - 1):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, _terminate)
+            try:
+                _start_services(challenger, shadow_log)
+                server.serve_forever()
+            finally:
+                # os._exit no ejecuta atexit: se guardan aquí la última ventana y el log en sombra
+                _stop_services()
+                os._exit(0)
+        children.append(pid)
+    _start_services(challenger, shadow_log)
+
+    print(f"Sirviendo en http://{host}:{port} con {max(workers, 1)} proceso(s)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        if PredictionHandler.pool is not None:
+            PredictionHandler.pool.close()
+        _stop_services()
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP inference service for the diabetes model")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help="processes sharing the listening socket")
+    parser.add_argument('--access-log', action='store_true', help="log every request to stderr")
+    parser.add_argument('--pool-workers', type=int, default=0,
+                        help="score large batches on a forked pool of N processes (needs --workers 1)")
+    parser.add_argument('--challenger', help="model scored in the background on the same rows (shadow.py)")
+    parser.add_argument('--shadow-log', help="JSONL log of the challenger comparison (default: shadow.SHADOW_LOG)")
+    args = parser.parse_args(argv)
+    if args.pool_workers and args.workers > 1:
+        parser.error("--pool-workers requires --workers 1")
+    serve(args.host, args.port, args.workers, args.access_log, args.pool_workers,
+          args.challenger, args.shadow_log)
+
+
+if __name__ == '__main__':
+    main()
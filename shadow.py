@@ -0,0 +1,216 @@
+"""Shadow scoring: a challenger model scores live traffic next to the primary.
+
+The primary model answers the request as usual. After it has scored, the
+same feature matrix is handed to a bounded thread pool where the challenger
+scores it. When `max_pending` batches are already waiting, the batch is
+dropped and counted as shed, so a slow challenger never adds latency or
+memory to the request path. Batches larger than `max_rows` are not scored
+either and are counted as oversized. Each scored batch appends one compact
+JSON line:
+
+    {"t": ..., "n": 1, "agree": 1, "dmax": 0.031, "dmean": 0.031,
+     "pms": 0.41, "cms": 0.52, "shed": 0, "big": 0, "p": [0.62], "c": [0.651]}
+
+(p/c, the probabilities of both models, only for batches of up to LOG_ROWS
+rows). pms is the primary's model time and is left out when some rows came
+from the prediction cache ("cached": number of rows), since the challenger
+always scores the whole batch. utils.predict_diabetes_batch feeds the scorer
+when it is enabled with utils.enable_shadow() or DIABETES_CHALLENGER_PATH
+(read by utils.configure_from_env()). Closing the scorer appends a "stop"
+line with the final shed and oversized counts.
+
+Uso:
+    DIABETES_CHALLENGER_PATH=models/bundle_tuned streamlit run app2.py
+    python server.py --challenger models/bundle_tuned
+    python shadow.py models/shadow/shadow.jsonl            # resumen del log
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import metrics
+
+SHADOW_LOG = os.environ.get(
+    'DIABETES_SHADOW_LOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'shadow', 'shadow.jsonl'),
+)
+
+# Probabilidades de ambos modelos en el log solo para lotes pequeños
+LOG_ROWS = 8
+
+
+class ShadowScorer:
+    """Scores batches with a challenger model on a bounded background pool"""
+
+    def __init__(self, challenger_path, log_path=SHADOW_LOG, workers=1, max_pending=64, max_rows=256):
+        import utils
+        from schema import FeatureSchema
+
+        self.model = utils._read_model(challenger_path)
+        self.booster = utils.get_booster(self.model)
+        # El challenger no debe competir por los núcleos con el modelo principal
+        self.booster.set_param({'nthread': 1})
+        checksum = utils._file_checksum(utils._artifact_file(challenger_path))
+        self.version = f"{os.path.splitext(os.path.basename(os.path.realpath(challenger_path)))[0]}@{checksum[:12]}"
+        self.features = FeatureSchema.from_booster(self.booster).features
+        self.max_rows = max_rows
+        self.shed = 0
+        self.oversized = 0
+        self._columns = {}
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='shadow')
+        os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+        self._log = open(log_path, 'a', encoding='utf-8', buffering=1)
+        self._log_lock = threading.Lock()
+        self._write({'event': 'start', 'challenger': self.version})
+
+    def _column_order(self, features):
+        """Columns of the primary's matrix in the challenger's order, or None if it lacks some"""
+        if features not in self._columns:
+            position = {f: i for i, f in enumerate(features)}
+            if all(f in position for f in self.features):
+                self._columns[features] = np.array([position[f] for f in self.features])
+            else:
+                print(f"El challenger usa características que el modelo principal no tiene: "
+                      f"{sorted(set(self.features) - set(position))}", file=sys.stderr)
+                self._columns[features] = None
+        return self._columns[features]
+
+    def submit(self, X, features, proba, seconds, version, cached=0):
+        """Queue one scored batch (never blocks); returns False if it was not queued.
+
+        `seconds` is the primary's model time, or None if it didn't score every
+        row (`cached` rows came from the prediction cache).
+        """
+        if len(X) > self.max_rows:
+            self.oversized += 1
+            return False
+        columns = self._column_order(tuple(features))
+        if columns is None:
+            return False
+        if not self._slots.acquire(blocking=False):
+            self.shed += 1
+            metrics.SHADOW_SHED.inc()
+            return False
+        # Copias: el llamador puede reutilizar su buffer de características
+        X = np.ascontiguousarray(X[:, columns])
+        try:
+            self._pool.submit(self._score, X, np.array(proba, dtype=np.float32), seconds, version, cached)
+        except RuntimeError:
+            # Pool cerrado
+            self._slots.release()
+            return False
+        return True
+
+    def _score(self, X, primary, primary_seconds, primary_version, cached):
+        try:
+            start = time.perf_counter()
+            challenger = self.booster.inplace_predict(X)
+            elapsed = time.perf_counter() - start
+            metrics.SHADOW_SECONDS.observe(elapsed)
+            delta = np.abs(challenger - primary)
+            agree = int(np.sum((challenger > 0.5) == (primary > 0.5)))
+            metrics.SHADOW_ROWS.inc(len(X))
+            metrics.SHADOW_DISAGREEMENTS.inc(len(X) - agree)
+            record = {
+                't': round(time.time(), 3), 'n': len(X), 'agree': agree,
+                'dmax': round(float(delta.max()), 4), 'dmean': round(float(delta.mean()), 4),
+                'cms': round(elapsed * 1000, 3), 'shed': self.shed, 'big': self.oversized,
+                'pv': primary_version,
+            }
+            if primary_seconds is not None:
+                record['pms'] = round(primary_seconds * 1000, 3)
+            if cached:
+                record['cached'] = cached
+            if len(X) <= LOG_ROWS:
+                record['p'] = np.round(primary, 4).tolist()
+                record['c'] = np.round(challenger, 4).tolist()
+            self._write(record)
+        except Exception as e:
+            print(f"Error en el modelo challenger: {e}", file=sys.stderr)
+        finally:
+            self._slots.release()
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(',', ':'))
+        with self._log_lock:
+            self._log.write(line + '\n')
+
+    def close(self):
+        """Wait for the queued batches and close the log"""
+        if self._log.closed:
+            return
+        self._pool.shutdown(wait=True)
+        self._write({'event': 'stop', 'challenger': self.version, 'shed': self.shed, 'big': self.oversized})
+        with self._log_lock:
+            self._log.close()
+
+
+def summarize(log_path):
+    """Agreement, probability deltas and latency per model from a shadow log"""
+    rows = agree = batches = 0
+    dmax = 0.0
+    dsum = 0.0
+    primary_ms, challenger_ms = [], []
+    shed = oversized = cached = 0
+    challengers = set()
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            event = record.get('event')
+            if event == 'start':
+                challengers.add(record['challenger'])
+            if event is None:
+                batches += 1
+                rows += record['n']
+                agree += record['agree']
+                dmax = max(dmax, record['dmax'])
+                dsum += record['dmean'] * record['n']
+                cached += record.get('cached', 0)
+                if 'pms' in record:
+                    # Misma cantidad de filas puntuadas por ambos modelos
+                    primary_ms.append(record['pms'])
+                    challenger_ms.append(record['cms'])
+            shed = max(shed, record.get('shed', 0))
+            oversized = max(oversized, record.get('big', 0))
+    if not batches:
+        return {'batches': 0, 'challengers': sorted(challengers), 'shed': shed, 'oversized': oversized}
+    p50p, p99p = np.percentile(primary_ms, [50, 99]) if primary_ms else (np.nan, np.nan)
+    p50c, p99c = np.percentile(challenger_ms, [50, 99]) if challenger_ms else (np.nan, np.nan)
+    return {
+        'challengers': sorted(challengers), 'batches': batches, 'rows': rows,
+        'agreement': agree / rows, 'mean_abs_delta': dsum / rows, 'max_abs_delta': dmax,
+        'cached_rows': cached, 'timed_batches': len(primary_ms),
+        'primary_ms_p50': p50p, 'primary_ms_p99': p99p,
+        'challenger_ms_p50': p50c, 'challenger_ms_p99': p99c, 'shed': shed, 'oversized': oversized,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize a shadow-scoring log")
+    parser.add_argument('log', nargs='?', default=SHADOW_LOG)
+    args = parser.parse_args(argv)
+
+    summary = summarize(args.log)
+    if not summary['batches']:
+        sys.exit(f"El log {args.log} no tiene lotes puntuados ({summary['shed']:,} descartados por carga, "
+                 f"{summary['oversized']:,} por tamaño)")
+    print(f"Challenger: {', '.join(summary['challengers'])}")
+    print(f"Lotes: {summary['batches']:,}  filas: {summary['rows']:,}  descartados (máx. por proceso): "
+          f"{summary['shed']:,} por carga, {summary['oversized']:,} por tamaño")
+    print(f"Acuerdo de etiquetas: {summary['agreement']:.2%}")
+    print(f"|Δ probabilidad|: media {summary['mean_abs_delta']:.4f}, máx {summary['max_abs_delta']:.4f}")
+    print(f"Latencia medida en {summary['timed_batches']:,} lotes sin filas de la caché "
+          f"({summary['cached_rows']:,} filas salieron de la caché)")
+    print(f"Latencia principal:  p50 {summary['primary_ms_p50']:.3f} ms, p99 {summary['primary_ms_p99']:.3f} ms")
+    print(f"Latencia challenger: p50 {summary['challenger_ms_p50']:.3f} ms, p99 {summary['challenger_ms_p99']:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Startup-time report for the Streamlit apps.
+
+Runs fresh interpreters and reports:
+  - time per phase: importing streamlit, importing utils, loading the model,
+    first and second prediction
+  - import time per top-level package and its heaviest submodules
+    (python -X importtime)
+
+Uso:
+    python startup_profile.py
+    python startup_profile.py --modules streamlit,metrics,utils --top 15 -o startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Lo que importan app2.py/app3.py al arrancar
+DEFAULT_MODULES = ('streamlit', 'metrics', 'utils')
+
+_PHASES = r"""
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+phases = {}
+start = time.perf_counter()
+import streamlit
+phases['import streamlit'] = time.perf_counter() - start
+t = time.perf_counter()
+import utils
+from bench import SAMPLE_PROFILE
+phases['import utils'] = time.perf_counter() - t
+t = time.perf_counter()
+model = utils.load_model()
+phases['load_model'] = time.perf_counter() - t
+t = time.perf_counter()
+utils.predict_diabetes(SAMPLE_PROFILE)
+phases['first prediction'] = time.perf_counter() - t
+t = time.perf_counter()
+utils.predict_diabetes(SAMPLE_PROFILE)
+phases['second prediction'] = time.perf_counter() - t
+phases['total'] = time.perf_counter() - start
+print(json.dumps(phases))
+"""
+
+
+def phase_times():
+    out = subprocess.run([sys.executable, '-c', _PHASES, HERE], check=True,
+                         capture_output=True, text=True, cwd=HERE)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def parse_importtime(stderr):
+    """[(level, name, self_us, cumulative_us)] from `python -X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        name = name[1:]
+        level = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((level, name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def import_breakdown(modules, top=10):
+    """Cumulative import time of each top-level package, with its heaviest children"""
+    code = '; '.join(f'import {m}' for m in modules)
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], check=True,
+                         capture_output=True, text=True, cwd=HERE)
+    rows = parse_importtime(out.stderr)
+
+    # -X importtime imprime los hijos antes que el padre
+    packages = []
+    children = []
+    for level, name, _, cumulative in rows:
+        if level == 0:
+            packages.append({
+                'module': name,
+                'cumulative_ms': cumulative / 1000,
+                'heaviest': [{'module': n, 'cumulative_ms': c / 1000}
+                             for n, c in sorted(children, key=lambda x: -x[1])[:3]],
+            })
+            children = []
+        elif level == 1:
+            children.append((name, cumulative))
+    packages.sort(key=lambda p: -p['cumulative_ms'])
+    return packages[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup-time report for the Streamlit apps")
+    parser.add_argument('--modules', default=','.join(DEFAULT_MODULES),
+                        help="comma-separated modules imported at startup")
+    parser.add_argument('--top', type=int, default=10, help="top-level packages to show")
+    parser.add_argument('-o', '--output', help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    modules = [m for m in args.modules.split(',') if m]
+    report = {'phases_s': phase_times(), 'imports': import_breakdown(modules, args.top)}
+
+    print("Fases de arranque:")
+    for name, seconds in report['phases_s'].items():
+        print(f"  {name:20s} {seconds * 1000:9.1f} ms")
+    print(f"\nImportaciones de {', '.join(modules)} (acumulado):")
+    for p in report['imports']:
+        print(f"  {p['module']:30s} {p['cumulative_ms']:9.1f} ms")
+        for child in p['heaviest']:
+            print(f"      {child['module']:26s} {child['cumulative_ms']:9.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,5 @@
-import pickle
-model = pickle.load(open('models/modelo_optimo_1.0_9_100_7_0.01_0.7_42.sav', 'rb'))
-print(model.get_booster().feature_names)
\ No newline at end of file
+import sys
+from utils import _read_model, get_booster, model_path
+# Modelo a revisar: argumento, DIABETES_MODEL_PATH o el modelo por defecto
+model = _read_model(sys.argv[1] if len(sys.argv) > 1 else model_path())
+print(get_booster(model).feature_names)
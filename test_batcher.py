@@ -0,0 +1,103 @@
+"""batcher.MicroBatcher: results per caller, per-row fallback and metric labels."""
+import threading
+
+import pytest
+
+import metrics
+from batcher import MicroBatcher
+
+
+def _score(rows):
+    """Fake model: probability = x / 10; any row with 'bad' fails the whole call"""
+    if any('bad' in row for row in rows):
+        raise ValueError("fila inválida")
+    probas = [row['x'] / 10 for row in rows]
+    return [int(p > 0.5) for p in probas], probas
+
+
+@pytest.fixture
+def batcher():
+    b = MicroBatcher(_score, max_batch=16, max_wait=0.05)
+    yield b
+    b.close()
+
+
+def test_each_caller_gets_its_own_result(batcher):
+    futures = [batcher.submit({'x': i}) for i in range(8)]
+    assert [f.result(5) for f in futures] == [(int(i / 10 > 0.5), i / 10) for i in range(8)]
+
+
+def test_invalid_row_falls_back_to_one_by_one(batcher):
+    futures = [batcher.submit({'x': 1}), batcher.submit({'bad': True}), batcher.submit({'x': 9})]
+    assert futures[0].result(5) == (0, 0.1)
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) == (1, 0.9)
+
+
+def test_rows_are_scored_under_their_callers_labels():
+    calls = []
+
+    def score(rows):
+        calls.append((metrics.get_labels().get('lang'), [row['lang'] for row in rows]))
+        return _score([{'x': 1}] * len(rows))
+
+    batcher = MicroBatcher(score, max_batch=64, max_wait=0.2)
+    barrier = threading.Barrier(6)
+
+    def caller(lang):
+        metrics.set_labels(app='test', lang=lang)
+        barrier.wait()
+        batcher.predict({'lang': lang}, timeout=5)
+
+    threads = [threading.Thread(target=caller, args=(lang,)) for lang in ['es', 'en'] * 3]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert sum(len(rows) for _, rows in calls) == 6
+    for lang, rows in calls:
+        assert set(rows) == {lang}
+    # El hilo del batcher no se queda con las etiquetas de ningún llamador
+    assert 'lang' not in metrics.get_labels()
+
+
+def test_submit_after_close_raises():
+    batcher = MicroBatcher(_score)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit({'x': 1})
+
+
+def test_cancelled_request_is_skipped_and_batcher_keeps_running():
+    started = threading.Event()
+    release = threading.Event()
+
+    def score(rows):
+        started.set()
+        release.wait(5)
+        return _score(rows)
+
+    batcher = MicroBatcher(score, max_batch=1, max_wait=0)
+    first = batcher.submit({'x': 1})
+    started.wait(5)
+    # Mientras el hilo puntúa la primera, la segunda se cancela en la cola
+    second = batcher.submit({'x': 2})
+    assert second.cancel()
+    release.set()
+    assert first.result(5) == (0, 0.1)
+    assert batcher.predict({'x': 9}, timeout=5) == (1, 0.9)
+    batcher.close()
+
+
+def test_unexpected_error_is_set_on_the_futures(monkeypatch, batcher):
+    def broken(value):
+        raise RuntimeError("métrica rota")
+
+    monkeypatch.setattr(metrics.BATCH_SIZE, 'observe', broken)
+    with pytest.raises(RuntimeError, match='métrica rota'):
+        batcher.predict({'x': 1}, timeout=5)
+    monkeypatch.undo()
+    assert batcher.predict({'x': 9}, timeout=5) == (1, 0.9)
@@ -0,0 +1,55 @@
+"""bundle: export/load round trip of the native model bundle and checksum verification."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('xgboost')
+
+from bundle import BOOSTER_NAME, MANIFEST_NAME, export_bundle, is_bundle, load_bundle, read_manifest
+from utils import get_booster, get_schema, load_model
+
+PROFILE = {
+    'HighBP': 1, 'HighChol': 0, 'CholCheck': 1, 'Smoker': 0, 'Stroke': 0,
+    'HeartDiseaseorAttack': 0, 'PhysActivity': 1, 'Fruits': 1, 'Veggies': 1,
+    'HvyAlcoholConsump': 0, 'AnyHealthcare': 1, 'NoDocbcCost': 0, 'GenHlth': 3,
+    'MentHlth': 2, 'PhysHlth': 0, 'DiffWalk': 0, 'Sex': 1, 'Age': 9,
+    'Education': 5, 'Income': 6, 'BMI': 27.5,
+}
+
+
+@pytest.fixture
+def bundle_dir(tmp_path):
+    path = str(tmp_path / 'bundle_test')
+    export_bundle(load_model(), path, metrics={'recall': 0.8})
+    return path
+
+
+def test_round_trip_gives_the_same_probabilities(bundle_dir):
+    assert is_bundle(bundle_dir)
+    booster, manifest = load_bundle(bundle_dir)
+    original = get_booster(load_model())
+    assert manifest['name'] == 'bundle_test'
+    assert manifest['metrics'] == {'recall': 0.8}
+    assert manifest['features'] == list(original.feature_names)
+    assert booster.feature_names == original.feature_names
+    X = get_schema().transform([PROFILE, {**PROFILE, 'GenHlth': 5, 'BMI': 40.0}])
+    np.testing.assert_array_equal(booster.inplace_predict(X), original.inplace_predict(X))
+
+
+def test_modified_booster_fails_the_checksum(bundle_dir):
+    with open(os.path.join(bundle_dir, BOOSTER_NAME), 'ab') as f:
+        f.write(b'\0')
+    with pytest.raises(ValueError, match='Checksum'):
+        load_bundle(bundle_dir)
+
+
+def test_unknown_format_is_rejected(bundle_dir):
+    path = os.path.join(bundle_dir, MANIFEST_NAME)
+    manifest = read_manifest(bundle_dir)
+    manifest['format'] = 99
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    with pytest.raises(ValueError, match='Formato'):
+        load_bundle(bundle_dir)
@@ -0,0 +1,68 @@
+"""drift: PSI/KL on known distributions and DriftMonitor counts, windows and log lines."""
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+
+from drift import EPSILON, PSI_ALERT, DriftMonitor, kl, psi
+
+# Dos características: un indicador 0/1 y un ordinal 1-3
+REFERENCE = {'features': ['flag', 'level'], 'edges': [[0.5], [1.5, 2.5]],
+             'shares': [[0.5, 0.5], [0.2, 0.3, 0.5]]}
+
+
+def test_identical_distributions_have_no_divergence():
+    shares = np.array([[0.2, 0.3, 0.5], [0.5, 0.5, 0.0]])
+    np.testing.assert_allclose(psi(shares, shares), 0.0, atol=1e-12)
+    np.testing.assert_allclose(kl(shares, shares), 0.0, atol=1e-12)
+    # Conteos y proporciones dan lo mismo
+    np.testing.assert_allclose(psi(shares * 1000, shares), 0.0, atol=1e-12)
+
+
+def test_known_shift():
+    actual, expected = np.array([0.5, 0.5]), np.array([0.25, 0.75])
+    # (0.5-0.25) ln 2 + (0.5-0.75) ln(2/3) = 0.25 ln 3
+    assert psi(actual, expected) == pytest.approx(0.25 * math.log(3))
+    assert kl(actual, expected) == pytest.approx(0.5 * math.log(4 / 3))
+    assert kl(expected, actual) == pytest.approx(0.25 * math.log(0.5) + 0.75 * math.log(1.5))
+    # PSI es simétrico, KL no
+    assert psi(expected, actual) == pytest.approx(psi(actual, expected))
+
+
+def test_empty_bins_are_clipped():
+    value = psi(np.array([100, 0]), np.array([0.5, 0.5]))
+    expected = (1 - 0.5) * math.log(1 / 0.5) + (EPSILON - 0.5) * math.log(EPSILON / 0.5)
+    assert math.isfinite(value) and value == pytest.approx(expected)
+
+
+def _rows(flags, levels):
+    return np.column_stack([flags, levels]).astype(np.float32)
+
+
+def test_monitor_matching_the_reference_has_no_drift():
+    monitor = DriftMonitor(REFERENCE, interval=0, min_rows=10)
+    monitor.observe(_rows([0, 1] * 50, [1] * 20 + [2] * 30 + [3] * 50))
+    snapshot = monitor.snapshot()
+    assert snapshot['rows'] == snapshot['window_rows'] == 100
+    assert snapshot['psi'] == {'flag': 0.0, 'level': 0.0}
+    assert snapshot['drifted'] == [] and snapshot['pid'] == os.getpid()
+
+
+def test_monitor_reports_shifted_feature(tmp_path):
+    log = tmp_path / 'snapshots.jsonl'
+    monitor = DriftMonitor(REFERENCE, log_path=str(log), interval=0, min_rows=10)
+    monitor.observe(_rows([0, 1] * 50, [3] * 100))
+    # Otras características (otro modelo): se cuentan aparte y no se mezclan
+    monitor.observe(_rows([0], [1]), features=('x', 'y'))
+    snapshot = monitor.flush()
+    assert monitor.skipped == 1
+    assert snapshot['psi']['flag'] == 0.0 and snapshot['psi']['level'] >= PSI_ALERT
+    assert snapshot['drifted'] == ['level']
+    assert json.loads(log.read_text())['psi'] == snapshot['psi']
+
+    # Nueva ventana: el total sigue, la ventana empieza vacía y no se escribe
+    snapshot = monitor.flush()
+    assert snapshot['rows'] == 100 and snapshot['window_rows'] == 0 and snapshot['window_psi'] is None
+    assert len(log.read_text().splitlines()) == 1
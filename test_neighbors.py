@@ -0,0 +1,110 @@
+"""neighbors: thermometer encoding, Hamming ordering and index rebuilds on a tiny synthetic dataset."""
+import os
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import neighbors
+from neighbors import N_BITS, NeighborIndex, encode, popcount
+
+PROFILE = {
+    'HighBP': 1, 'HighChol': 0, 'CholCheck': 1, 'Smoker': 0, 'Stroke': 0,
+    'HeartDiseaseorAttack': 0, 'PhysActivity': 1, 'Fruits': 1, 'Veggies': 1,
+    'HvyAlcoholConsump': 0, 'AnyHealthcare': 1, 'NoDocbcCost': 0, 'GenHlth': 3,
+    'MentHlth': 2, 'PhysHlth': 0, 'DiffWalk': 0, 'Sex': 1, 'Age': 9,
+    'Education': 5, 'Income': 6, 'BMI': 27.5,
+}
+
+# Vecinos a distancia conocida del perfil: (cambios, distancia de Hamming, diabetes)
+NEIGHBOURS = [
+    ({}, 0, 1),
+    ({'Smoker': 1}, 1, 0),
+    ({'Age': 7}, 2, 1),
+    ({'HighBP': 0, 'GenHlth': 5}, 3, 0),
+    ({'BMI': 41.0, 'Income': 2}, 7, 1),
+]
+
+
+def _distance(a, b):
+    return int(popcount(encode(a) ^ encode(b))[0])
+
+
+def _index():
+    rows = [{**PROFILE, **change} for change, _, _ in NEIGHBOURS]
+    codes = encode({c: [row[c] for row in rows] for c in PROFILE})
+    return NeighborIndex(codes, np.array([label for _, _, label in NEIGHBOURS], dtype=np.uint8))
+
+
+def test_distance_counts_flags_and_ordinal_steps():
+    assert N_BITS <= 64
+    for change, expected, _ in NEIGHBOURS:
+        assert _distance(PROFILE, {**PROFILE, **change}) == expected
+    # BMI por cubetas: 26 y 29 están en la misma (25-30)
+    assert _distance({**PROFILE, 'BMI': 26.0}, {**PROFILE, 'BMI': 29.0}) == 0
+    # Distancia simétrica; los escalones de cada ordinal se suman
+    a, b = PROFILE, {**PROFILE, 'Age': 2, 'MentHlth': 30}
+    assert _distance(a, b) == _distance(b, a) == 7 + 4
+
+
+def test_encode_scalars_and_arrays_agree():
+    rows = [PROFILE, {**PROFILE, 'Age': 1}]
+    codes = encode({c: [row[c] for row in rows] for c in PROFILE})
+    assert codes.dtype == np.uint64 and codes.shape == (2,)
+    assert codes[0] == encode(PROFILE)[0] and codes[1] == encode(rows[1])[0]
+
+
+def test_query_takes_the_nearest_rows():
+    index = _index()
+    np.testing.assert_array_equal(index.distances(PROFILE), [d for _, d, _ in NEIGHBOURS])
+    assert index.query(PROFILE, k=3) == {'k': 3, 'rate': pytest.approx(2 / 3), 'radius': 2, 'exact_matches': 1}
+    assert index.query(PROFILE, k=1)['rate'] == 1.0
+    # k mayor que el índice: se usan todas las filas
+    assert index.query(PROFILE, k=100)['k'] == len(NEIGHBOURS)
+
+
+def test_ties_at_the_last_distance_are_averaged():
+    codes = encode({c: [PROFILE[c]] + [v] * 2 for c, v in {**PROFILE, 'Smoker': 1}.items()})
+    index = NeighborIndex(codes, np.array([0, 1, 0], dtype=np.uint8))
+    # Dos empates a distancia 1 con tasa 1/2: se toma medio caso
+    assert index.query(PROFILE, k=2)['rate'] == pytest.approx(0.25)
+
+
+@pytest.fixture
+def brfss_csv(tmp_path, monkeypatch):
+    pytest.importorskip('pandas')
+    import data
+
+    monkeypatch.setattr(data, 'CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(neighbors, 'NEIGHBORS_DIR', str(tmp_path / 'neighbors'))
+    monkeypatch.setattr(neighbors, '_index', None)
+    monkeypatch.setattr(neighbors, 'SOURCE_RECHECK_INTERVAL', 0.0)
+    path = tmp_path / 'brfss.csv'
+    _write_csv(path, [label for _, _, label in NEIGHBOURS])
+    return str(path)
+
+
+def _write_csv(path, labels):
+    columns = ['Diabetes_binary'] + list(PROFILE)
+    lines = [','.join(columns)]
+    for (change, _, _), label in zip(NEIGHBOURS, labels):
+        row = {**PROFILE, **change, 'Diabetes_binary': label}
+        lines.append(','.join(f'{float(row[c])}' for c in columns))
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def test_built_index_matches_the_csv(brfss_csv):
+    neighbors.build(brfss_csv, neighbors.NEIGHBORS_DIR)
+    index = NeighborIndex.load(neighbors.NEIGHBORS_DIR)
+    assert not index.is_stale(brfss_csv)
+    assert index.query(PROFILE, k=3) == _index().query(PROFILE, k=3)
+
+
+def test_index_is_rebuilt_when_the_csv_changes(brfss_csv):
+    neighbors.build(brfss_csv, neighbors.NEIGHBORS_DIR)
+    assert neighbors.get_index(brfss_csv).query(PROFILE, k=1)['rate'] == 1.0
+    _write_csv(Path(brfss_csv), [0, 0, 0, 0, 0])
+    os.utime(brfss_csv, ns=(1, 1))
+    index = neighbors.get_index(brfss_csv)
+    assert not index.is_stale(brfss_csv)
+    assert index.query(PROFILE, k=1)['rate'] == 0.0
@@ -0,0 +1,56 @@
+"""percentiles: strata of Age/Sex/Income and PercentileIndex.lookup on a tiny population."""
+import numpy as np
+import pytest
+
+from percentiles import N_STRATA, PercentileIndex, stratum_of
+
+
+def _index(proba, age, sex, income):
+    """Index laid out like percentiles.build: sorted overall, sorted slices per stratum"""
+    proba = np.asarray(proba, dtype=np.float32)
+    strata = stratum_of(age, sex, income)
+    order = np.lexsort((proba, strata))
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(strata, minlength=N_STRATA))])
+    return PercentileIndex('test@0', np.sort(proba), proba[order], offsets)
+
+
+def test_strata_cover_every_code_once():
+    age, sex, income = np.meshgrid(np.arange(1, 14), [0, 1], np.arange(1, 9), indexing='ij')
+    strata = stratum_of(age.ravel(), sex.ravel(), income.ravel())
+    assert sorted(strata.tolist()) == list(range(N_STRATA))
+    assert stratum_of(1, 0, 1) == 0
+    assert stratum_of(13, 1, 8) == N_STRATA - 1
+
+
+@pytest.mark.parametrize('age, sex, income', [(0, 0, 1), (14, 0, 1), (5, 2, 1), (5, -1, 1), (5, 0, 0), (5, 0, 9)])
+def test_stratum_out_of_range(age, sex, income):
+    with pytest.raises(ValueError, match='fuera de rango'):
+        stratum_of(age, sex, income)
+
+
+def test_lookup_overall_and_stratum():
+    # Estrato (9, 1, 6): 0.1, 0.2, 0.3, 0.4; estrato (2, 0, 1): 0.5, 0.9
+    index = _index([0.4, 0.1, 0.9, 0.3, 0.5, 0.2],
+                   age=[9, 9, 2, 9, 2, 9], sex=[1, 1, 0, 1, 0, 1], income=[6, 6, 1, 6, 1, 6])
+    result = index.lookup(0.35, 9, 1, 6)
+    assert result == {'overall': pytest.approx(50.0), 'stratum': pytest.approx(75.0), 'stratum_size': 4}
+    result = index.lookup(0.35, 2, 0, 1)
+    assert result['stratum'] == 0.0 and result['stratum_size'] == 2
+    # Empates: solo cuenta a quienes tienen un riesgo estrictamente menor
+    assert index.lookup(0.5, 2, 0, 1)['stratum'] == 0.0
+    assert index.lookup(1.0, 2, 0, 1)['overall'] == 100.0
+
+
+def test_empty_stratum_has_no_percentile():
+    index = _index([0.2, 0.6], age=[1, 1], sex=[0, 0], income=[1, 1])
+    assert index.lookup(0.5, 13, 1, 8) == {'overall': 50.0, 'stratum': None, 'stratum_size': 0}
+
+
+def test_saved_index_loads_the_same(tmp_path):
+    index = _index([0.4, 0.1, 0.9], age=[9, 9, 2], sex=[1, 1, 0], income=[6, 6, 1])
+    path = str(tmp_path / 'percentiles_test_0.npz')
+    np.savez(path, version=np.array(index.version), overall=index.overall,
+             by_stratum=index.by_stratum, offsets=index.offsets)
+    loaded = PercentileIndex.load(path)
+    assert loaded.version == 'test@0'
+    assert loaded.lookup(0.3, 9, 1, 6) == index.lookup(0.3, 9, 1, 6)
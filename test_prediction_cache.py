@@ -0,0 +1,81 @@
+"""Version scoping of prediction_cache.PredictionCache (memory and SQLite tiers)."""
+import numpy as np
+
+from prediction_cache import LRUCache, PredictionCache
+
+
+def _rows(n=3):
+    return np.arange(n * 4, dtype=np.float32).reshape(n, 4)
+
+
+def test_hit_after_store_same_version():
+    cache = PredictionCache(maxsize=16, ttl=0)
+    X = _rows()
+    keys, _, found = cache.lookup(X, 'v1')
+    assert not found.any()
+    cache.store(keys, np.array([0.1, 0.2, 0.3]), 'v1')
+    _, proba, found = cache.lookup(X, 'v1')
+    assert found.all()
+    np.testing.assert_allclose(proba, [0.1, 0.2, 0.3], rtol=1e-6)
+
+
+def test_other_version_misses():
+    cache = PredictionCache(maxsize=16, ttl=0)
+    X = _rows()
+    keys, _, _ = cache.lookup(X, 'v1')
+    cache.store(keys, np.full(3, 0.9), 'v1')
+    _, _, found = cache.lookup(X, 'v2')
+    assert not found.any()
+
+
+def test_late_store_from_old_model_is_not_served_for_new_one():
+    cache = PredictionCache(maxsize=16, ttl=0)
+    X = _rows()
+    old_keys, _, _ = cache.lookup(X, 'v1')
+    # Otro hilo ya ve el modelo nuevo antes de que termine el que puntuaba con el viejo
+    cache.lookup(X, 'v2')
+    cache.store(old_keys, np.full(3, 0.9), 'v1')
+    _, _, found = cache.lookup(X, 'v2')
+    assert not found.any()
+
+
+def test_sqlite_shared_by_processes_on_different_versions(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    X = _rows()
+    a = PredictionCache(maxsize=16, ttl=0, sqlite_path=path)
+    b = PredictionCache(maxsize=16, ttl=0, sqlite_path=path)
+    keys_a, _, _ = a.lookup(X, 'v1')
+    a.store(keys_a, np.full(3, 0.25), 'v1')
+    keys_b, _, _ = b.lookup(X, 'v2')
+    b.store(keys_b, np.full(3, 0.75), 'v2')
+
+    # Cachés nuevas (sin memoria): todo sale de SQLite y ninguna versión borró a la otra
+    for version, expected in (('v1', 0.25), ('v2', 0.75)):
+        _, proba, found = PredictionCache(maxsize=16, ttl=0, sqlite_path=path).lookup(X, version)
+        assert found.all()
+        np.testing.assert_allclose(proba, expected)
+
+
+def test_lru_evicts_oldest():
+    lru = LRUCache(maxsize=2, ttl=0)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    lru.get('a')
+    lru.put('c', 3)
+    assert lru.get('b') is None
+    assert lru.get('a') == 1 and lru.get('c') == 3
+    assert lru.evictions == 1
+
+
+def test_alternating_versions_keep_both_in_memory():
+    # Durante una recarga se alternan peticiones con la versión vieja y la nueva
+    cache = PredictionCache(maxsize=16, ttl=0)
+    X = _rows()
+    for version, value in (('v1', 0.25), ('v2', 0.75)):
+        keys, _, _ = cache.lookup(X, version)
+        cache.store(keys, np.full(3, value), version)
+    for version, expected in (('v1', 0.25), ('v2', 0.75), ('v1', 0.25)):
+        _, proba, found = cache.lookup(X, version)
+        assert found.all()
+        np.testing.assert_allclose(proba, expected)
+    assert cache.memory.hits == 9
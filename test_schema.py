@@ -0,0 +1,76 @@
+"""schema.FeatureSchema: input formats, GenHlth x BMI and range validation."""
+import numpy as np
+import pytest
+
+from schema import HEALTH_INDEX, FeatureSchema
+from utils import EXPECTED_FEATURES
+
+PROFILE = {
+    'HighBP': 1, 'HighChol': 0, 'CholCheck': 1, 'Smoker': 0, 'Stroke': 0,
+    'HeartDiseaseorAttack': 0, 'PhysActivity': 1, 'Fruits': 1, 'Veggies': 1,
+    'HvyAlcoholConsump': 0, 'AnyHealthcare': 1, 'NoDocbcCost': 0, 'GenHlth': 3,
+    'MentHlth': 2, 'PhysHlth': 0, 'DiffWalk': 0, 'Sex': 1, 'Age': 9,
+    'Education': 5, 'Income': 6, 'BMI': 27.5,
+}
+
+
+@pytest.fixture
+def schema():
+    return FeatureSchema(EXPECTED_FEATURES)
+
+
+def test_dict_in_model_order_with_health_index(schema):
+    X = schema.transform(PROFILE)
+    assert X.shape == (1, len(EXPECTED_FEATURES)) and X.dtype == np.float32
+    for j, name in enumerate(EXPECTED_FEATURES[:-1]):
+        assert X[0, j] == PROFILE[name]
+    # Igual que en el entrenamiento (notebook, celda 15): GenHlth * BMI
+    assert X[0, EXPECTED_FEATURES.index(HEALTH_INDEX)] == np.float32(3 * 27.5)
+
+
+def test_precomputed_index_is_used_as_given(schema):
+    row = {k: v for k, v in PROFILE.items() if k != 'BMI'}
+    row[HEALTH_INDEX] = 100.0
+    assert schema.transform(row)[0, -1] == 100.0
+
+
+def test_dataframe_and_list_give_the_same_matrix(schema):
+    pd = pytest.importorskip('pandas')
+    rows = [PROFILE, {**PROFILE, 'GenHlth': 5, 'BMI': 40.0}]
+    from_rows = schema.transform(rows)
+    from_frame = schema.transform(pd.DataFrame(rows))
+    np.testing.assert_array_equal(from_rows, from_frame)
+    assert from_rows[1, -1] == np.float32(200.0)
+
+
+def test_array_passes_through_and_is_validated(schema):
+    X = schema.transform(PROFILE)
+    np.testing.assert_array_equal(schema.transform(X.copy()), X)
+    with pytest.raises(ValueError):
+        schema.transform(X[:, :-1])
+
+
+def test_preallocated_buffer_is_filled_in_place(schema):
+    out = np.zeros((1, schema.n_features), dtype=np.float32)
+    assert schema.transform(PROFILE, out=out) is out
+    with pytest.raises(ValueError):
+        schema.transform(PROFILE, out=np.zeros((2, schema.n_features), dtype=np.float32))
+
+
+def test_missing_feature_is_reported(schema):
+    row = dict(PROFILE)
+    del row['Age']
+    with pytest.raises(ValueError, match='Faltan.*Age'):
+        schema.transform(row)
+
+
+@pytest.mark.parametrize('name, value', [('Age', 14), ('Age', 0), ('HighBP', 2), ('MentHlth', 31),
+                                         ('BMI', 5.0), ('BMI', 120.0), ('GenHlth', float('nan'))])
+def test_out_of_range_values_are_rejected(schema, name, value):
+    with pytest.raises(ValueError, match='fuera de rango'):
+        schema.transform({**PROFILE, name: value})
+
+
+def test_non_numeric_value_is_rejected(schema):
+    with pytest.raises(ValueError):
+        schema.transform({**PROFILE, 'Sex': 'male'})
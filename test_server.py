@@ -0,0 +1,138 @@
+"""Payload and error handling of server.PredictionHandler over real HTTP/1.1 connections."""
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+from server import PredictionHandler, PredictionServer
+
+SAMPLE_ROW = {
+    'HighBP': 1, 'HighChol': 0, 'CholCheck': 1, 'Smoker': 0, 'Stroke': 0,
+    'HeartDiseaseorAttack': 0, 'PhysActivity': 1, 'Fruits': 1, 'Veggies': 1,
+    'HvyAlcoholConsump': 0, 'AnyHealthcare': 1, 'NoDocbcCost': 0, 'GenHlth': 3,
+    'MentHlth': 2, 'PhysHlth': 0, 'DiffWalk': 0, 'Sex': 1, 'Age': 9,
+    'Education': 5, 'Income': 6, 'BMI': 27.5,
+}
+
+
+@pytest.fixture(scope='module')
+def address():
+    server = PredictionServer(('127.0.0.1', 0), PredictionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def _connect(address):
+    return http.client.HTTPConnection(*address, timeout=10)
+
+
+def _post(conn, path, body, headers=None):
+    conn.request('POST', path, body=body, headers=headers or {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    return response, json.loads(response.read())
+
+
+def test_unknown_path_closes_connection(address):
+    conn = _connect(address)
+    response, payload = _post(conn, '/nope', json.dumps(SAMPLE_ROW))
+    assert response.status == 404
+    assert 'error' in payload
+    assert response.getheader('Connection') == 'close'
+
+
+def test_non_numeric_content_length_is_400(address):
+    conn = _connect(address)
+    conn.putrequest('POST', '/predict')
+    conn.putheader('Content-Length', 'abc')
+    conn.endheaders()
+    response = conn.getresponse()
+    assert response.status == 400
+    assert response.getheader('Connection') == 'close'
+    response.read()
+
+
+def test_empty_body_is_400(address):
+    response, _ = _post(_connect(address), '/predict', b'')
+    assert response.status == 400
+
+
+def test_invalid_json_keeps_connection_usable(address):
+    conn = _connect(address)
+    response, payload = _post(conn, '/predict', b'{not json')
+    assert response.status == 400
+    assert payload['error'].startswith('JSON inválido')
+    # El cuerpo se leyó completo: la siguiente petición en la misma conexión funciona
+    conn.request('GET', '/metrics')
+    response = conn.getresponse()
+    assert response.status == 200
+    response.read()
+
+
+def test_wrong_payload_shape_is_400(address):
+    response, payload = _post(_connect(address), '/predict', json.dumps([1, 2, 3]))
+    assert response.status == 400
+    assert 'error' in payload
+
+
+def test_scoring_failure_is_500(address, monkeypatch):
+    import metrics
+    import server
+
+    def broken(rows, with_version=False):
+        raise RuntimeError("modelo corrupto")
+
+    monkeypatch.setattr(server, 'predict_diabetes_batch', broken)
+    before = metrics.SERVER_ERRORS.value(error='RuntimeError')
+    conn = _connect(address)
+    response, payload = _post(conn, '/predict', json.dumps(SAMPLE_ROW))
+    assert response.status == 500
+    assert 'modelo corrupto' in payload['error']
+    assert metrics.SERVER_ERRORS.value(error='RuntimeError') == before + 1
+    # La conexión sigue sirviendo
+    conn.request('GET', '/metrics')
+    response = conn.getresponse()
+    assert response.status == 200
+    response.read()
+
+
+def _model_available():
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        return False
+    from utils import model_path
+    return os.path.exists(model_path())
+
+
+@pytest.mark.skipif(not _model_available(), reason="xgboost or the model artifact not available")
+class TestPredict:
+    def test_single_row(self, address):
+        response, payload = _post(_connect(address), '/predict', json.dumps(SAMPLE_ROW))
+        assert response.status == 200
+        assert payload['prediction'] in (0, 1)
+        assert 0.0 <= payload['probability'] <= 1.0
+        assert payload['model_version']
+
+    def test_batch_forms_agree(self, address):
+        conn = _connect(address)
+        rows = [SAMPLE_ROW, {**SAMPLE_ROW, 'BMI': 40.0}]
+        _, as_list = _post(conn, '/predict', json.dumps(rows))
+        _, as_instances = _post(conn, '/predict', json.dumps({'instances': rows}))
+        assert len(as_list['predictions']) == 2
+        assert as_list['probabilities'] == as_instances['probabilities']
+
+    def test_missing_feature_is_400(self, address):
+        row = dict(SAMPLE_ROW)
+        del row['Age']
+        response, payload = _post(_connect(address), '/predict', json.dumps(row))
+        assert response.status == 400
+        assert 'Age' in payload['error']
+
+    def test_out_of_range_is_400(self, address):
+        response, _ = _post(_connect(address), '/predict', json.dumps({**SAMPLE_ROW, 'Age': 99}))
+        assert response.status == 400
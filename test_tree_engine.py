@@ -0,0 +1,62 @@
+"""Parity of tree_engine.TreeEnsemble against XGBoost's inplace_predict.
+
+The booster is taken from whatever utils.load_model() returns (an
+XGBClassifier from the .sav or a raw Booster from a bundle).
+
+Uses the notebook's stratified test split when
+diabetes_binary_health_indicators_BRFSS2015.csv is next to this file.
+"""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('xgboost')
+
+from tree_engine import TreeEnsemble
+from utils import EXPECTED_FEATURES, get_booster, load_model
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         'diabetes_binary_health_indicators_BRFSS2015.csv')
+
+
+def _brfss_test_split():
+    from data import add_health_index, load_brfss, split_brfss
+
+    _, X_test, _, _ = split_brfss(add_health_index(load_brfss(DATA_PATH)))
+    return X_test[EXPECTED_FEATURES]
+
+
+@pytest.mark.skipif(not os.path.exists(DATA_PATH), reason="BRFSS CSV not available")
+def test_parity_on_brfss_test_split():
+    booster = get_booster(load_model())
+    X_test = _brfss_test_split().to_numpy(dtype=np.float32)
+    ensemble = TreeEnsemble.from_booster(booster)
+
+    expected = booster.inplace_predict(X_test)
+    got = ensemble.predict_proba(X_test)
+    np.testing.assert_allclose(got, expected, atol=1e-5)
+    assert np.array_equal(got > 0.5, expected > 0.5)
+
+
+def test_parity_single_rows_and_missing_values():
+    booster = get_booster(load_model())
+    ensemble = TreeEnsemble.from_booster(booster)
+    rng = np.random.default_rng(42)
+    X = np.column_stack([rng.integers(0, 2, 200) for _ in range(12)] + [
+        rng.integers(1, 6, 200),   # GenHlth
+        rng.integers(0, 31, 200),  # MentHlth
+        rng.integers(0, 31, 200),  # PhysHlth
+        rng.integers(0, 2, 200),   # DiffWalk
+        rng.integers(0, 2, 200),   # Sex
+        rng.integers(1, 14, 200),  # Age
+        rng.integers(1, 7, 200),   # Education
+        rng.integers(1, 9, 200),   # Income
+        rng.uniform(12, 490, 200),  # Índice_de_Salud_General
+    ]).astype(np.float32)
+    X[::7, 3] = np.nan
+
+    expected = booster.inplace_predict(X)
+    np.testing.assert_allclose(ensemble.predict_proba(X), expected, atol=1e-5)
+    for i in range(5):
+        np.testing.assert_allclose(ensemble.predict_proba(X[i]), expected[i:i + 1], atol=1e-5)
@@ -0,0 +1,163 @@
+"""utils: shared model registry with hot reload, and batch scoring parity."""
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+import utils
+
+
+PROFILE = {
+    'HighBP': 1, 'HighChol': 0, 'CholCheck': 1, 'Smoker': 0, 'Stroke': 0,
+    'HeartDiseaseorAttack': 0, 'PhysActivity': 1, 'Fruits': 1, 'Veggies': 1,
+    'HvyAlcoholConsump': 0, 'AnyHealthcare': 1, 'NoDocbcCost': 0, 'GenHlth': 3,
+    'MentHlth': 2, 'PhysHlth': 0, 'DiffWalk': 0, 'Sex': 1, 'Age': 9,
+    'Education': 5, 'Income': 6, 'BMI': 27.5,
+}
+
+
+class _StubModel:
+    """Picklable stand-in for a model: _read_model only needs feature_names"""
+
+    feature_names = utils.EXPECTED_FEATURES
+
+    def __init__(self, name):
+        self.name = name
+
+
+def _save(path, name):
+    with open(path, 'wb') as f:
+        pickle.dump(_StubModel(name), f)
+    return str(path)
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    """Empty registry whose default model is tmp_path/a.sav and whose current link is tmp_path/current"""
+    monkeypatch.delenv('DIABETES_MODEL_PATH', raising=False)
+    monkeypatch.setattr(utils, 'DEFAULT_MODEL_PATH', _save(tmp_path / 'a.sav', 'a'))
+    monkeypatch.setattr(utils, 'CURRENT_MODEL_LINK', str(tmp_path / 'current'))
+    monkeypatch.setattr(utils, 'RELOAD_CHECK_INTERVAL', 0.0)
+    for key in ('model', 'path', 'requested', 'mtime', 'checksum', 'version'):
+        monkeypatch.setitem(utils._registry, key, None)
+    monkeypatch.setitem(utils._registry, 'current', (None, None))
+    monkeypatch.setitem(utils._registry, 'last_check', 0.0)
+    return tmp_path
+
+
+def test_model_is_loaded_once(models_dir, monkeypatch):
+    monkeypatch.setattr(utils, 'RELOAD_CHECK_INTERVAL', 3600.0)
+    first = utils.load_model()
+    loads = utils._registry['load_count']
+    assert utils.load_model() is first
+    assert utils._registry['load_count'] == loads
+
+
+def test_current_link_created_after_startup_is_picked_up(models_dir):
+    assert utils.load_model().name == 'a'
+    os.symlink(_save(models_dir / 'b.sav', 'b'), models_dir / 'current')
+    assert utils.load_model().name == 'b'
+    assert utils.model_stats()['version'].startswith('b@')
+
+
+def test_current_link_moved_to_another_model(models_dir):
+    os.symlink(_save(models_dir / 'b.sav', 'b'), models_dir / 'current')
+    assert utils.load_model().name == 'b'
+    # Como incremental.py: enlace nuevo y os.replace sobre models/current
+    os.symlink(_save(models_dir / 'c.sav', 'c'), models_dir / 'current.tmp')
+    os.replace(models_dir / 'current.tmp', models_dir / 'current')
+    model = utils.load_model()
+    assert model.name == 'c'
+    assert utils._registry['current'] == (model, utils.model_stats()['version'])
+
+
+def test_unchanged_content_is_not_reloaded(models_dir):
+    first = utils.load_model()
+    loads = utils._registry['load_count']
+    os.utime(utils.DEFAULT_MODEL_PATH, ns=(1, 1))
+    assert utils.load_model() is first
+    assert utils._registry['load_count'] == loads
+
+
+def _profiles(n=50):
+    rng = np.random.default_rng(7)
+    return [{**PROFILE, 'HighBP': int(rng.integers(2)), 'Smoker': int(rng.integers(2)),
+             'GenHlth': int(rng.integers(1, 6)), 'Age': int(rng.integers(1, 14)),
+             'Income': int(rng.integers(1, 9)), 'BMI': float(rng.uniform(15, 50))}
+            for _ in range(n)]
+
+
+@pytest.fixture
+def no_cache(monkeypatch):
+    """Score with the model itself, without prediction cache or batcher"""
+    pytest.importorskip('xgboost')
+    monkeypatch.setattr(utils, '_cache', None)
+    monkeypatch.setattr(utils, '_batcher', None)
+
+
+def test_batch_matches_single_rows(no_cache):
+    profiles = _profiles()
+    preds, probas = utils.predict_diabetes_batch(profiles)
+    assert preds.shape == probas.shape == (len(profiles),)
+    for profile, pred, proba in zip(profiles, preds, probas):
+        single_pred, single_proba = utils.predict_diabetes(profile)
+        assert single_pred == pred
+        assert single_proba == pytest.approx(proba, abs=1e-6)
+
+
+def test_batch_matches_the_model_on_every_input_format(no_cache):
+    pd = pytest.importorskip('pandas')
+    profiles = _profiles()
+    X = utils.get_schema().transform(profiles)
+    expected = utils.get_booster(utils.load_model()).inplace_predict(X)
+    for data in (profiles, pd.DataFrame(profiles), X):
+        preds, probas = utils.predict_diabetes_batch(data)
+        assert probas.dtype == np.float32
+        np.testing.assert_allclose(probas, expected, atol=1e-6)
+        np.testing.assert_array_equal(preds, (expected > 0.5).astype(np.int64))
+
+
+def test_empty_batch(no_cache):
+    preds, probas = utils.predict_diabetes_batch([])
+    assert len(preds) == len(probas) == 0
+
+
+def test_what_if_deltas_match_scoring_each_change(no_cache):
+    base_proba, table = utils.what_if(PROFILE)
+    assert base_proba == pytest.approx(float(utils.predict_diabetes(PROFILE)[1]), abs=1e-6)
+    assert [row['delta'] for row in table] == sorted(row['delta'] for row in table)
+    changed = [{**PROFILE, row['feature']: row['to']} for row in table]
+    _, probas = utils.predict_diabetes_batch(changed)
+    for row, proba in zip(table, probas):
+        assert row['proba'] == pytest.approx(float(proba), abs=1e-6)
+        assert row['delta'] == pytest.approx(row['proba'] - base_proba, abs=1e-6)
+    features = {row['feature'] for row in table}
+    assert features == set(utils.WHAT_IF_FLAGS) | {'GenHlth', 'BMI'}
+    # BMI 27.5 es el del perfil: no aparece como cambio
+    assert 27.5 not in [row['to'] for row in table if row['feature'] == 'BMI']
+
+
+def test_what_if_recomputes_the_health_index(no_cache, monkeypatch):
+    scored = []
+    score = utils._score
+    monkeypatch.setattr(utils, '_score', lambda model, X: scored.append(X.copy()) or score(model, X))
+    utils.what_if(PROFILE, bmi_grid=(40.0,))
+    X = scored[0]
+    schema = utils.get_schema()
+    genhlth = X[:, schema.features.index('GenHlth')]
+    index = X[:, schema.features.index('Índice_de_Salud_General')]
+    # Cada variante trae su propio GenHlth * BMI, no el índice del perfil base
+    assert set(zip(genhlth.tolist(), index.tolist())) == {
+        (3.0, np.float32(3 * 27.5)), (2.0, np.float32(2 * 27.5)), (4.0, np.float32(4 * 27.5)),
+        (3.0, np.float32(3 * 40.0)),
+    }
+
+
+def test_what_if_accepts_a_precomputed_index(no_cache):
+    profile = {k: v for k, v in PROFILE.items() if k != 'BMI'}
+    profile['Índice_de_Salud_General'] = 3 * 27.5
+    base_proba, table = utils.what_if(profile)
+    expected_proba, expected = utils.what_if(PROFILE)
+    assert base_proba == pytest.approx(expected_proba, abs=1e-6)
+    assert [(r['feature'], r['to']) for r in table] == [(r['feature'], r['to']) for r in expected]
@@ -0,0 +1,121 @@
+"""Pure-NumPy evaluator for the trained XGBoost ensemble.
+
+The booster's trees are read once into flat arrays (feature index, threshold,
+children, default direction and leaf value) and evaluated with vectorized
+traversal: every row walks every tree at the same time, one level per step.
+This skips the DataFrame validation, DMatrix construction and thread dispatch
+that dominate `predict_proba` for a single row.
+"""
+import json
+
+import numpy as np
+
+
+class TreeEnsemble:
+    """Flat-array copy of a binary:logistic gbtree booster"""
+
+    def __init__(self, feature, threshold, left, right, default_left, value,
+                 offsets, max_depth, base_margin, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.offsets = offsets
+        self.max_depth = max_depth
+        self.base_margin = base_margin
+        self.feature_names = feature_names
+
+    @property
+    def n_trees(self):
+        return len(self.offsets)
+
+    @classmethod
+    def from_booster(cls, booster):
+        """Compile an xgboost.Booster (or XGBClassifier) into flat arrays"""
+        if hasattr(booster, 'get_booster'):
+            booster = booster.get_booster()
+        model = json.loads(bytes(booster.save_raw(raw_format='json')))
+        learner = model['learner']
+
+        objective = learner['objective']['name']
+        if objective != 'binary:logistic':
+            raise ValueError(f"Objetivo no soportado: {objective}")
+        gbm = learner['gradient_booster']
+        if gbm['name'] != 'gbtree':
+            raise ValueError(f"Booster no soportado: {gbm['name']}")
+
+        # base_score se guarda como probabilidad ("5E-1" o "[5E-1]" según la versión)
+        base_score = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        trees = gbm['model']['trees']
+        features, thresholds, lefts, rights, defaults, values = [], [], [], [], [], []
+        offsets = np.zeros(len(trees), dtype=np.int64)
+        max_depth = 0
+        start = 0
+        for i, tree in enumerate(trees):
+            if any(tree.get('split_type', [])):
+                raise ValueError("Los splits categóricos no están soportados")
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            right = np.asarray(tree['right_children'], dtype=np.int64)
+            cond = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = left == -1
+            own = np.arange(len(left), dtype=np.int64)
+
+            # Las hojas apuntan a sí mismas: el recorrido se queda quieto al llegar
+            features.append(np.where(is_leaf, 0, tree['split_indices']).astype(np.int32))
+            thresholds.append(np.where(is_leaf, np.float32(0), cond))
+            lefts.append(np.where(is_leaf, own, left) + start)
+            rights.append(np.where(is_leaf, own, right) + start)
+            defaults.append(np.asarray(tree['default_left'], dtype=bool))
+            values.append(np.where(is_leaf, cond, np.float32(0)))
+
+            max_depth = max(max_depth, _tree_depth(left, right))
+            offsets[i] = start
+            start += len(left)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            default_left=np.concatenate(defaults),
+            value=np.concatenate(values),
+            offsets=offsets,
+            max_depth=max_depth,
+            base_margin=base_margin,
+            feature_names=booster.feature_names,
+        )
+
+    def predict_margin(self, X):
+        """Raw scores (log-odds) for a 2-D array, or a 1-D array for one row"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        node = np.broadcast_to(self.offsets, (X.shape[0], self.n_trees))
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = x < self.threshold[node]
+            missing = np.isnan(x)
+            if missing.any():
+                go_left = np.where(missing, self.default_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        return self.value[node].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        """Probability of the positive class"""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+
+def _tree_depth(left, right):
+    depth = 0
+    level = [0]
+    while level:
+        children = [c for n in level for c in (left[n], right[n]) if c != -1]
+        if children:
+            depth += 1
+        level = children
+    return depth
@@ -0,0 +1,276 @@
+"""Resumable hyperparameter search with successive halving on boosting rounds.
+
+Replaces RandomizedSearchCV (notebook cells 22-24). The same grid is
+sampled; every configuration is scored with the mean recall of a 3-fold
+stratified CV (the same folds as cv=3), but boosting is done in rungs: after
+min_rounds, min_rounds*eta, ... trees only the best 1/eta configurations
+keep training, continuing their boosters instead of starting over.
+
+Each finished (trial, rung) is appended to trials.jsonl and the fold
+boosters are saved next to it, so an interrupted run resumes where it left
+off. The best configuration is refit on the whole training split and written
+as a bundle (bundle.py) that utils.load_model can serve.
+
+Uso:
+    python tuning.py --checkpoint models/tuning --out models/bundle_tuned
+    python tuning.py --checkpoint models/tuning --out models/bundle_tuned --jobs 4 --nthread 2
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Mismo espacio de búsqueda que la celda 22 del notebook
+SEARCH_SPACE = {
+    'n_estimators': [100, 200, 300],
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.01, 0.05, 0.1],
+    'subsample': [0.7, 0.8, 1.0],
+    'colsample_bytree': [0.7, 0.8, 1.0],
+    'scale_pos_weight': [1, 3, 6, 9],
+}
+
+TRIALS_NAME = 'trials.jsonl'
+RUN_NAME = 'run.json'
+
+
+def sample_configs(n_trials, seed=42, space=SEARCH_SPACE):
+    """n_trials distinct configurations drawn from the grid"""
+    names = sorted(space)
+    grid = list(itertools.product(*(space[k] for k in names)))
+    chosen = random.Random(seed).sample(grid, min(n_trials, len(grid)))
+    return [dict(zip(names, values)) for values in chosen]
+
+
+def trial_id(config):
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:10]
+
+
+def rung_rounds(max_rounds, min_rounds=25, eta=3):
+    """Boosting rounds at the end of each rung: min_rounds, min_rounds*eta, ..., max_rounds"""
+    rounds = []
+    r = min_rounds
+    while r < max_rounds:
+        rounds.append(r)
+        r *= eta
+    rounds.append(max_rounds)
+    return rounds
+
+
+def booster_params(config, nthread, seed=42):
+    params = {k: v for k, v in config.items() if k != 'n_estimators'}
+    params.update({
+        'objective': 'binary:logistic',
+        'eval_metric': 'logloss',
+        'tree_method': 'hist',
+        'nthread': nthread,
+        'seed': seed,
+    })
+    return params
+
+
+def recall(y_true, margin):
+    """Recall at the 0.5 threshold (margin > 0)"""
+    positives = y_true == 1
+    return float(np.count_nonzero(margin[positives] > 0) / max(np.count_nonzero(positives), 1))
+
+
+class Checkpoint:
+    """trials.jsonl plus one saved booster per (trial, fold)"""
+
+    def __init__(self, directory, run):
+        self.directory = directory
+        self.path = os.path.join(directory, TRIALS_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'boosters'), exist_ok=True)
+
+        run_path = os.path.join(directory, RUN_NAME)
+        if os.path.exists(run_path):
+            with open(run_path, encoding='utf-8') as f:
+                previous = json.load(f)
+            if previous != run:
+                raise ValueError(f"El checkpoint {directory} es de otra búsqueda: {previous}")
+        else:
+            with open(run_path, 'w', encoding='utf-8') as f:
+                json.dump(run, f, indent=2)
+
+        self.results = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # última línea incompleta si el proceso murió escribiendo
+                    self.results[(record['trial'], record['rung'])] = record
+
+    def record(self, record):
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.results[(record['trial'], record['rung'])] = record
+
+    def booster_path(self, tid, fold):
+        return os.path.join(self.directory, 'boosters', f'{tid}_{fold}.ubj')
+
+
+class HalvingSearch:
+    """Successive halving over a list of configurations with k-fold recall"""
+
+    def __init__(self, X, y, configs, checkpoint, folds=3, min_rounds=25, eta=3, jobs=1, nthread=None,
+                 seed=42, log=sys.stderr):
+        from sklearn.model_selection import StratifiedKFold
+
+        self.X = X
+        self.y = np.asarray(y)
+        self.configs = {trial_id(c): c for c in configs}
+        self.checkpoint = checkpoint
+        self.min_rounds = min_rounds
+        self.eta = eta
+        self.jobs = max(1, jobs)
+        self.nthread = nthread or max(1, (os.cpu_count() or 1) // self.jobs)
+        self.seed = seed
+        self.log = log
+        # Igual que cv=3 en RandomizedSearchCV: StratifiedKFold sin barajar
+        self.folds = list(StratifiedKFold(folds).split(np.zeros(len(self.y)), self.y))
+
+    def _matrices(self, fold):
+        import xgboost
+
+        train_idx, valid_idx = self.folds[fold]
+        X = self.X.iloc if hasattr(self.X, 'iloc') else self.X
+        dtrain = xgboost.DMatrix(X[train_idx], label=self.y[train_idx], nthread=self.nthread)
+        dvalid = xgboost.DMatrix(X[valid_idx], nthread=self.nthread)
+        return dtrain, dvalid, self.y[valid_idx]
+
+    def _run_trial(self, tid, rung, rounds):
+        """Train (or continue) every fold booster of one trial up to `rounds` trees"""
+        import xgboost
+
+        config = self.configs[tid]
+        params = booster_params(config, self.nthread, self.seed)
+        start = time.perf_counter()
+        fold_recall = []
+        for fold in range(len(self.folds)):
+            dtrain, dvalid, y_valid = self._matrices(fold)
+            path = self.checkpoint.booster_path(tid, fold)
+            # Booster guardado en un rung anterior: se continúa desde ahí
+            booster = xgboost.Booster(model_file=path) if os.path.exists(path) else None
+            done = booster.num_boosted_rounds() if booster is not None else 0
+            if done < rounds:
+                booster = xgboost.train(params, dtrain, num_boost_round=rounds - done, xgb_model=booster)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(booster.save_raw(raw_format='ubj'))
+                os.replace(path + '.tmp', path)
+            margin = booster.predict(dvalid, output_margin=True, iteration_range=(0, rounds))
+            fold_recall.append(recall(y_valid, margin))
+
+        record = {
+            'trial': tid,
+            'rung': rung,
+            'rounds': rounds,
+            'params': config,
+            'recall': float(np.mean(fold_recall)),
+            'fold_recall': fold_recall,
+            'seconds': time.perf_counter() - start,
+        }
+        self.checkpoint.record(record)
+        return record
+
+    def run(self):
+        """Run every rung and return the ranked records of the last one"""
+        alive = list(self.configs)
+        max_rounds = max(c['n_estimators'] for c in self.configs.values())
+        schedule = rung_rounds(max_rounds, self.min_rounds, self.eta)
+
+        for rung, budget in enumerate(schedule):
+            pending = []
+            for tid in alive:
+                rounds = min(budget, self.configs[tid]['n_estimators'])
+                if (tid, rung) not in self.checkpoint.results:
+                    pending.append((tid, rung, rounds))
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(self.jobs) as pool:
+                list(pool.map(lambda args: self._run_trial(*args), pending))
+
+            ranked = sorted((self.checkpoint.results[(tid, rung)] for tid in alive),
+                            key=lambda r: (-r['recall'], r['rounds'], r['trial']))
+            print(f"rung {rung}: {budget:4d} árboles, {len(alive):3d} configuraciones "
+                  f"({len(pending)} nuevas, {time.perf_counter() - start:.1f} s), "
+                  f"mejor recall {ranked[0]['recall']:.4f}", file=self.log)
+
+            if rung == len(schedule) - 1:
+                return ranked
+            alive = [r['trial'] for r in ranked[:max(1, math.ceil(len(ranked) / self.eta))]]
+
+
+def fit_best(config, X_train, y_train, X_test, y_test, nthread=None, seed=42):
+    """Refit the best configuration on the whole training split and evaluate it on the test split"""
+    import xgboost
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+
+    params = booster_params(config, nthread or os.cpu_count() or 1, seed)
+    booster = xgboost.train(params, xgboost.DMatrix(X_train, label=y_train), num_boost_round=config['n_estimators'])
+    y_pred = (booster.predict(xgboost.DMatrix(X_test)) > 0.5).astype(int)
+    metrics = {
+        'accuracy_test': float(accuracy_score(y_test, y_pred)),
+        'recall_test': float(recall_score(y_test, y_pred)),
+        'precision_test': float(precision_score(y_test, y_pred)),
+        'f1_test': float(f1_score(y_test, y_pred)),
+    }
+    return booster, params, metrics
+
+
+def main(argv=None):
+    from bundle import export_bundle
+    from data import DATA_PATH, add_health_index, load_brfss, split_brfss
+
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search with checkpoints")
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--checkpoint', default='models/tuning', help="directory for trials.jsonl and boosters")
+    parser.add_argument('--out', default='models/bundle_tuned', help="bundle directory for the best model")
+    parser.add_argument('--trials', type=int, default=30, help="configurations sampled from the grid")
+    parser.add_argument('--min-rounds', type=int, default=25, help="trees in the first rung")
+    parser.add_argument('--eta', type=int, default=3, help="keep 1/eta configurations per rung")
+    parser.add_argument('--jobs', type=int, default=1, help="trials trained in parallel")
+    parser.add_argument('--nthread', type=int, default=None, help="XGBoost threads per trial")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    df = add_health_index(load_brfss(args.data))
+    X_train, X_test, y_train, y_test = split_brfss(df)
+
+    configs = sample_configs(args.trials, args.seed)
+    run = {'trials': args.trials, 'seed': args.seed, 'min_rounds': args.min_rounds, 'eta': args.eta,
+           'space': SEARCH_SPACE, 'rows': len(X_train)}
+    checkpoint = Checkpoint(args.checkpoint, run)
+    search = HalvingSearch(X_train, y_train, configs, checkpoint, min_rounds=args.min_rounds, eta=args.eta,
+                           jobs=args.jobs, nthread=args.nthread, seed=args.seed)
+    ranked = search.run()
+    best = ranked[0]
+    print("Mejores hiperparámetros:", best['params'], file=sys.stderr)
+    print("Mejor Recall:", best['recall'], file=sys.stderr)
+
+    booster, params, metrics = fit_best(best['params'], X_train, y_train, X_test, y_test, args.nthread, args.seed)
+    metrics['cv_recall'] = best['recall']
+    export_bundle(booster, args.out, metrics=metrics, params={**params, 'n_estimators': best['params']['n_estimators']})
+    print(json.dumps({'bundle': args.out, 'params': best['params'], 'metrics': metrics,
+                      'seconds': round(time.perf_counter() - start, 1)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,536 @@
+import hashlib
+import os
 import pickle
-import pandas as pd
-
-def load_model():
-    """Load trained model from file"""
-    with open('models/modelo_optimo_1.0_9_100_7_0.01_0.7_42.sav', 'rb') as f:
-        model = pickle.load(f)
-        # Verificar las características del modelo
-        print("Características del modelo:", model.get_booster().feature_names)
+import sys
+import threading
+import time
+import numpy as np
+
+import metrics
+from bundle import MANIFEST_NAME, is_bundle, load_bundle
+from prediction_cache import LRUCache, PredictionCache, feature_keys
+from schema import FeatureSchema
+
+# Ruta del modelo: un .sav (pickle) o un directorio bundle (ver bundle.py).
+# Si existe models/current (enlace que mueve incremental.py) se usa ese; se
+# puede sobreescribir con la variable de entorno DIABETES_MODEL_PATH
+_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+CURRENT_MODEL_LINK = os.path.join(_MODELS_DIR, 'current')
+DEFAULT_MODEL_PATH = os.path.join(_MODELS_DIR, 'modelo_optimo_1.0_9_100_7_0.01_0.7_42.sav')
+
+
+def model_path():
+    """Path of the model to serve: DIABETES_MODEL_PATH, else models/current if it
+    exists, else the default .sav. Resolved on every call, so a models/current
+    created after startup is picked up on the next reload check."""
+    env = os.environ.get('DIABETES_MODEL_PATH')
+    if env:
+        return env
+    return CURRENT_MODEL_LINK if os.path.exists(CURRENT_MODEL_LINK) else DEFAULT_MODEL_PATH
+
+
+# Cada cuantos segundos se revisa si el archivo del modelo cambió
+RELOAD_CHECK_INTERVAL = float(os.environ.get('DIABETES_RELOAD_INTERVAL', '2.0'))
+
+# Motor de inferencia: 'xgboost' (predict_proba) o 'numpy' (tree_engine.TreeEnsemble)
+ENGINES = ('xgboost', 'numpy')
+_engine = os.environ.get('DIABETES_ENGINE', 'xgboost')
+
+# Caché de predicciones (ver prediction_cache.py). Solo se usa en lotes pequeños,
+# que es el tráfico interactivo; los lotes grandes van directo al modelo.
+CACHE_MAX_BATCH = 256
+_cache = None
+
+# Contribuciones ya calculadas, por versión del modelo + vector de características
+_explain_cache = LRUCache(maxsize=2048, ttl=0)
+
+# Micro-batching de predict_diabetes entre sesiones concurrentes (ver batcher.py)
+_batcher = None
+
+# Monitor de deriva de las entradas (ver drift.py)
+_drift = None
+
+# Modelo challenger puntuado en sombra (ver shadow.py)
+_shadow = None
+
+# Registro del modelo compartido por todas las sesiones e hilos del proceso
+_model_lock = threading.Lock()
+_registry = {
+    'model': None,
+    'current': (None, None),
+    'path': None,
+    'requested': None,
+    'mtime': None,
+    'checksum': None,
+    'version': None,
+    'load_count': 0,
+    'last_load_seconds': None,
+    'total_load_seconds': 0.0,
+    'loaded_at': None,
+    'last_check': 0.0,
+}
+
+
+def _file_checksum(path):
+    """SHA-256 of the model file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _artifact_file(path):
+    """File watched for changes: the .sav itself or the bundle's manifest"""
+    if os.path.isdir(path):
+        return os.path.join(path, MANIFEST_NAME)
+    return path
+
+
+def _read_model(path):
+    if is_bundle(path):
+        # Bundle nativo: se carga el Booster directamente, sin pickle ni sklearn
+        model, _ = load_bundle(path)
+    else:
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+    # Verificar las características del modelo
+    print("Características del modelo:", get_booster(model).feature_names, file=sys.stderr)
+    return model
+
+
+def get_booster(model):
+    """xgboost.Booster behind an XGBClassifier, or the Booster itself"""
+    return model.get_booster() if hasattr(model, 'get_booster') else model
+
+
+def _refresh_model(path):
+    """Reload the model if the file changed. Must be called with _model_lock held."""
+    loaded = _registry['model'] is not None and _registry['path'] == path
+    try:
+        mtime = os.stat(_artifact_file(path)).st_mtime_ns
+    except FileNotFoundError:
+        if loaded:
+            # El archivo se está reemplazando: seguimos con el modelo actual
+            return
+        raise
+    if loaded and _registry['mtime'] == mtime:
+        return
+    checksum = _file_checksum(_artifact_file(path))
+    if loaded and _registry['checksum'] == checksum:
+        # Solo cambió el mtime (p. ej. touch), el contenido es el mismo
+        _registry['mtime'] = mtime
+        return
+    start = time.perf_counter()
+    try:
+        model = _read_model(path)
+    except Exception as e:
+        if not loaded:
+            raise
+        print(f"No se pudo recargar el modelo, se mantiene la versión anterior: {e}", file=sys.stderr)
+        return
+    elapsed = time.perf_counter() - start
+    version = f"{os.path.splitext(os.path.basename(os.path.realpath(path)))[0]}@{checksum[:12]}"
+    metrics.set_model_version(version)
+    metrics.MODEL_LOADS.inc()
+    metrics.MODEL_LOAD_SECONDS.observe(elapsed)
+    # Reemplazo atómico: los hilos que ya tienen la referencia anterior la siguen usando
+    _registry.update(
+        model=model,
+        current=(model, version),
+        path=path,
+        mtime=mtime,
+        checksum=checksum,
+        version=version,
+        load_count=_registry['load_count'] + 1,
+        last_load_seconds=elapsed,
+        total_load_seconds=_registry['total_load_seconds'] + elapsed,
+        loaded_at=time.time(),
+    )
+
+
+def load_model(path=None):
+    """Return the shared trained model, loading it on first use and
+    reloading it when the file's mtime and checksum change.
+
+    Without `path`, model_path() is resolved again on every reload check."""
+    now = time.monotonic()
+    model = _registry['model']
+    if (model is not None and _registry['requested'] == path
+            and now - _registry['last_check'] < RELOAD_CHECK_INTERVAL):
         return model
+    with _model_lock:
+        if (_registry['model'] is None or _registry['requested'] != path
+                or now - _registry['last_check'] >= RELOAD_CHECK_INTERVAL):
+            _refresh_model(path or model_path())
+            _registry['requested'] = path
+            _registry['last_check'] = time.monotonic()
+        return _registry['model']
+
+
+def set_engine(name):
+    """Select the inference engine used by predict_diabetes/predict_diabetes_batch"""
+    global _engine
+    if name not in ENGINES:
+        raise ValueError(f"Motor desconocido: {name}. Opciones: {ENGINES}")
+    _engine = name
+
+
+def get_engine():
+    return _engine
+
+
+# Objetos derivados del modelo (esquema, árboles compilados), se reconstruyen al recargar
+_derived = {}
+
+
+def _model_cached(name, model, build):
+    cached_model, value = _derived.get(name, (None, None))
+    if cached_model is not model:
+        value = build(model)
+        _derived[name] = (model, value)
+    return value
+
+
+def _compiled_ensemble(model):
+    """NumPy copy of the model's trees, rebuilt only when the model is reloaded"""
+    from tree_engine import TreeEnsemble
+    return _model_cached('ensemble', model, TreeEnsemble.from_booster)
+
+
+def get_schema(model=None):
+    """FeatureSchema compiled from the booster's feature names"""
+    return _model_cached('schema', model or load_model(), FeatureSchema.from_booster)
+
+
+def configure_cache(enabled=True, maxsize=4096, ttl=3600.0, sqlite_path=None,
+                    sqlite_ttl=24 * 3600.0, sqlite_max_entries=1_000_000):
+    """Enable (or disable with enabled=False) the prediction cache"""
+    global _cache
+    _cache = PredictionCache(maxsize, ttl, sqlite_path, sqlite_ttl, sqlite_max_entries) if enabled else None
+    return _cache
+
+
+def cache_stats():
+    """Hit rates of the prediction cache, or None if it is disabled"""
+    return _cache.stats() if _cache is not None else None
+
+
+if os.environ.get('DIABETES_CACHE', '1') != '0':
+    configure_cache(
+        maxsize=int(os.environ.get('DIABETES_CACHE_SIZE', '4096')),
+        ttl=float(os.environ.get('DIABETES_CACHE_TTL', '3600')),
+        sqlite_path=os.environ.get('DIABETES_CACHE_DB') or None,
+    )
+
+
+_prewarm_thread = None
+
+
+def prewarm_model():
+    """Load the model, compile the schema and run one dummy inference on a
+    background thread, so the first real prediction doesn't pay for them.
+
+    Safe to call many times: only the first call starts the thread.
+    """
+    global _prewarm_thread
+    with _model_lock:
+        if _prewarm_thread is not None:
+            return _prewarm_thread
+
+        def warm():
+            try:
+                model = load_model()
+                schema = get_schema(model)
+                dummy = np.zeros((1, schema.n_features), dtype=np.float32)
+                if _engine == 'numpy':
+                    _compiled_ensemble(model).predict_proba(dummy)
+                else:
+                    get_booster(model).inplace_predict(dummy)
+            except Exception as e:
+                print(f"No se pudo precargar el modelo: {e}", file=sys.stderr)
+
+        _prewarm_thread = threading.Thread(target=warm, name='model-prewarm', daemon=True)
+        _prewarm_thread.start()
+        return _prewarm_thread
+
+
+def model_stats():
+    """Load count, load timings and version of the shared model"""
+    with _model_lock:
+        return {k: v for k, v in _registry.items() if k not in ('model', 'current')}
+
+# Lista con los nombres EXACTOS que espera el modelo, en el orden de entrenamiento
+EXPECTED_FEATURES = [
+    'HighBP', 'HighChol', 'CholCheck', 'Smoker', 'Stroke',
+    'HeartDiseaseorAttack', 'PhysActivity', 'Fruits', 'Veggies',
+    'HvyAlcoholConsump', 'AnyHealthcare', 'NoDocbcCost', 'GenHlth',
+    'MentHlth', 'PhysHlth', 'DiffWalk', 'Sex', 'Age', 'Education',
+    'Income', 'Índice_de_Salud_General'  # Nombre CORRECTO en español
+]
+
+
+def _score(model, X):
+    """Probability of diabetes (float32, like the cache) for a validated float32 feature matrix"""
+    with metrics.INFERENCE_SECONDS.time():
+        if _engine == 'numpy':
+            proba = _compiled_ensemble(model).predict_proba(X)
+        else:
+            proba = get_booster(model).inplace_predict(X)
+    return np.asarray(proba, dtype=np.float32)
+
+
+def predict_diabetes_batch(data, out=None, monitor=True, with_version=False):
+    """Score many rows at once.
+
+    `data` is a dict, a list of dicts, a DataFrame (with BMI, or an already
+    computed Índice_de_Salud_General) or a 2-D NumPy array in EXPECTED_FEATURES
+    order. `out` is an optional preallocated float32 buffer for the features.
+    With `monitor=False` the rows are not passed to the drift monitor or the
+    shadow model (for synthetic rows such as the what-if variants).
+    With `with_version=True` the model version that scored the rows is
+    returned as a third value.
+
+    Returns two arrays: predicted labels and probability of diabetes. Labels
+    come from the same probability pass (threshold 0.5, as XGBClassifier.predict).
+    """
+    load_model()
+    # Modelo y versión de la misma carga (se reemplazan juntos al recargar)
+    model, version = _registry['current']
+    schema = get_schema(model)
+    try:
+        with metrics.FEATURE_BUILD_SECONDS.time():
+            X = schema.transform(data, out)
+    except ValueError as e:
+        reason = 'missing' if str(e).startswith('Faltan') else 'invalid'
+        metrics.INPUT_ERRORS.inc(reason=reason)
+        raise
+    if len(X) == 0:
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return (*empty, version) if with_version else empty
+    drift = _drift
+    if monitor and drift is not None:
+        drift.observe(X, schema.features)
+
+    cache = _cache
+    cached = 0
+    seconds = None
+    if cache is not None and len(X) <= CACHE_MAX_BATCH:
+        keys, proba, found = cache.lookup(X, version)
+        missing = ~found
+        cached = int(found.sum())
+        if cached < len(X):
+            start = time.perf_counter()
+            proba[missing] = _score(model, X[missing])
+            seconds = time.perf_counter() - start
+            cache.store([k for k, m in zip(keys, missing) if m], proba[missing], version)
+    else:
+        start = time.perf_counter()
+        proba = _score(model, X)
+        seconds = time.perf_counter() - start
+    metrics.PREDICTIONS.inc(len(X))
+    shadow = _shadow
+    if monitor and shadow is not None:
+        # Latencia del modelo solo si puntuó todas las filas, comparable con la del challenger
+        shadow.submit(X, schema.features, proba, None if cached else seconds, version, cached)
+    pred = (proba > 0.5).astype(np.int64)
+    if with_version:
+        return pred, proba, version
+    return pred, proba
+
 
 def predict_diabetes(input_data):
-    # Convertir input_data en DataFrame
-    input_df = pd.DataFrame([input_data])
-    
-    # Lista actualizada con los nombres EXACTOS que espera el modelo
-    expected_features = [
-        'HighBP', 'HighChol', 'CholCheck', 'Smoker', 'Stroke',
-        'HeartDiseaseorAttack', 'PhysActivity', 'Fruits', 'Veggies',
-        'HvyAlcoholConsump', 'AnyHealthcare', 'NoDocbcCost', 'GenHlth',
-        'MentHlth', 'PhysHlth', 'DiffWalk', 'Sex', 'Age', 'Education',
-        'Income', 'Índice_de_Salud_General'  # Nombre CORRECTO en español
-    ]
-    
-    # Verificar y reordenar
-    missing = [f for f in expected_features if f not in input_df.columns]
+    batcher = _batcher
+    if batcher is not None and isinstance(input_data, dict):
+        return batcher.predict(input_data)
+    preds, probas = predict_diabetes_batch(input_data)
+    return preds[0], probas[0]
+
+
+def enable_batching(max_batch=64, max_wait=0.002):
+    """Group concurrent predict_diabetes calls into batched model calls"""
+    global _batcher
+    from batcher import MicroBatcher
+    previous, _batcher = _batcher, MicroBatcher(predict_diabetes_batch, max_batch, max_wait)
+    if previous is not None:
+        previous.close()
+    return _batcher
+
+
+def disable_batching():
+    global _batcher
+    previous, _batcher = _batcher, None
+    if previous is not None:
+        previous.close()
+
+
+def enable_drift_monitor(log_path, interval=60.0, reference_path=None):
+    """Count the scored rows against the BRFSS reference and log PSI/KL snapshots"""
+    global _drift
+    import atexit
+    from drift import REFERENCE_PATH, DriftMonitor, load_reference
+    monitor = DriftMonitor(load_reference(reference_path or REFERENCE_PATH), log_path, interval)
+    atexit.register(monitor.close)
+    previous, _drift = _drift, monitor
+    if previous is not None:
+        previous.close()
+    return monitor
+
+
+def disable_drift_monitor():
+    global _drift
+    previous, _drift = _drift, None
+    if previous is not None:
+        previous.close()
+
+
+def enable_shadow(challenger_path, log_path=None, workers=1, max_pending=64):
+    """Score live traffic with a challenger model in the background and log the comparison"""
+    global _shadow
+    import atexit
+    from shadow import SHADOW_LOG, ShadowScorer
+    scorer = ShadowScorer(challenger_path, log_path or SHADOW_LOG, workers, max_pending, CACHE_MAX_BATCH)
+    atexit.register(scorer.close)
+    previous, _shadow = _shadow, scorer
+    if previous is not None:
+        previous.close()
+    return scorer
+
+
+def disable_shadow():
+    global _shadow
+    previous, _shadow = _shadow, None
+    if previous is not None:
+        previous.close()
+
+
+_env_lock = threading.Lock()
+_env_configured = False
+
+
+def configure_from_env():
+    """Enable the optional services configured in the environment
+    (DIABETES_BATCH_WINDOW_MS, DIABETES_DRIFT_LOG, DIABETES_CHALLENGER_PATH),
+    once per process.
+
+    Called by the apps and the CLI/server entry points, never at import:
+    background threads started before a fork don't exist in the children.
+    server.py calls it in each process after forking.
+    """
+    global _env_configured
+    with _env_lock:
+        if _env_configured:
+            return
+        _env_configured = True
+    if os.environ.get('DIABETES_BATCH_WINDOW_MS'):
+        enable_batching(
+            max_batch=int(os.environ.get('DIABETES_BATCH_MAX', '64')),
+            max_wait=float(os.environ['DIABETES_BATCH_WINDOW_MS']) / 1000,
+        )
+    if os.environ.get('DIABETES_DRIFT_LOG'):
+        try:
+            enable_drift_monitor(
+                os.environ['DIABETES_DRIFT_LOG'],
+                interval=float(os.environ.get('DIABETES_DRIFT_INTERVAL', '60')),
+            )
+        except (OSError, ValueError) as e:
+            # Sin perfil de referencia se sigue sirviendo, solo que sin monitor
+            print(f"No se pudo activar el monitor de deriva: {e}", file=sys.stderr)
+    if os.environ.get('DIABETES_CHALLENGER_PATH'):
+        try:
+            enable_shadow(os.environ['DIABETES_CHALLENGER_PATH'])
+        except Exception as e:
+            print(f"No se pudo cargar el modelo challenger: {e}", file=sys.stderr)
+
+
+def _contributions(model, X, features):
+    """TreeSHAP contributions of the booster: one column per feature plus the bias"""
+    import xgboost
+    dmatrix = xgboost.DMatrix(X, feature_names=list(features))
+    return get_booster(model).predict(dmatrix, pred_contribs=True)
+
+
+def explain_diabetes_batch(data):
+    """Per-feature contributions to the prediction, for many rows at once.
+
+    Accepts the same inputs as predict_diabetes_batch. Returns (contribs, bias):
+    contribs has one column per model feature (get_schema().features order), in
+    log-odds, and contribs.sum(axis=1) + bias is the model's margin. Small
+    batches are cached per feature vector and model version.
+    """
+    load_model()
+    model, version = _registry['current']
+    schema = get_schema(model)
+    X = schema.transform(data)
+    values = np.empty((len(X), schema.n_features + 1), dtype=np.float32)
+    if len(X) > CACHE_MAX_BATCH:
+        with metrics.EXPLAIN_SECONDS.time():
+            values[:] = _contributions(model, X, schema.features)
+        return values[:, :-1], values[:, -1]
+
+    keys = [f'{version}:{k}' for k in feature_keys(X)]
+    missing = []
+    for i, key in enumerate(keys):
+        row = _explain_cache.get(key)
+        if row is None:
+            missing.append(i)
+        else:
+            values[i] = row
     if missing:
-        raise ValueError(f"Faltan características: {missing}")
-    
-    input_df = input_df[expected_features]
-    
-    # Cargar modelo y predecir
-    model = load_model()
-    pred = model.predict(input_df)[0]
-    proba = model.predict_proba(input_df)[0][1]
-    
-    return pred, proba
+        with metrics.EXPLAIN_SECONDS.time():
+            values[missing] = _contributions(model, X[missing], schema.features)
+        for i in missing:
+            _explain_cache.put(keys[i], values[i].copy())
+    return values[:, :-1], values[:, -1]
+
+
+def explain_diabetes(input_data, top=None):
+    """[(feature, contribution), ...] for one profile, largest absolute contribution first.
+
+    A positive contribution raises the predicted risk, a negative one lowers it.
+    """
+    contribs, _ = explain_diabetes_batch(input_data)
+    features = get_schema().features
+    order = np.argsort(-np.abs(contribs[0]), kind='stable')[:top]
+    return [(features[i], float(contribs[0, i])) for i in order]
+
+
+# Escenarios "¿qué pasaría si...?": indicadores que se invierten (Sexo no es un cambio
+# posible) y valores de BMI que se prueban
+WHAT_IF_FLAGS = ('HighBP', 'HighChol', 'CholCheck', 'Smoker', 'Stroke', 'HeartDiseaseorAttack',
+                 'PhysActivity', 'Fruits', 'Veggies', 'HvyAlcoholConsump', 'AnyHealthcare',
+                 'NoDocbcCost', 'DiffWalk')
+WHAT_IF_BMI_GRID = (18.5, 22.0, 25.0, 27.5, 30.0, 35.0, 40.0)
+
+
+def what_if(profile, bmi_grid=WHAT_IF_BMI_GRID):
+    """Score every single-feature change of `profile` in one batch.
+
+    Builds the counterfactuals (each flag in WHAT_IF_FLAGS flipped, GenHlth ±1,
+    BMI at each value of bmi_grid) and returns (base_proba, changes), where
+    changes is a list of dicts {feature, from, to, proba, delta} sorted by
+    delta, largest risk reduction first.
+    """
+    base = dict(profile)
+    if 'BMI' not in base:
+        # Perfil con el índice ya calculado: BMI = índice / GenHlth
+        base['BMI'] = base['Índice_de_Salud_General'] / base['GenHlth']
+        del base['Índice_de_Salud_General']
+
+    changes = [(flag, base[flag], 1 - int(base[flag])) for flag in WHAT_IF_FLAGS]
+    changes += [('GenHlth', base['GenHlth'], base['GenHlth'] + step)
+                for step in (-1, 1) if 1 <= base['GenHlth'] + step <= 5]
+    changes += [('BMI', base['BMI'], bmi) for bmi in bmi_grid if abs(bmi - base['BMI']) > 1e-6]
+
+    rows = [base] + [{**base, feature: to} for feature, _, to in changes]
+    _, proba = predict_diabetes_batch(rows, monitor=False)
+    base_proba = float(proba[0])
+    table = [
+        {'feature': feature, 'from': old, 'to': to, 'proba': float(p), 'delta': float(p) - base_proba}
+        for (feature, old, to), p in zip(changes, proba[1:])
+    ]
+    table.sort(key=lambda row: row['delta'])
+    return base_proba, table
 
 # Diccionarios de idiomas
 FEATURE_EXPLANATIONS_ES = {
@@ -57,7 +553,8 @@ FEATURE_EXPLANATIONS_ES = {
     'Sex': "Género",
     'Age': "Edad",
     'Education': "Nivel educativo",
-    'Income': "Ingresos"
+    'Income': "Ingresos",
+    'Índice_de_Salud_General': "Índice de salud general (salud general × BMI)"
 }
 
 FEATURE_EXPLANATIONS_EN = {
@@ -80,7 +577,8 @@ FEATURE_EXPLANATIONS_EN = {
     'Sex': "Gender",
     'Age': "Age",
     'Education': "Education level",
-    'Income': "Income"
+    'Income': "Income",
+    'Índice_de_Salud_General': "General health index (general health × BMI)"
 }
 
 # Diccionarios para textos generales
@@ -111,7 +609,17 @@ TEXTS = {
         'prediabetes_rec': "**Recomendaciones:**\n- Consulte a un médico para confirmar\n- Monitoree sus niveles de glucosa\n- Ajuste dieta y ejercicio",
         'diabetes_rec': "**Acciones urgentes:**\n- Consulte a un médico inmediatamente\n- Controle su dieta y medicación\n- Realice exámenes de glucosa",
         'risk_factors': "📊 Factores de Riesgo Clave",
-        'categorical_risk': "Factores Categóricos de Riesgo",
+        'contributions_help': "Positivo: sube tu riesgo estimado. Negativo: lo baja (contribución en log-odds).",
+        'raises_risk': "⚠️ SUBE EL RIESGO",
+        'lowers_risk': "✅ BAJA EL RIESGO",
+        'what_if': "🔄 ¿Qué pasaría si...?",
+        'what_if_help': "Riesgo estimado al cambiar una sola respuesta, de mayor a menor reducción.",
+        'what_if_change': "Cambio",
+        'what_if_risk': "Riesgo",
+        'what_if_delta': "Diferencia",
+        'percentile': "Tu riesgo estimado es mayor que el de **{overall:.0f}%** de la población del BRFSS",
+        'percentile_stratum': " y que el de **{stratum:.0f}%** de las personas de tu edad, sexo e ingresos.",
+        'neighbors': "Entre las {k} personas del BRFSS con respuestas más parecidas a las tuyas, **{rate:.0%}** tiene diabetes.",
         'disclaimer': "**Disclaimer:** Esta herramienta ofrece una estimación basada en datos, pero no reemplaza una evaluación médica profesional.",
         'sidebar_title': "📌 Información Adicional",
         'sidebar_content': """
@@ -151,7 +659,17 @@ TEXTS = {
         'prediabetes_rec': "**Recommendations:**\n- Consult a doctor for confirmation\n- Monitor your glucose levels\n- Adjust diet and exercise",
         'diabetes_rec': "**Urgent actions:**\n- Consult a doctor immediately\n- Control your diet and medication\n- Perform glucose tests",
         'risk_factors': "📊 Key Risk Factors",
-        'categorical_risk': "Categorical Risk Factors",
+        'contributions_help': "Positive: raises your estimated risk. Negative: lowers it (contribution in log-odds).",
+        'raises_risk': "⚠️ RAISES RISK",
+        'lowers_risk': "✅ LOWERS RISK",
+        'what_if': "🔄 What if...?",
+        'what_if_help': "Estimated risk when changing a single answer, largest reduction first.",
+        'what_if_change': "Change",
+        'what_if_risk': "Risk",
+        'what_if_delta': "Difference",
+        'percentile': "Your estimated risk is higher than that of **{overall:.0f}%** of the BRFSS population",
+        'percentile_stratum': " and of **{stratum:.0f}%** of people of your age, sex and income.",
+        'neighbors': "Among the {k} BRFSS respondents whose answers are most similar to yours, **{rate:.0%}** have diabetes.",
         'disclaimer': "**Disclaimer:** This tool provides a data-based estimate but does not replace professional medical evaluation.",
         'sidebar_title': "📌 Additional Information",
         'sidebar_content': """
@@ -0,0 +1,283 @@
+"""Fork-after-load worker pool for CPU-parallel scoring of large batches.
+
+The parent loads the model once and then forks the workers, so every worker
+shares the booster's memory copy-on-write instead of unpickling its own. The
+feature matrix is written by the parent into a shared-memory buffer and each
+worker scores a contiguous shard of it into a shared output buffer: only
+(start, stop) offsets go through the pipes, never rows.
+
+Workers use one XGBoost thread each; the parallelism comes from the shards.
+Forking is only safe while the parent has not scored or started threads yet
+(OpenMP thread pools and held locks don't survive fork), so create the pool
+first: score_csv.py and server.py do it right after loading the model. If
+utils later reloads a different model version, the parent may be a
+multithreaded server that has already scored, so the new workers are started
+with 'spawn' instead and load the booster from its serialized bytes.
+
+Uso:
+    with WorkerPool(workers=4) as pool:
+        pred, proba = pool.predict_batch(df)
+
+    python worker_pool.py --rows 200000 --workers 1,2,4,8     # scaling benchmark
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import metrics
+import utils
+
+# Filas mínimas por shard: con menos, el costo de coordinar supera al de predecir
+MIN_SHARD_ROWS = 2048
+
+
+def _attach(name):
+    """Open an existing shared-memory block without registering it for cleanup in this process"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: se quita del resource tracker, el padre es quien la libera
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+def _worker_loop(conn, X, proba, booster):
+    """Score [start, stop) of the shared buffers for each message until None.
+
+    With 'fork' X, proba and booster are the inherited objects. With 'spawn'
+    X and proba are (shared-memory name, shape) pairs and booster is the
+    model's UBJSON bytes.
+    """
+    if isinstance(booster, bytes):
+        import xgboost
+        raw, booster = booster, xgboost.Booster()
+        booster.load_model(bytearray(raw))
+        shm = [_attach(name) for name, _ in (X, proba)]
+        X = np.ndarray(X[1], dtype=np.float32, buffer=shm[0].buf)
+        proba = np.ndarray(proba[1], dtype=np.float32, buffer=shm[1].buf)
+    booster.set_param({'nthread': 1})
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        start, stop = message
+        try:
+            proba[start:stop] = booster.inplace_predict(X[start:stop])
+            conn.send(None)
+        except Exception as e:  # el error se devuelve al padre, el worker sigue vivo
+            conn.send(f"{type(e).__name__}: {e}")
+    conn.close()
+
+
+class WorkerPool:
+    """Forked scoring processes over shared-memory input/output buffers"""
+
+    def __init__(self, workers=None, max_rows=65536, path=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_rows = max_rows
+        self.path = path
+        self._lock = threading.Lock()
+        self._procs = []
+        self._conns = []
+        self._shm = []
+        self._start('fork')
+
+    def _start(self, method):
+        utils.load_model(self.path)
+        model, self.version = utils._registry['current']
+        self.schema = utils.get_schema(model)
+        booster = utils.get_booster(model)
+
+        n_features = self.schema.n_features
+        shm_in = shared_memory.SharedMemory(create=True, size=self.max_rows * n_features * 4)
+        shm_out = shared_memory.SharedMemory(create=True, size=self.max_rows * 4)
+        self._shm = [shm_in, shm_out]
+        self._X = np.ndarray((self.max_rows, n_features), dtype=np.float32, buffer=shm_in.buf)
+        self._proba = np.ndarray((self.max_rows,), dtype=np.float32, buffer=shm_out.buf)
+
+        if method == 'fork':
+            # Los argumentos no se serializan: el hijo hereda el booster y los buffers
+            args = (self._X, self._proba, booster)
+        else:
+            args = ((shm_in.name, self._X.shape), (shm_out.name, self._proba.shape),
+                    bytes(booster.save_raw(raw_format='ubj')))
+        ctx = multiprocessing.get_context(method)
+        for i in range(self.workers):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(target=_worker_loop, args=(child_conn, *args),
+                               name=f'scoring-worker-{i}', daemon=True)
+            proc.start()
+            child_conn.close()
+            self._procs.append(proc)
+            self._conns.append(parent_conn)
+
+    def _stop(self):
+        for conn in self._conns:
+            try:
+                conn.send(None)
+                conn.close()
+            except OSError:
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        # Soltar las vistas antes de cerrar la memoria compartida
+        self._X = self._proba = None
+        for shm in self._shm:
+            shm.close()
+            shm.unlink()
+        self._procs, self._conns, self._shm = [], [], []
+
+    def close(self):
+        with self._lock:
+            if self._procs:
+                self._stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _restart(self):
+        # El proceso ya puede tener hilos y OpenMP iniciado: los workers nuevos no usan fork
+        self._stop()
+        self._start('spawn')
+
+    def _check_version(self):
+        utils.load_model(self.path)
+        if utils._registry['current'][1] != self.version:
+            self._restart()
+
+    def _score_window(self, n):
+        """Score self._X[:n] into self._proba[:n] across the workers.
+
+        If a worker died, the pool is restarted and RuntimeError is raised.
+        """
+        if n == 0:
+            return
+        shards = max(1, min(self.workers, n // MIN_SHARD_ROWS))
+        bounds = np.linspace(0, n, shards + 1).astype(int)
+        try:
+            for conn, start, stop in zip(self._conns, bounds[:-1], bounds[1:]):
+                conn.send((int(start), int(stop)))
+            errors = [conn.recv() for conn in self._conns[:shards]]
+        except (EOFError, OSError) as e:
+            # Un worker murió: sus pipes ya no sirven, se reinicia el pool y este lote falla
+            dead = [proc.name for proc in self._procs if not proc.is_alive()]
+            self._restart()
+            raise RuntimeError(f"Un worker de predicción terminó inesperadamente "
+                               f"({', '.join(dead) or type(e).__name__}); se reinició el pool") from e
+        errors = [e for e in errors if e is not None]
+        if errors:
+            raise RuntimeError(f"Error en un worker de predicción: {errors[0]}")
+
+    def _score_matrix(self, X):
+        """Probabilities for X window by window. Must be called with _lock held."""
+        proba = np.empty(len(X), dtype=np.float32)
+        with metrics.INFERENCE_SECONDS.time():
+            for start in range(0, len(X), self.max_rows):
+                window = X[start:start + self.max_rows]
+                n = len(window)
+                self._X[:n] = window
+                self._score_window(n)
+                proba[start:start + n] = self._proba[:n]
+        return proba
+
+    def predict_proba(self, X):
+        """Probabilities for a validated float32 feature matrix (model order)"""
+        X = np.asarray(X, dtype=np.float32)
+        with self._lock:
+            self._check_version()
+            return self._score_matrix(X)
+
+    def predict_batch(self, data, with_version=False):
+        """Same inputs and outputs as utils.predict_diabetes_batch, scored by the pool"""
+        if isinstance(data, dict):
+            data = [data]
+        n = len(data)
+        if n <= self.max_rows:
+            with self._lock:
+                self._check_version()
+                version = self.version
+                # Las características se escriben directamente en la memoria compartida
+                with metrics.FEATURE_BUILD_SECONDS.time():
+                    self.schema.transform(data, out=self._X[:n])
+                with metrics.INFERENCE_SECONDS.time():
+                    self._score_window(n)
+                proba = self._proba[:n].copy()
+        else:
+            with self._lock:
+                self._check_version()
+                version = self.version
+                with metrics.FEATURE_BUILD_SECONDS.time():
+                    X = self.schema.transform(data)
+                proba = self._score_matrix(X)
+        metrics.PREDICTIONS.inc(n)
+        pred = (proba > 0.5).astype(np.int64)
+        if with_version:
+            return pred, proba, version
+        return pred, proba
+
+
+def _random_features(schema, rows, seed=42):
+    """Valid random feature matrix (uniform within FEATURE_RANGES, integers except the index)"""
+    rng = np.random.default_rng(seed)
+    X = np.empty((rows, schema.n_features), dtype=np.float32)
+    for j, name in enumerate(schema.features):
+        low, high = float(schema.low[j]), float(schema.high[j])
+        if name == 'Índice_de_Salud_General':
+            X[:, j] = rng.uniform(low, high, rows)
+        else:
+            X[:, j] = rng.integers(int(low), int(high) + 1, rows)
+    return X
+
+
+def benchmark(rows=200000, worker_counts=(1, 2, 4, 8), repeats=5, log=sys.stdout):
+    """Throughput of the pool for each worker count, and speedup over 1 worker"""
+    results = []
+    X = None
+    for workers in worker_counts:
+        with WorkerPool(workers=workers) as pool:
+            if X is None:
+                X = _random_features(pool.schema, rows)
+            pool.predict_proba(X[:MIN_SHARD_ROWS * workers])  # calentamiento
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                pool.predict_proba(X)
+                times.append(time.perf_counter() - start)
+        seconds = sorted(times)[len(times) // 2]
+        results.append({'workers': workers, 'seconds': seconds, 'rows_per_s': rows / seconds})
+
+    base = results[0]['rows_per_s']
+    print(f"{'workers':>7s} {'s (mediana)':>12s} {'filas/s':>12s} {'speedup':>8s} {'eficiencia':>10s}", file=log)
+    for r in results:
+        r['speedup'] = r['rows_per_s'] / base
+        r['efficiency'] = r['speedup'] / (r['workers'] / results[0]['workers'])
+        print(f"{r['workers']:7d} {r['seconds']:12.3f} {r['rows_per_s']:12,.0f} "
+              f"{r['speedup']:8.2f} {r['efficiency']:10.0%}", file=log)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fork-after-load scoring pool")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--workers', type=lambda s: tuple(int(x) for x in s.split(',')),
+                        default=(1, 2, 4, 8), help="comma-separated worker counts, e.g. 1,2,4")
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args(argv)
+    benchmark(args.rows, args.workers, args.repeats)
+
+
+if __name__ == '__main__':
+    main()